@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_output.py
+# Compara los backends de salida:
+#  1) CPU de codificación por frame hacia Hyperion (sin red, siempre disponible)
+#  2) CPU por frame y latencia extremo a extremo (envío -> réplica de Hyperion);
+#     con --stub contra hyperion_stub.py en el mismo proceso, sin Hyperion real
+#     (en ese caso la CPU medida incluye también la del stub)
+#  3) Salida directa UDP (DDP/E1.31/Art-Net) contra un listener local: CPU por
+#     frame, latencia envío -> llegada y ahorro frente al camino JSON de Hyperion
+# Los frames son listas de N*3 enteros, igual que las que produce pack() en los shows.
+
+import argparse
+import random
+import time
+from urllib.parse import urlsplit
+
+from layout import N
+from output import DEFAULT_HOST, DIRECT_KINDS, HyperionClient, OutputStats
+from hyperion_binary import FLATBUFFERS_PORT, PROTOBUF_PORT, HyperionFlatClient, HyperionProtoClient
+from hyperion_stub import HyperionStub
+from udp_output import ArtNetOutput, DdpOutput, E131Output, UdpRecorder
+
+HYPERION_KINDS = ("json", "flatbuffers", "protobuf")
+
+def make_frames(count, seed=1):
+    rnd = random.Random(seed)
+    return [[rnd.randrange(256) for _ in range(N * 3)] for _ in range(count)]
+
+def make_client(kind, host, timeout, ports=None):
+    hostname = urlsplit(host).hostname or "localhost"
+    ports = ports or {"flatbuffers": FLATBUFFERS_PORT, "protobuf": PROTOBUF_PORT}
+    if kind == "json":
+        client = HyperionClient(host, origin="bench_output", timeout=timeout)
+    elif kind == "flatbuffers":
+        client = HyperionFlatClient(hostname, ports[kind], origin="bench_output", timeout=timeout, ack=True)
+    else:
+        client = HyperionProtoClient(hostname, ports[kind], timeout=timeout, ack=True)
+    client.keepalive_s = None   # Medimos todos los frames, sin deduplicar
+    return client
+
+def make_direct(kind, port):
+    cls = {"ddp": DdpOutput, "e131": E131Output, "artnet": ArtNetOutput}[kind]
+    return cls("127.0.0.1", port=port)
+
+def encoder(client):
+    if isinstance(client, HyperionClient):
+        return lambda rgb: client.encode(rgb, -1)
+    return lambda rgb: client._message(rgb, -1)
+
+def bench_encode(kind, frames, rounds):
+    enc = encoder(make_client(kind, DEFAULT_HOST, 1.0))
+    t0 = time.process_time()
+    for _ in range(rounds):
+        for rgb in frames:
+            enc(rgb)
+    return (time.process_time() - t0) / (rounds * len(frames))
+
+def bench_send(kind, host, frames, timeout, ports=None):
+    client = make_client(kind, host, timeout, ports)
+    t0 = time.process_time()
+    for rgb in frames:
+        client.send(rgb)
+    cpu = (time.process_time() - t0) / len(frames)
+    s = client.stats.snapshot()
+    client.closed = True
+    client.reconnect()
+    return cpu, s
+
+def bench_direct(kind, frames, fps):
+    rec = UdpRecorder()
+    client = make_direct(kind, rec.port)
+    sent_at = []
+    cpu = 0.0
+    for rgb in frames:
+        t0 = time.process_time()
+        sent_at.append(time.perf_counter())
+        client.send(rgb)
+        cpu += time.process_time() - t0
+        time.sleep(1.0 / fps)
+    time.sleep(0.1)
+    rec.close()
+    per_frame = max(1, len(rec.packets) // len(frames))
+    lat = OutputStats()
+    for i, t_send in enumerate(sent_at):
+        k = (i + 1) * per_frame - 1
+        if k < len(rec.packets):
+            lat.record(rec.packets[k][1], rec.packets[k][0] - t_send)
+    jitter = rec.intervals()[per_frame - 1::per_frame]
+    client.closed = True
+    client.reconnect()
+    return cpu / len(frames), lat.snapshot(), len(rec.packets), jitter
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de backends de salida")
+    p.add_argument("--host", default=DEFAULT_HOST, help="URL HTTP de Hyperion (los binarios usan su hostname)")
+    p.add_argument("--frames", type=int, default=300, help="Frames por backend")
+    p.add_argument("--rounds", type=int, default=20, help="Repeticiones del bench de codificación")
+    p.add_argument("--fps", type=float, default=30.0, help="Ritmo del bench UDP")
+    p.add_argument("--timeout", type=float, default=1.0)
+    p.add_argument("--no-net", action="store_true", help="Solo medir codificación y UDP local")
+    p.add_argument("--stub", action="store_true", help="Medir contra un hyperion_stub local en vez de --host")
+    p.add_argument("--stub-latency-ms", type=float, default=0.0, help="Latencia inyectada en el stub")
+    args = p.parse_args()
+
+    frames = make_frames(args.frames)
+    print(f"== Codificación ({N} LEDs, {args.frames * args.rounds} frames) ==")
+    base = None
+    for kind in HYPERION_KINDS:
+        us = bench_encode(kind, frames, args.rounds) * 1e6
+        base = base or us
+        print(f"  {kind:12s} {us:8.1f} us/frame  x{base / us:5.1f}")
+
+    hyperion_p50 = {}
+    if not args.no_net:
+        stub = ports = None
+        host = args.host
+        if args.stub:
+            stub = HyperionStub(http_port=0, fb_port=0, proto_port=0, latency_ms=args.stub_latency_ms).start()
+            host, ports = stub.url, stub.ports
+        print(f"== Envío a {host} ==")
+        for kind in HYPERION_KINDS:
+            cpu, s = bench_send(kind, host, frames, args.timeout, ports)
+            if s["frames"] == 0:
+                print(f"  {kind:12s} sin conexión ({s['errors']} errores)")
+                continue
+            hyperion_p50[kind] = s["p50_ms"]
+            print(f"  {kind:12s} CPU {cpu * 1e6:8.1f} us/frame  p50 {s['p50_ms']:6.2f} ms  "
+                  f"p99 {s['p99_ms']:6.2f} ms  {s['bytes_s'] / 1024:8.1f} KiB/s  errores {s['errors']}")
+        if stub:
+            print(f"  stub: {stub.report()}")
+            stub.stop()
+
+    print(f"== Salida directa UDP (listener local, {args.fps:.0f} fps) ==")
+    for kind in DIRECT_KINDS:
+        cpu, s, packets, jitter = bench_direct(kind, frames, args.fps)
+        line = (f"  {kind:12s} CPU {cpu * 1e6:8.1f} us/frame  p50 {s['p50_ms']:6.3f} ms  "
+                f"p99 {s['p99_ms']:6.3f} ms  paquetes {packets}")
+        if jitter:
+            line += f"  jitter máx {(max(jitter) - 1.0 / args.fps) * 1000:6.2f} ms"
+        if "json" in hyperion_p50:
+            line += f"  ahorro vs json {hyperion_p50['json'] - s['p50_ms']:6.2f} ms"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_particles.py
+# Partículas por milisegundo (avanzar + pintar + envejecer) con distinto número
+# de fragmentos moviéndose por FULL_PATH hacia un objetivo:
+#  - lista:     lista de dicts y PATH.index() por partícula, como el shard_rain original
+#  - particles: pool struct-of-arrays de particles.py
+
+import argparse
+import random
+import time
+
+from frame import Frame
+from layout import FULL_PATH, N
+from particles import Particles
+
+COLOR = (255, 120, 120)
+
+def spawn_list(count, rnd):
+    return [{"pos": rnd.choice(FULL_PATH), "target": rnd.choice(FULL_PATH), "life": 10**9}
+            for _ in range(count)]
+
+def step_list(active, px):
+    total = len(FULL_PATH)
+    for s in active[:]:
+        if s["life"] <= 0: active.remove(s); continue
+        pi = FULL_PATH.index(s["pos"]); ti = FULL_PATH.index(s["target"])
+        step = 2 if (ti - pi) % total < (pi - ti) % total else -2
+        s["pos"] = FULL_PATH[(pi + step) % total]; s["life"] -= 1
+        r, g, b = px[s["pos"]]
+        px[s["pos"]] = (r + COLOR[0], g + COLOR[1], b + COLOR[2])
+
+def spawn_pool(count, rnd):
+    total = len(FULL_PATH)
+    pool = Particles(count, paths=[FULL_PATH])
+    pi = [rnd.randrange(total) for _ in range(count)]
+    ti = [rnd.randrange(total) for _ in range(count)]
+    vel = [2 if (t - p) % total < (p - t) % total else -2 for p, t in zip(pi, ti)]
+    pool.spawn(pi, vel=vel, life=10**9, color=COLOR, path=0, target=ti)
+    pool.target[:] = -1.0   # Sin parada: todas siguen moviéndose, el caso más caro
+    return pool
+
+def bench(kind, count, frames):
+    rnd = random.Random(1)
+    if kind == "lista":
+        active = spawn_list(count, rnd)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            step_list(active, [(0, 0, 0)] * N)
+    else:
+        pool = spawn_pool(count, rnd)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            pool.update(Frame.black())
+    ms = (time.perf_counter() - t0) * 1000.0
+    return count * frames / ms
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark del motor de partículas")
+    p.add_argument("--frames", type=int, default=100)
+    p.add_argument("--counts", default="10,100,1000,10000", help="Nº de partículas, separados por comas")
+    args = p.parse_args()
+    print(f"== Partículas por ms ({len(FULL_PATH)} LEDs de path, {args.frames} frames) ==")
+    for count in (int(c) for c in args.counts.split(",")):
+        old = bench("lista", count, args.frames if count <= 1000 else max(1, args.frames // 10))
+        new = bench("particles", count, args.frames)
+        print(f"  {count:6d} partículas   lista {old:9.0f}/ms   particles {new:9.0f}/ms   x{new / old:6.1f}")
+
+if __name__ == "__main__":
+    main()
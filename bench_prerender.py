@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_prerender.py
+# Prerender del show de libios entero con 1, 2, 4... procesos (prerender.py por
+# trozos) a un .npy temporal, sin tocar la caché: tiempo, frames/s y aceleración
+# frente a 1 proceso. Comprueba además que todos los renders salen iguales byte a
+# byte al primero (el render en paralelo no puede cambiar el show).
+#
+#   python bench_prerender.py                    1, 2, 4... hasta el número de núcleos
+#   python bench_prerender.py --workers 1 3 6 --chunk-s 5
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+import libios as L
+from prerender import CHUNK_S, render_frames
+
+def main():
+    cores = os.cpu_count() or 1
+    p = argparse.ArgumentParser(description="Aceleración del prerender en paralelo por número de procesos")
+    p.add_argument("--workers", type=int, nargs="+", default=None, help="Números de procesos a medir")
+    p.add_argument("--chunk-s", type=float, default=CHUNK_S, help="Segundos de show por trozo")
+    p.add_argument("--seconds", type=float, default=None, help="Renderizar solo los primeros N segundos")
+    p.add_argument("--seed", type=int, default=L.PRERENDER_SEED)
+    args = p.parse_args()
+    workers = args.workers or sorted({1, *[w for w in (2, 4, 8, 16, 32) if w <= cores], cores})
+
+    job = L.prerender_job(args.seed)
+    count = int((args.seconds or job["duration"]) * job["fps"]) + 1
+    print(f"[bench] libios: {count} frames a {job['fps']} FPS, trozos de {args.chunk_s:g} s, {cores} núcleos")
+    base = ref = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for w in workers:
+            path = os.path.join(tmp, f"frames-{w}.npy")
+            secs = render_frames(path, job["render"], job["fps"], count, job["n"], w,
+                                 job["init"], job["initargs"], chunk_s=args.chunk_s)
+            frames = np.load(path, mmap_mode="r")
+            if ref is None: ref = np.array(frames)
+            same = "iguales" if np.array_equal(frames, ref) else "¡DISTINTOS!"
+            del frames
+            if base is None: base = secs
+            print(f"  {w:3d} procesos  {secs:7.1f} s  {count / secs:7.0f} frames/s  x{base / secs:4.2f}  ({same})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_render.py
+# Tiempo de render por frame (sin mpv ni red) de escenas representativas:
+#  - libios "acel":      túneles en paralaje + marcadores + strobe + crackle
+#  - libios "disparos":  muzzle blast en 4 zonas + crackle + pulso de zona
+#  - torre  "rayo":      nubes + rayo por path + flash + crackle + convergencia
+# Cada escena termina en pack(), igual que antes de enviar a Hyperion.
+# Con --gamma se mide también el coste de las LUT de gamma/balance por zona.
+
+import argparse
+import time
+
+from frame import OutputLut
+import libios as L
+import torre_reloj as R
+from layout import INDEX, N, WHITE, ZONE1, ZONE2, ZONE3, ZONE4, AMBER_SOFT, YELLOW_WARM
+
+SIDE_PATH  = INDEX["B_L"] + INDEX["M_L"] + INDEX["T_L"] + INDEX["Z1_L"]
+TOP_PATH   = ZONE2 + INDEX["Z1_T"]
+RIGHT_PATH = INDEX["B_R"] + INDEX["M_R"] + INDEX["T_R"] + INDEX["Z1_R"]
+
+def libios_accel(t):
+    v = 0.7
+    color = L.mix(L.AMBER_SOFT, L.ORANGE_INTENSE, 0.5)
+    px = L.idle_ambient(t)
+    L.parallax_tunnel_bundle(px, t, v, t * 3.0, SIDE_PATH, TOP_PATH, RIGHT_PATH, color)
+    for path in (SIDE_PATH, TOP_PATH, RIGHT_PATH):
+        L.roadside_markers(px, path, t, v)
+    L.warp_strobe(px, 0.0, v)
+    L.crackle(px, list(range(0, N, 3)), spread=2, density=0.6, base=color, mix_with=WHITE, mix_amt=0.25)
+    return L.pack(px)
+
+def libios_shots(t):
+    px = L.idle_ambient(t)
+    L.muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
+    L.crackle(px, ZONE2[::2] + ZONE1[::3], spread=3, density=0.85, base=WHITE, mix_with=(0, 0, 0), mix_amt=0.10)
+    L.pulse_zone(px, ZONE3, AMBER_SOFT, YELLOW_WARM, phase=t * 0.75, gain=0.35)
+    return L.pack(px)
+
+def torre_bolt(t):
+    px = R.idle_ambient(phase=t * 0.25)
+    R.storm_clouds_zone1(px, density=1.0)
+    R.draw_along_path(px, R.PRE_PATH_1, 0.5, tail=8, color='white', head_gain=2.3)
+    R.white_flash_local(px, R.LED_CLOCK, power=2.3, force=True)
+    R.crackle(px, R.LED_CLOCK, spread=5, density=0.9, color='white')
+    R.apply_blue_converge_effect(px, 0.5)
+    return R.pack(px)
+
+SCENES = {"libios-acel": libios_accel, "libios-disparos": libios_shots, "torre-rayo": torre_bolt}
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de render por frame")
+    p.add_argument("--frames", type=int, default=2000)
+    p.add_argument("--gamma", type=float, default=None, help="Gamma de salida (por defecto la de cada show)")
+    args = p.parse_args()
+    if args.gamma is not None:
+        L.LUT = R.LUT = OutputLut(args.gamma)
+    for name, scene in SCENES.items():
+        scene(0.0)
+        t0 = time.perf_counter()
+        for f in range(args.frames):
+            scene(f / 30.0)
+        us = (time.perf_counter() - t0) / args.frames * 1e6
+        print(f"  {name:16s} {us:8.1f} us/frame")
+
+if __name__ == "__main__":
+    main()
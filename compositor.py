@@ -0,0 +1,152 @@
+# compositor.py
+# Compositor por capas para los shows: cada capa es un Frame con nombre, su modo
+# de mezcla, opacidad y la máscara de LEDs que ha pintado. Las capas estáticas
+# (fondo, zords...) conservan su contenido entre frames y solo se recomponen
+# cuando cambian; las dinámicas (efectos, flashes) se vacían en cada begin().
+#
+# Modos de mezcla sobre lo que hay debajo, solo en los LEDs pintados por la capa:
+#   add      suma (color * opacidad)
+#   replace  sustituye (con opacidad < 1 mezcla hacia el color de la capa)
+#   max      máximo por canal
+#   multiply multiplica por color/255 (máscaras de luz, oscurecer zonas)
+
+import numpy as np
+
+from frame import Frame, as_color
+from layout import N
+
+BLEND_MODES = ("add", "replace", "max", "multiply")
+
+class Layer(Frame):
+    """Frame con modo de mezcla y máscara de cobertura. Cualquier escritura la marca sucia."""
+    __slots__ = ("name", "mode", "opacity", "static", "mask", "dirty")
+
+    def __init__(self, name, mode="add", opacity=1.0, static=False, n=N):
+        if mode not in BLEND_MODES: raise ValueError(f"Modo de mezcla desconocido: {mode}")
+        super().__init__(np.zeros((n, 3)))
+        self.name = name
+        self.mode = mode
+        self.opacity = opacity
+        self.static = static
+        self.mask = np.zeros(n, dtype=bool)
+        self.dirty = True
+
+    def _touch(self, idx=None):
+        if idx is None: self.mask[:] = True
+        else:           self.mask[self._inside(idx)] = True
+        self.dirty = True
+
+    def add(self, idx, color, k=1.0):
+        self._touch(idx)
+        return super().add(idx, color, k)
+
+    def add_rgb(self, idx, rgb):
+        self._touch(idx)
+        return super().add_rgb(idx, rgb)
+
+    def add_all(self, color, k=1.0):
+        self._touch()
+        return super().add_all(color, k)
+
+    def set(self, idx, color):
+        self._touch(idx)
+        return super().set(idx, color)
+
+    def scale(self, k, idx=None):
+        self.dirty = True
+        return super().scale(k, idx)
+
+    def mix(self, color, t, idx=None):
+        self._touch(idx)
+        return super().mix(color, t, idx)
+
+    def blend(self, other, k):
+        self._touch()
+        return super().blend(other, k)
+
+    def paint(self, color):
+        """Pinta toda la capa de un color."""
+        self.px[:] = as_color(color)
+        self._touch()
+        return self
+
+    def clear(self, idx=None):
+        """Borra la capa entera o solo los LEDs de idx (vuelven a dejar ver lo de debajo)."""
+        if idx is None:
+            if not self.mask.any(): return self
+            self.px[:] = 0.0
+            self.mask[:] = False
+        else:
+            idx = self._inside(idx)
+            self.px[idx] = 0.0
+            self.mask[idx] = False
+        self.dirty = True
+        return self
+
+    def set_opacity(self, opacity):
+        if opacity != self.opacity:
+            self.opacity = opacity
+            self.dirty = True
+
+    def blend_into(self, out):
+        """Mezcla la capa sobre el array (n, 3) `out`, in situ."""
+        m, o = self.mask, self.opacity
+        if o <= 0.0 or not m.any(): return
+        src, dst = self.px[m], out[m]
+        if self.mode == "add":
+            dst += src * o
+        elif self.mode == "replace":
+            dst += (src - dst) * o
+        elif self.mode == "max":
+            dst += (np.maximum(dst, src) - dst) * o
+        else:
+            dst *= 1.0 + (src / 255.0 - 1.0) * o
+        out[m] = dst
+
+class Compositor:
+    """
+    Pila de capas con nombre, de abajo arriba. Las capas estáticas deben ir
+    debajo de las dinámicas: su mezcla se guarda y solo se rehace si alguna
+    cambia, así el contenido persistente no cuesta nada por frame.
+    """
+
+    def __init__(self, layers=(), n=N):
+        self.n = n
+        self.layers = {}
+        self._base = None
+        for spec in layers:
+            self.add_layer(*spec)
+
+    def add_layer(self, name, mode="add", opacity=1.0, static=False):
+        if static and any(not l.static for l in self.layers.values()):
+            raise ValueError(f"La capa estática '{name}' debe ir debajo de las dinámicas")
+        layer = self.layers[name] = Layer(name, mode, opacity, static, self.n)
+        self._base = None
+        return layer
+
+    def __getitem__(self, name):
+        return self.layers[name]
+
+    def begin(self):
+        """Empieza un frame: vacía las capas dinámicas."""
+        for layer in self.layers.values():
+            if not layer.static: layer.clear()
+
+    def _static_base(self):
+        static = [l for l in self.layers.values() if l.static]
+        if self._base is None or any(l.dirty for l in static):
+            base = np.zeros((self.n, 3))
+            for layer in static:
+                layer.blend_into(base)
+                layer.dirty = False
+            self._base = base
+        return self._base
+
+    def render(self):
+        """Devuelve un Frame nuevo con todas las capas compuestas."""
+        out = self._static_base().copy()
+        for layer in self.layers.values():
+            if not layer.static:
+                layer.blend_into(out)
+                layer.dirty = False
+        return Frame(out)
@@ -0,0 +1,206 @@
+# frame.py
+# Frame de LEDs respaldado por NumPy: un array (N, 3) de floats en lugar de una lista
+# de tuplas. Las operaciones trabajan sobre arrays de índices de una vez y el
+# frame se clampa y empaqueta a bytes uint8 en una sola pasada vectorizada.
+#
+# Igual que add() en los shows, los índices fuera de [0, N) se ignoran y los
+# valores pueden pasar de 255 mientras se compone; el clamp ocurre en pack().
+# La gamma y el balance de blancos por zona se aplican con OutputLut: tablas
+# precalculadas y un único gather por frame. Antes, ZoneConstraints impone las
+# reglas de color de cada zona (sin blanco, tope de brillo) sobre el frame entero.
+
+import numpy as np
+
+from layout import N, WHITE_SUBSTITUTE, ZONE_PROPERTIES_MAP, calculate_zone_ids, property_mask
+
+def as_index(idx):
+    """Lista/rango/array de LEDs -> array de índices (sin copia si ya lo es)."""
+    return np.asarray(idx, dtype=np.intp)
+
+def as_color(c):
+    return np.asarray(c, dtype=float)
+
+class Frame:
+    __slots__ = ("px", "exempt")
+
+    def __init__(self, px):
+        self.px = px
+        self.exempt = None   # LEDs libres de ZoneConstraints en este frame
+
+    @classmethod
+    def fill(cls, color, n=N):
+        return cls(np.tile(as_color(color), (n, 1)))
+
+    @classmethod
+    def black(cls, n=N):
+        return cls(np.zeros((n, 3)))
+
+    @property
+    def n(self):
+        return len(self.px)
+
+    def copy(self):
+        """Copia de los colores (las exenciones no se copian)."""
+        return Frame(self.px.copy())
+
+    def _inside(self, idx):
+        # Índices de idx dentro de [0, N): los de fuera se ignoran, como en add()
+        idx = np.atleast_1d(as_index(idx))
+        return idx[(idx >= 0) & (idx < len(self.px))]
+
+    def unguard(self, idx=None):
+        """Exime a los LEDs de idx (o a todos) de ZoneConstraints: blanco forzado a propósito."""
+        if self.exempt is None: self.exempt = np.zeros(len(self.px), dtype=bool)
+        if idx is None: self.exempt[:] = True
+        else:           self.exempt[self._inside(idx)] = True
+        return self
+
+    # --- composición ---
+    def add(self, idx, color, k=1.0):
+        """
+        Suma color*k en los LEDs de idx. `k` puede ser un escalar o un peso por
+        índice; los índices repetidos acumulan (como varias llamadas a add()).
+        """
+        idx = as_index(idx)
+        n = len(self.px)
+        if idx.ndim == 0:
+            if 0 <= idx < n: self.px[idx] += as_color(color) * k
+            return self
+        if idx.size == 0: return self
+        if np.ndim(k) == 0:
+            k = np.full(idx.shape, float(k))
+        try:
+            w = np.bincount(idx, weights=k, minlength=n)
+        except ValueError:  # índices negativos: se descartan como en add()
+            ok = idx >= 0
+            w = np.bincount(idx[ok], weights=np.asarray(k)[ok], minlength=n)
+        if len(w) > n: w = w[:n]
+        self.px += w[:, None] * as_color(color)
+        return self
+
+    def add_rgb(self, idx, rgb):
+        """Suma un color distinto en cada índice (rgb: (len(idx), 3)); los repetidos acumulan."""
+        idx = as_index(idx)
+        n = len(self.px)
+        ok = (idx >= 0) & (idx < n)
+        idx, rgb = idx[ok], np.asarray(rgb, dtype=float)[ok]
+        for c in range(3):
+            self.px[:, c] += np.bincount(idx, weights=rgb[:, c], minlength=n)
+        return self
+
+    def add_all(self, color, k=1.0):
+        self.px += as_color(color) * k
+        return self
+
+    def set(self, idx, color):
+        self.px[self._inside(idx)] = as_color(color)
+        return self
+
+    def scale(self, k, idx=None):
+        if idx is None: self.px *= k
+        else:           self.px[self._inside(idx)] *= k
+        return self
+
+    def mix(self, color, t, idx=None):
+        """
+        Lleva los LEDs (todos o los de idx) hacia `color` en proporción t (0..1).
+        `color` puede ser un único RGB o un array (n, 3) con un destino por LED.
+        """
+        if idx is None:
+            self.px += (as_color(color) - self.px) * t
+        else:
+            color = as_color(color)
+            if color.ndim == 2:   # Un destino por LED: se filtra junto con los índices
+                idx = np.atleast_1d(as_index(idx))
+                ok = (idx >= 0) & (idx < len(self.px))
+                idx, color = idx[ok], color[ok]
+            else:
+                idx = self._inside(idx)
+            self.px[idx] += (color - self.px[idx]) * t
+        return self
+
+    def blend(self, other, k):
+        """Suma k * otro frame (estela / motion blur)."""
+        self.px += other.px * k
+        return self
+
+    # --- salida ---
+    def pack(self, lut=None, constraints=None):
+        """Clamp a 0..255, reglas de zona y LUT opcionales, y bytes RGB uint8 para la salida."""
+        px = np.clip(self.px, 0.0, 255.0)
+        if constraints is not None: constraints.apply(px, self.exempt)
+        if lut is not None: return lut.apply(px)
+        return px.astype(np.uint8).tobytes()
+
+# ========= REGLAS DE ZONA =========
+class ZoneConstraints:
+    """
+    Reglas de color por zona (layout.ZONE_PROPERTIES_MAP) aplicadas al final del
+    pipeline, sobre el frame ya clampado, para que los efectos pinten sin mirar zonas:
+      - white_allowed False: un LED blanco o casi (canal mínimo > WHITE_RATIO del
+        máximo, RGB casi iguales: blancos y grises, no pasteles ni ámbar) pasa a
+        WHITE_SUBSTITUTE * SUBSTITUTE_GAIN con el brillo de su canal más alto, así
+        blanco*k queda como WHITE_SUBSTITUTE*0.8*k, igual que el antiguo _add_white_guarded.
+        Las mezclas casi blancas con tinte (blanco+azul) no cuentan: el efecto que
+        las pinta elige su color en las zonas sin blanco (torre_reloj.crackle).
+      - max_brightness: escala el LED para que su canal más alto no pase del tope.
+    Los LEDs sin zona no admiten blanco, como white_allowed().
+    """
+
+    WHITE_RATIO = 0.9       # min/max a partir del cual un LED cuenta como blanco
+    SUBSTITUTE_GAIN = 0.8   # El sustituto sale algo más tenue que el blanco que tapa
+
+    def __init__(self, zones=ZONE_PROPERTIES_MAP, n=N, substitute=WHITE_SUBSTITUTE):
+        zone_id = calculate_zone_ids(zones, n)
+        self.no_white = np.flatnonzero(~property_mask("white_allowed", False, zones, zone_id))
+        sub = as_color(substitute)
+        self.substitute = sub / sub.max() * self.SUBSTITUTE_GAIN
+        caps = np.array([p.get("max_brightness") or 255.0 for p in zones.values()] + [255.0])[zone_id]
+        self.capped = np.flatnonzero(caps < 255.0)
+        self.caps = caps[self.capped]
+
+    def apply(self, px, exempt=None):
+        """Aplica las reglas in situ sobre el array (n, 3) clampado."""
+        idx = self.no_white if exempt is None else self.no_white[~exempt[self.no_white]]
+        p = px[idx]
+        hi = p.max(axis=1)
+        white = p.min(axis=1) > self.WHITE_RATIO * hi
+        if white.any():
+            px[idx[white]] = hi[white, None] * self.substitute
+        if self.capped.size:
+            hi = px[self.capped].max(axis=1)
+            k = np.minimum(1.0, self.caps / np.maximum(hi, 1e-9))
+            px[self.capped] *= k[:, None]
+
+# ========= LUT DE SALIDA =========
+class OutputLut:
+    """
+    Gamma y balance de blancos por zona (layout.ZONE_PROPERTIES_MAP) como tablas
+    precalculadas. La entrada se cuantiza a STEPS sub-niveles por unidad para no
+    perder los tonos bajos antes de la gamma; cada LED apunta a la tabla de su
+    zona y apply() es un único gather sobre el frame ya clampado.
+    """
+    STEPS = 16
+
+    def __init__(self, gamma=1.0, zones=ZONE_PROPERTIES_MAP, n=N):
+        calib = [(gamma, (1.0, 1.0, 1.0))]   # LEDs sin zona
+        zone_lut = []
+        for props in zones.values():
+            key = (props.get("gamma") or gamma, tuple(props.get("white_balance") or (1.0, 1.0, 1.0)))
+            if key not in calib: calib.append(key)
+            zone_lut.append(calib.index(key))
+        # La zona -1 (sin zona) cae en el último elemento: la tabla 0
+        led_lut = np.array(zone_lut + [0], dtype=np.intp)[calculate_zone_ids(zones, n)]
+        levels = 256 * self.STEPS
+        x = np.arange(levels) / (self.STEPS * 255.0)
+        table = np.empty((len(calib), 3, levels), dtype=np.uint8)
+        for k, (g, wb) in enumerate(calib):
+            for c in range(3):
+                table[k, c] = np.clip(255.0 * x ** g * wb[c], 0.0, 255.0).astype(np.uint8)
+        self.table = table.ravel()
+        # Desplazamiento de la tabla (zona, canal) de cada LED dentro de la tabla plana
+        self.base = (led_lut[:, None] * 3 + np.arange(3)) * levels
+
+    def apply(self, px):
+        q = (px * self.STEPS).astype(np.intp)
+        return self.table[self.base + q].tobytes()
@@ -0,0 +1,212 @@
+# hyperion_binary.py
+# Backends binarios de Hyperion sobre un socket TCP persistente.
+# En vez de una lista JSON de 459 enteros, cada frame viaja como imagen RGB cruda
+# de N x 1 píxeles. El mensaje se preconstruye una vez en un bytearray y por frame
+# solo se copian los bytes de color (y la duración) en su sitio.
+#
+#  - FlatBuffers (puerto 19400, hyperion_request.fbs): Register + Image/RawImage
+#  - Protobuf    (puerto 19445, message.proto):        HyperionRequest IMAGE
+#
+# Ambos protocolos enmarcan cada mensaje con 4 bytes de longitud big-endian.
+# Los encoders están escritos a mano (layout fijo) para no depender de las librerías
+# flatbuffers/protobuf ni de código generado.
+
+import select
+import socket
+import struct
+
+from output import FrameOutput
+
+FLATBUFFERS_PORT = 19400
+PROTOBUF_PORT    = 19445
+
+# ========= FLATBUFFERS =========
+# Valores de las uniones de hyperion_request.fbs
+FB_CMD_IMAGE    = 2
+FB_CMD_REGISTER = 4
+FB_IMG_RAW      = 1
+
+def _fb_request_head(buf, command_type):
+    # [0] raíz -> tabla Request en 12
+    # [4] vtable Request: 8 bytes, tabla de 12, command_type en +8, command en +4
+    # [12] tabla Request: soffset 8 (vtable en 4), command uoffset -> tabla en 36/32
+    struct.pack_into("<I", buf, 0, 12)
+    struct.pack_into("<4H", buf, 4, 8, 12, 8, 4)
+    struct.pack_into("<i", buf, 12, 8)
+    struct.pack_into("<B", buf, 20, command_type)
+
+def fb_encode_register(origin, priority):
+    name = origin.encode("utf-8")
+    size = 48 + ((len(name) + 1 + 3) & ~3)
+    buf = bytearray(size)
+    _fb_request_head(buf, FB_CMD_REGISTER)
+    struct.pack_into("<I", buf, 16, 32 - 16)           # Request.command -> Register
+    # [24] vtable Register: 8 bytes, tabla de 12, origin en +4, priority en +8
+    struct.pack_into("<4H", buf, 24, 8, 12, 4, 8)
+    # [32] tabla Register
+    struct.pack_into("<iIi", buf, 32, 32 - 24, 44 - 36, priority)
+    # [44] string origin (longitud + bytes + NUL)
+    struct.pack_into("<I", buf, 44, len(name))
+    buf[48:48 + len(name)] = name
+    return struct.pack(">I", size) + bytes(buf)
+
+class FlatImageMessage:
+    """Mensaje Image/RawImage preconstruido para `n_bytes` de RGB (alto 1)."""
+    DURATION_AT = 4 + 44
+    DATA_AT     = 4 + 84
+
+    def __init__(self, n_bytes):
+        size = 84 + ((n_bytes + 3) & ~3)
+        buf = bytearray(4 + size)
+        struct.pack_into(">I", buf, 0, size)
+        body = memoryview(buf)[4:]
+        _fb_request_head(body, FB_CMD_IMAGE)
+        struct.pack_into("<I", body, 16, 36 - 16)          # Request.command -> Image
+        # [24] vtable Image: 10 bytes, tabla de 16, data_type +12, data +4, duration +8
+        struct.pack_into("<5H", body, 24, 10, 16, 12, 4, 8)
+        # [36] tabla Image: soffset, data uoffset -> RawImage en 64, duration, data_type
+        struct.pack_into("<iIiB", body, 36, 36 - 24, 64 - 40, -1, FB_IMG_RAW)
+        # [52] vtable RawImage: 10 bytes, tabla de 16, data +4, width +8, height +12
+        struct.pack_into("<5H", body, 52, 10, 16, 4, 8, 12)
+        # [64] tabla RawImage: soffset, data uoffset -> vector en 80, width, height
+        struct.pack_into("<iIii", body, 64, 64 - 52, 80 - 68, n_bytes // 3, 1)
+        # [80] vector de ubyte
+        struct.pack_into("<I", body, 80, n_bytes)
+        body.release()
+        self.n_bytes = n_bytes
+        self.buf = buf
+        self.view = memoryview(buf)
+
+    def fill(self, rgb, duration):
+        struct.pack_into("<i", self.buf, self.DURATION_AT, duration)
+        self.view[self.DATA_AT:self.DATA_AT + self.n_bytes] = bytes(rgb) if isinstance(rgb, list) else rgb
+        return self.view
+
+# ========= PROTOBUF =========
+PB_CMD_IMAGE      = 2
+PB_EXT_IMAGE      = 11  # extensión ImageRequest.imageRequest de HyperionRequest
+
+def _varint(v):
+    v &= (1 << 64) - 1   # int32 negativos se codifican como uint64 (10 bytes)
+    out = bytearray()
+    while True:
+        b = v & 0x7F
+        v >>= 7
+        if v:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+class ProtoImageMessage:
+    """HyperionRequest{command: IMAGE, imageRequest} con imagedata al final."""
+
+    def __init__(self, n_bytes, priority, duration):
+        # ImageRequest: width(1), height(2), priority(4), duration(5), imagedata(3)
+        fields = (b"\x08" + _varint(n_bytes // 3) + b"\x10" + _varint(1) +
+                  b"\x20" + _varint(priority) + b"\x28" + _varint(duration) +
+                  b"\x1a" + _varint(n_bytes))
+        inner_len = len(fields) + n_bytes
+        head = (b"\x08" + _varint(PB_CMD_IMAGE) +
+                _varint(PB_EXT_IMAGE << 3 | 2) + _varint(inner_len) + fields)
+        size = len(head) + n_bytes
+        self.buf = bytearray(struct.pack(">I", size) + head + bytes(n_bytes))
+        self.view = memoryview(self.buf)
+        self.data_at = 4 + len(head)
+        self.n_bytes = n_bytes
+
+    def fill(self, rgb, duration=None):
+        self.view[self.data_at:] = bytes(rgb) if isinstance(rgb, list) else rgb
+        return self.view
+
+# ========= SOCKET =========
+class _TcpOutput(FrameOutput):
+    """
+    Socket TCP persistente con TCP_NODELAY. Por defecto no espera respuesta: las
+    réplicas de Hyperion se vacían sin bloquear en cada envío. Con ack=True cada
+    send() espera la réplica (lo usa bench_output.py para medir latencia extremo
+    a extremo).
+    """
+
+    def __init__(self, host, port, timeout=2.0, retry_s=1.0, ack=False):
+        super().__init__(timeout, retry_s)
+        self.addr = (host, port)
+        self.ack = ack
+        self.sock = None
+        self._messages = {}
+
+    def _open(self):
+        s = socket.create_connection(self.addr, timeout=self.timeout)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = s
+        self._handshake()
+
+    def _handshake(self): pass
+
+    def _close(self):
+        self.sock.close()
+        self.sock = None
+
+    def _drain(self):
+        while select.select([self.sock], [], [], 0)[0]:
+            if not self.sock.recv(4096):
+                raise ConnectionError("Hyperion cerró la conexión")
+
+    def _read_reply(self):
+        head = self._recv_exact(4)
+        return self._recv_exact(struct.unpack(">I", head)[0])
+
+    def _recv_exact(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk: raise ConnectionError("Hyperion cerró la conexión")
+            data += chunk
+        return data
+
+    def _message(self, rgb, duration):
+        raise NotImplementedError
+
+    def _send(self, rgb, duration):
+        msg = self._message(rgb, duration)
+        self.sock.sendall(msg)
+        if self.ack: self._read_reply()
+        else:        self._drain()
+        return len(msg)
+
+class HyperionFlatClient(_TcpOutput):
+    name = "Hyperion-FlatBuffers"
+
+    def __init__(self, host="localhost", port=FLATBUFFERS_PORT, priority=64,
+                 origin="estanteria", timeout=2.0, retry_s=1.0, ack=False):
+        super().__init__(host, port, timeout, retry_s, ack)
+        self.priority = priority
+        self.origin = origin
+
+    def _handshake(self):
+        # La prioridad se registra una vez por conexión; Hyperion siempre responde
+        self.sock.sendall(fb_encode_register(self.origin, self.priority))
+        self._read_reply()
+
+    def _message(self, rgb, duration):
+        n = len(rgb)
+        msg = self._messages.get(n)
+        if msg is None:
+            msg = self._messages[n] = FlatImageMessage(n)
+        return msg.fill(rgb, duration)
+
+class HyperionProtoClient(_TcpOutput):
+    name = "Hyperion-Protobuf"
+
+    def __init__(self, host="localhost", port=PROTOBUF_PORT, priority=64,
+                 timeout=2.0, retry_s=1.0, ack=False):
+        super().__init__(host, port, timeout, retry_s, ack)
+        self.priority = priority
+
+    def _message(self, rgb, duration):
+        # La duración cambia la longitud del varint: un mensaje preconstruido por valor
+        key = (len(rgb), duration)
+        msg = self._messages.get(key)
+        if msg is None:
+            msg = self._messages[key] = ProtoImageMessage(len(rgb), self.priority, duration)
+        return msg.fill(rgb)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# hyperion_stub.py
+# Sustituto local de Hyperion para medir la salida sin tener el equipo real.
+# Atiende lo mismo que usan los shows:
+#  - HTTP /json-rpc, comando `color`            (puerto 8090 por defecto)
+#  - FlatBuffers Register + Image/RawImage      (puerto 19400)
+#  - Protobuf HyperionRequest IMAGE/COLOR/CLEAR (puerto 19445)
+# Cada frame se valida contra layout.N y se registra con su instante de llegada,
+# tamaño de payload y protocolo. Se puede inyectar latencia (con jitter) y
+# pérdida de frames para estresar los bucles de los shows sin Hyperion: un frame
+# perdido se contesta como cualquier otro pero no se registra, igual que si se
+# hubiera quedado por el camino.
+#
+# Uso:  python hyperion_stub.py --latency-ms 15 --jitter-ms 5 --loss 0.02
+
+import argparse
+import json
+import random
+import socket
+import socketserver
+import statistics
+import struct
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler
+
+from layout import N
+
+FrameRecord = namedtuple("FrameRecord", "t proto nbytes leds duration valid rgb")
+
+# ========= FLATBUFFERS (lectura mínima) =========
+def _fb_table(buf, pos):
+    """Devuelve field(i) -> posición absoluta del campo i de la tabla, o None."""
+    vt = pos - struct.unpack_from("<i", buf, pos)[0]
+    vsize = struct.unpack_from("<H", buf, vt)[0]
+    def field(i):
+        o = 4 + 2 * i
+        if o >= vsize: return None
+        off = struct.unpack_from("<H", buf, vt + o)[0]
+        return pos + off if off else None
+    return field
+
+def _fb_deref(buf, at):
+    return at + struct.unpack_from("<I", buf, at)[0]
+
+def _fb_int(buf, at, default):
+    return default if at is None else struct.unpack_from("<i", buf, at)[0]
+
+def _fb_bytes(buf, at):
+    vec = _fb_deref(buf, at)
+    n = struct.unpack_from("<I", buf, vec)[0]
+    return bytes(buf[vec + 4:vec + 4 + n])
+
+def fb_encode_reply(error=None, registered=None):
+    # Reply {error:string (0), video:int (1), registered:int (2)}
+    if error is not None:
+        msg = error.encode("utf-8")
+        buf = bytearray(24 + ((len(msg) + 1 + 3) & ~3))
+        struct.pack_into("<IHHH", buf, 0, 12, 6, 8, 4)           # raíz, vtable (error en +4)
+        struct.pack_into("<iII", buf, 12, 8, 20 - 16, len(msg))   # tabla, offset -> string
+        buf[24:24 + len(msg)] = msg
+    elif registered is not None:
+        buf = bytearray(24)
+        struct.pack_into("<I5H", buf, 0, 16, 10, 8, 0, 0, 4)      # raíz, vtable (registered +4)
+        struct.pack_into("<ii", buf, 16, 12, registered)
+    else:
+        buf = bytearray(12)
+        struct.pack_into("<IHHi", buf, 0, 8, 4, 4, 4)             # tabla vacía
+    return struct.pack(">I", len(buf)) + bytes(buf)
+
+# ========= PROTOBUF (lectura mínima) =========
+def _pb_fields(buf):
+    """Itera (número de campo, valor) de un mensaje protobuf (varint o bytes)."""
+    i = 0
+    while i < len(buf):
+        key, i = _pb_varint(buf, i)
+        num, wire = key >> 3, key & 7
+        if wire == 0:
+            val, i = _pb_varint(buf, i)
+        elif wire == 2:
+            n, i = _pb_varint(buf, i)
+            val, i = bytes(buf[i:i + n]), i + n
+        else:
+            raise ValueError(f"wire type {wire} no soportado")
+        yield num, val
+
+def _pb_varint(buf, i):
+    shift = val = 0
+    while True:
+        b = buf[i]; i += 1
+        val |= (b & 0x7F) << shift
+        if not b & 0x80: return val, i
+        shift += 7
+
+def _pb_int32(v):
+    v &= 0xFFFFFFFF
+    return v - (1 << 32) if v & 0x80000000 else v
+
+PB_REPLY_OK = b"\x08\x01\x10\x01"   # HyperionReply{type: REPLY, success: true}
+
+def pb_encode_reply(error=None):
+    if error is None: return struct.pack(">I", len(PB_REPLY_OK)) + PB_REPLY_OK
+    msg = error.encode("utf-8")[:127]
+    body = b"\x08\x01\x10\x00\x1a" + bytes([len(msg)]) + msg
+    return struct.pack(">I", len(body)) + body
+
+# ========= STUB =========
+class HyperionStub:
+    """
+    Servidores HTTP/FlatBuffers/Protobuf en hilos. Con puerto 0 se elige uno libre
+    (ver self.ports). Los frames recibidos quedan en self.records; los perdidos
+    a propósito solo cuentan en self.lost.
+    """
+
+    def __init__(self, host="127.0.0.1", http_port=8090, fb_port=19400, proto_port=19445,
+                 n_leds=N, latency_ms=0.0, jitter_ms=0.0, loss=0.0, seed=None):
+        self.host = host
+        self.wanted = {"json": http_port, "flatbuffers": fb_port, "protobuf": proto_port}
+        self.n_leds = n_leds
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.rnd = random.Random(seed)
+        self.records = []
+        self.lost = 0
+        self.ports = {}
+        self._servers = []
+        self._lock = threading.Lock()
+
+    # --- ciclo de vida ---
+    def start(self):
+        handlers = {"json": _HttpHandler, "flatbuffers": _FlatHandler, "protobuf": _ProtoHandler}
+        for proto, port in self.wanted.items():
+            if port is None: continue
+            srv = _Server((self.host, port), handlers[proto])
+            srv.stub = self
+            self.ports[proto] = srv.server_address[1]
+            threading.Thread(target=srv.serve_forever, name=f"stub-{proto}", daemon=True).start()
+            self._servers.append(srv)
+        return self
+
+    def stop(self):
+        for srv in self._servers:
+            srv.shutdown()
+            srv.server_close()
+        self._servers = []
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.ports['json']}"
+
+    # --- registro ---
+    def accept(self, proto, nbytes, rgb, leds, duration):
+        """Registra un frame y aplica la red simulada. Devuelve el error o None."""
+        t = time.perf_counter()
+        valid = leds == self.n_leds
+        with self._lock:
+            lost = self.loss > 0 and self.rnd.random() < self.loss
+            delay = self.latency_ms + (self.rnd.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+            if lost: self.lost += 1
+            else:    self.records.append(FrameRecord(t, proto, nbytes, leds, duration, valid, rgb))
+        if delay > 0: time.sleep(delay / 1000.0)
+        if lost: return None   # El emisor no se entera: el frame simplemente no llega
+        if not valid: return f"Se esperaban {self.n_leds} LEDs y llegaron {leds}"
+        return None
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+            self.lost = 0
+
+    def report(self):
+        with self._lock:
+            recs = list(self.records)
+            lost = self.lost
+        if not recs: return f"sin frames (perdidos {lost})"
+        ts = [r.t for r in recs]
+        gaps = [(b - a) * 1000.0 for a, b in zip(ts, ts[1:])]
+        sizes = [r.nbytes for r in recs]
+        protos = sorted({r.proto for r in recs})
+        span = max(1e-6, ts[-1] - ts[0])
+        line = (f"{len(recs)} frames ({', '.join(protos)}), {(len(recs) - 1) / span if len(recs) > 1 else 0:.1f} fps, "
+                f"payload {min(sizes)}/{statistics.mean(sizes):.0f}/{max(sizes)} B, "
+                f"inválidos {sum(not r.valid for r in recs)}, perdidos {lost}")
+        if len(gaps) > 1:
+            line += (f", intervalo {statistics.mean(gaps):.1f} ms, jitter {statistics.pstdev(gaps):.2f} ms, "
+                     f"máx {max(gaps):.1f} ms")
+        return line
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+# ========= HANDLERS =========
+class _HttpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            req = json.loads(body)
+        except ValueError:
+            return self._reply({"success": False, "error": "JSON inválido"})
+        cmd = req.get("command")
+        if cmd != "color":
+            return self._reply({"command": cmd, "success": True})
+        color = req.get("color", [])
+        rgb = bytes(max(0, min(255, int(v))) for v in color)
+        err = self.server.stub.accept("json", len(body), rgb, len(color) // 3, req.get("duration", -1))
+        self._reply({"command": "color", "success": err is None, **({"error": err} if err else {})})
+
+    def _reply(self, obj):
+        # Cabeceras y cuerpo en un solo write: evita el parón Nagle/ACK retrasado
+        data = json.dumps(obj).encode("utf-8")
+        self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n" % len(data) + data)
+
+    def log_message(self, *args):
+        pass
+
+class _FramedHandler(socketserver.BaseRequestHandler):
+    """Mensajes con prefijo de 4 bytes big-endian, igual en FlatBuffers y Protobuf."""
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            head = self._recv(4)
+            if head is None: return
+            msg = self._recv(struct.unpack(">I", head)[0])
+            if msg is None: return
+            try:
+                reply = self.process(msg)
+            except (ValueError, IndexError, struct.error) as e:
+                reply = self.error_reply(f"Mensaje inválido: {e}")
+            self.request.sendall(reply)
+
+    def _recv(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk: return None
+            data += chunk
+        return data
+
+class _FlatHandler(_FramedHandler):
+    def error_reply(self, error):
+        return fb_encode_reply(error=error)
+
+    def process(self, msg):
+        req = _fb_table(msg, _fb_deref(msg, 0))
+        ctype = msg[req(0)] if req(0) is not None else 0
+        cmd_at = _fb_deref(msg, req(1))
+        cmd = _fb_table(msg, cmd_at)
+        if ctype == 4:   # Register
+            return fb_encode_reply(registered=_fb_int(msg, cmd(1), 0))
+        if ctype == 2:   # Image
+            raw = _fb_table(msg, _fb_deref(msg, cmd(1)))
+            rgb = _fb_bytes(msg, raw(0))
+            w, h = _fb_int(msg, raw(1), -1), _fb_int(msg, raw(2), -1)
+            err = self.server.stub.accept("flatbuffers", len(msg) + 4, rgb, w * h, _fb_int(msg, cmd(2), -1))
+            return fb_encode_reply(error=err)
+        return fb_encode_reply()
+
+class _ProtoHandler(_FramedHandler):
+    def error_reply(self, error):
+        return pb_encode_reply(error)
+
+    def process(self, msg):
+        fields = dict(_pb_fields(msg))
+        if fields.get(1) == 2 and 11 in fields:   # IMAGE + imageRequest
+            img = dict(_pb_fields(fields[11]))
+            rgb = img.get(3, b"")
+            w, h = _pb_int32(img.get(1, 0)), _pb_int32(img.get(2, 0))
+            err = self.server.stub.accept("protobuf", len(msg) + 4, rgb, w * h, _pb_int32(img.get(5, -1)))
+            return pb_encode_reply(err)
+        return pb_encode_reply()
+
+# ========= CLI =========
+def main():
+    p = argparse.ArgumentParser(description="Hyperion local de pruebas (json-rpc + FlatBuffers + Protobuf)")
+    p.add_argument("--bind", default="127.0.0.1")
+    p.add_argument("--http-port", type=int, default=8090)
+    p.add_argument("--fb-port", type=int, default=19400)
+    p.add_argument("--proto-port", type=int, default=19445)
+    p.add_argument("--leds", type=int, default=N, help=f"LEDs esperados (por defecto layout.N = {N})")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="Retardo añadido a cada respuesta")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="Variación uniforme ± sobre la latencia")
+    p.add_argument("--loss", type=float, default=0.0, help="Probabilidad de descartar un frame sin registrarlo (0..1)")
+    p.add_argument("--report-s", type=float, default=5.0, help="Cada cuánto imprimir el resumen")
+    args = p.parse_args()
+
+    stub = HyperionStub(args.bind, args.http_port, args.fb_port, args.proto_port, args.leds,
+                        args.latency_ms, args.jitter_ms, args.loss).start()
+    print(f"[Stub] Escuchando en {args.bind}: {stub.ports}")
+    try:
+        while True:
+            time.sleep(args.report_s)
+            print(f"[Stub] {stub.report()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+        print(f"[Stub] Final: {stub.report()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# latency.py
+# Latencia de salida: cuánto pasa desde que el show envía un frame hasta que
+# las luces lo muestran. Las luces iban por detrás del vídeo lo que tarda el
+# camino a Hyperion más el suavizado del controlador, y torre_reloj.py lo
+# compensaba a mano con --clock-offset/--car-offset. Con la latencia calibrada
+# los shows renderizan en t + latencia (lookahead) y los cues caen en su frame
+# de vídeo sin ajustar cada sala.
+#
+# Calibración (se guarda en CACHE_DIR/latency.json por salida y destino):
+#   python latency.py --stub                    contra hyperion_stub.py en este proceso:
+#                                               envío -> llegada, con las marcas de tiempo del stub
+#                                               (solo informa: el loopback no es la sala, no se guarda)
+#   python latency.py --output json --host URL  contra el Hyperion real: envío -> respuesta
+#                                               (cota superior: Hyperion aplica antes de responder)
+#   python latency.py --constant-ms 120         sin medir, un valor fijo
+# --device-ms suma lo que ninguna marca de tiempo ve (suavizado de Hyperion,
+# controlador LED). Los frames se envían por el mismo buzón en hilo que usan
+# los shows, así que la cola cuenta en la medida.
+
+import argparse
+import json
+import os
+import time
+
+from layout import N
+from output import DEFAULT_HOST, DIRECT_KINDS, OUTPUT_KINDS, open_output
+from scheduler import FrameScheduler
+from timeline import CACHE_DIR
+
+LATENCY_FILE = os.path.join(CACHE_DIR, "latency.json")
+
+def key(kind, host):
+    return f"{kind}@{host}"
+
+def load(path=LATENCY_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def lookup(kind, host, default=0.0, path=LATENCY_FILE):
+    """Latencia calibrada (s) para la salida `kind` hacia `host`, o default si no hay calibración."""
+    entry = load(path).get(key(kind, host))
+    return default if entry is None else float(entry["latency_s"])
+
+def lookahead(latency_ms, kind, host):
+    """Lookahead de un show: --latency-ms si se dio, si no el calibrado para su salida."""
+    return latency_ms / 1000.0 if latency_ms is not None else lookup(kind, host)
+
+def save(kind, host, latency_s, **info):
+    data = load()
+    data[key(kind, host)] = {"latency_s": round(latency_s, 4), "measured": time.strftime("%Y-%m-%d %H:%M"), **info}
+    os.makedirs(os.path.dirname(LATENCY_FILE), exist_ok=True)
+    tmp = f"{LATENCY_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, LATENCY_FILE)
+
+def _marker(k):
+    # Frame distinto en cada envío: el número de frame en los dos primeros bytes
+    rgb = bytearray(N * 3)
+    rgb[0], rgb[1], rgb[2] = k & 0xFF, (k >> 8) & 0xFF, 1
+    return bytes(rgb)
+
+def measure(out, frames=90, fps=30, stub=None):
+    """
+    Envía `frames` frames marcados a `fps` y devuelve los retrasos (s). Con stub
+    cada retraso va del send() a la llegada al stub; sin él, del send() a que el
+    backend recibe la respuesta (las latencias de sus stats).
+    """
+    sent = {}
+    sched = FrameScheduler(fps)
+    for k in sched.frames(frames):
+        sent[k] = time.perf_counter()
+        out.send(_marker(k), -1)
+    if hasattr(out, "flush"): out.flush(2.0)
+    if stub is None:
+        return list(out.stats.latencies)
+    time.sleep(0.2)
+    arrived = {}
+    for r in stub.records:
+        if len(r.rgb) >= 3 and r.rgb[2] == 1: arrived.setdefault(r.rgb[0] | (r.rgb[1] << 8), r.t)
+    return [arrived[k] - sent[k] for k in sent if k in arrived]
+
+def main():
+    p = argparse.ArgumentParser(description="Calibra la latencia de salida (envío -> luz) para el lookahead de los shows")
+    p.add_argument("--output", choices=OUTPUT_KINDS, default="json", help="Protocolo de salida que usará el show")
+    p.add_argument("--host", default=DEFAULT_HOST, help="URL de Hyperion (o IP del controlador para ddp/e131/artnet)")
+    p.add_argument("--stub", action="store_true", help="Medir contra hyperion_stub.py en este proceso")
+    p.add_argument("--stub-latency-ms", type=float, default=0.0, help="Latencia inyectada en el stub")
+    p.add_argument("--device-ms", type=float, default=0.0, help="Retardo fijo añadido (suavizado de Hyperion, controlador)")
+    p.add_argument("--constant-ms", type=float, default=None, help="No medir: guardar este valor")
+    p.add_argument("--frames", type=int, default=90)
+    p.add_argument("--fps", type=int, default=30)
+    args = p.parse_args()
+
+    if args.constant_ms is not None:
+        latency = (args.constant_ms + args.device_ms) / 1000.0
+        save(args.output, args.host, latency, method="constante")
+        print(f"[latencia] {key(args.output, args.host)}: {latency * 1e3:.1f} ms (constante) -> {LATENCY_FILE}")
+        return
+
+    stub = None
+    host = args.host
+    if args.stub:
+        if args.output in DIRECT_KINDS: p.error("--stub solo sirve para las salidas a Hyperion")
+        from hyperion_stub import HyperionStub
+        stub = HyperionStub(http_port=0, fb_port=0, proto_port=0, latency_ms=args.stub_latency_ms).start()
+        host = stub.url
+    out = open_output(args.output, host, origin="latency", timeout=2.0, background=True, keepalive_s=None)
+    if args.output in ("flatbuffers", "protobuf"):
+        out.inner.ack = True   # Sin réplica el envío no dice nada de cuándo llegó
+        if stub is not None: out.inner.addr = ("127.0.0.1", stub.ports[args.output])
+    try:
+        delays = measure(out, args.frames, args.fps, stub)
+    finally:
+        out.close()
+        if stub is not None: stub.stop()
+    if not delays:
+        print("[latencia] Ningún frame llegó: ¿está el destino en marcha?")
+        return
+    delays.sort()
+    p50, p90 = delays[len(delays) // 2], delays[int(len(delays) * 0.9)]
+    latency = p50 + args.device_ms / 1000.0
+    method = "stub" if stub is not None else "respuesta"
+    print(f"[latencia] {method}: p50 {p50 * 1e3:.1f} ms, p90 {p90 * 1e3:.1f} ms, máx {max(delays) * 1e3:.1f} ms, "
+          f"dispositivo {args.device_ms:.0f} ms")
+    if stub is not None:
+        print(f"[latencia] {latency * 1e3:.1f} ms contra el stub local: no se guarda como latencia de {key(args.output, args.host)}")
+        return
+    save(args.output, args.host, latency, method=method, p90_s=round(p90 + args.device_ms / 1000.0, 4))
+    print(f"[latencia] {key(args.output, args.host)}: {latency * 1e3:.1f} ms -> {LATENCY_FILE}")
+
+if __name__ == "__main__":
+    main()
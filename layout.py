@@ -4,6 +4,8 @@
 
 from typing import Dict, List
 
+import numpy as np
+
 # ========= CONSTANTES DE COLOR =========
 WHITE          = (255, 255, 255)
 ELECTRIC_BLUE  = (150, 200, 255)
@@ -69,6 +71,15 @@ def calculate_unified_layout():
 # --- EJECUCIÓN ---
 INDEX, FULL_PATH = calculate_unified_layout()
 
+def path_positions(path, n=N):
+    """Mapa inverso LED -> posición en path (array (n,), -1 si el LED no está en el path)."""
+    pos = np.full(n, -1, dtype=np.intp)
+    pos[path] = np.arange(len(path))
+    pos.setflags(write=False)
+    return pos
+
+FULL_PATH_POS = path_positions(FULL_PATH)
+
 # --- DEFINICIÓN DE ZONAS ---
 ZONE4 = INDEX["B_L"] + INDEX["B_T"] + INDEX["B_R"]
 ZONE3 = INDEX["M_L"] + INDEX["M_T"] + INDEX["M_R"]
@@ -81,17 +92,112 @@ ZONE1_SET, ZONE2_SET, ZONE3_SET, ZONE4_SET, ZONE0_SET, ZONE_FIRE_SET = \
     set(ZONE1), set(ZONE2), set(ZONE3), set(ZONE4), set(ZONE0), set(ZONE_FIRE)
 
 # --- MAPA DE PROPIEDADES DE ZONA ---
+# gamma: None usa el GAMMA del show; white_balance: ganancia R,G,B de salida.
+# Cada estante lleva un lote de tira distinto y se calibra aquí por zona.
+# white_allowed: False hace que la salida cambie el blanco por WHITE_SUBSTITUTE;
+# max_brightness (opcional): tope 0..255 del canal más alto de cada LED de la zona.
 ZONE_PROPERTIES_MAP = {
-    "ZONE0": {"set": ZONE0_SET, "white_allowed": True},
-    "ZONE1": {"set": ZONE1_SET, "white_allowed": True},
-    "ZONE2": {"set": ZONE2_SET, "white_allowed": False},
-    "ZONE3": {"set": ZONE3_SET, "white_allowed": False},
-    "ZONE4": {"set": ZONE4_SET, "white_allowed": False},
-    "ZONE_FIRE": {"set": ZONE_FIRE_SET, "white_allowed": True}, # Fuego permite blanco/amarillo intenso
+    "ZONE0": {"set": ZONE0_SET, "white_allowed": True,  "gamma": None, "white_balance": (1.0, 1.0, 1.0)},
+    "ZONE1": {"set": ZONE1_SET, "white_allowed": True,  "gamma": None, "white_balance": (1.0, 1.0, 1.0)},
+    "ZONE2": {"set": ZONE2_SET, "white_allowed": False, "gamma": None, "white_balance": (1.0, 1.0, 1.0)},
+    "ZONE3": {"set": ZONE3_SET, "white_allowed": False, "gamma": None, "white_balance": (1.0, 1.0, 1.0)},
+    "ZONE4": {"set": ZONE4_SET, "white_allowed": False, "gamma": None, "white_balance": (1.0, 1.0, 1.0)},
+    "ZONE_FIRE": {"set": ZONE_FIRE_SET, "white_allowed": True, "gamma": None, "white_balance": (1.0, 1.0, 1.0)}, # Fuego permite blanco/amarillo intenso
 }
+WHITE_SUBSTITUTE = ELECTRIC_BLUE   # Lo que se ve en lugar de blanco en las zonas sin blanco
+
+# --- ÍNDICE DE ZONAS POR LED ---
+# Se construye una vez al importar: ZONE_ID[i] es la posición en ZONE_NAMES de la
+# zona del LED i (-1 si no tiene). Si un LED está en dos zonas gana la primera del mapa.
+ZONE_NAMES = list(ZONE_PROPERTIES_MAP)
+
+def calculate_zone_ids(zones=ZONE_PROPERTIES_MAP, n=N):
+    ids = np.full(n, -1, dtype=np.intp)
+    for k, props in reversed(list(enumerate(zones.values()))):
+        ids[[i for i in props["set"] if 0 <= i < n]] = k
+    ids.setflags(write=False)
+    return ids
+
+ZONE_ID = calculate_zone_ids()
+
+def property_mask(prop, default=False, zones=ZONE_PROPERTIES_MAP, zone_id=ZONE_ID):
+    """Máscara booleana (N,) con la propiedad `prop` de la zona de cada LED."""
+    values = np.array([bool(p.get(prop, default)) for p in zones.values()] + [default])
+    mask = values[zone_id]   # -1 cae en el último valor: LEDs sin zona
+    mask.setflags(write=False)
+    return mask
+
+WHITE_ALLOWED_MASK = property_mask("white_allowed")
 
 def white_allowed(i: int) -> bool:
-    for props in ZONE_PROPERTIES_MAP.values():
-        if i in props["set"]:
-            return props["white_allowed"]
-    return False
\ No newline at end of file
+    return 0 <= i < N and bool(WHITE_ALLOWED_MASK[i])
+
+# --- GEOMETRÍA ---
+# Posición física normalizada de cada segmento: x de -1 (izquierda) a +1 (derecha),
+# y de -1 (estante de abajo) hacia arriba. Cada entrada es una polilínea que va
+# del primer al último LED en el orden de INDEX; los LEDs se reparten a distancia
+# constante a lo largo de ella. Fuego y estante 0 están medidos a ojo: ajustar aquí.
+SEGMENT_GEOMETRY = {
+    "B_L": [(-1.0, -1.0), (-1.0, -0.33)],
+    "B_T": [(-0.9, -0.33), (+0.9, -0.33)],
+    "B_R": [(+1.0, -1.0), (+1.0, -0.33)],
+    "M_R": [(+1.0, -0.1), (+1.0, +0.33)],
+    "M_T": [(-0.9, +0.12), (+0.9, +0.12)],
+    "M_L": [(-1.0, -0.1), (-1.0, +0.33)],
+    "Z_FIRE": [(-0.45, +0.45), (+0.45, +0.45)],
+    "T_L": [(-1.0, +0.6), (-1.0, +1.0)],
+    "T_T": [(-0.9, +0.85), (+0.9, +0.85)],
+    "T_R": [(+1.0, +0.6), (+1.0, +1.0)],
+    "Z1_R": [(+1.0, +1.05), (+1.0, +1.30)],
+    "Z1_T": [(-0.9, +1.25), (+0.9, +1.25)],
+    "Z1_L": [(-1.0, +1.05), (-1.0, +1.30)],
+    "Z0_Special": [(-0.9, +1.45), (-0.35, +1.45), (-0.35, +1.85)],  # Escuadra: 6 horizontales + 5 verticales
+}
+
+def calculate_coordinates(index=INDEX, geometry=SEGMENT_GEOMETRY, n=N):
+    """Array (n, 2) con la posición (x, y) de cada LED. Los segmentos que no estén en index se ignoran."""
+    xy = np.zeros((n, 2))
+    for name, points in geometry.items():
+        ids = index.get(name)
+        if not ids: continue
+        points = np.asarray(points, dtype=float)
+        arc = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))
+        t = np.linspace(0.0, arc[-1], len(ids))
+        xy[ids, 0] = np.interp(t, arc, points[:, 0])
+        xy[ids, 1] = np.interp(t, arc, points[:, 1])
+    xy.setflags(write=False)
+    return xy
+
+LED_XY = calculate_coordinates()
+
+_POLAR_CACHE = {}
+def polar_coordinates(center=(0.0, 0.0), xy=LED_XY):
+    """
+    (radio, ángulo) de cada LED respecto a center, con el ángulo en vueltas 0..1
+    (0 apuntando a -x). Se calcula una vez por array de posiciones y centro.
+    """
+    key = (id(xy), float(center[0]), float(center[1]))
+    entry = _POLAR_CACHE.get(key)
+    # La entrada guarda xy: mientras exista, su id() no lo puede reutilizar otro array
+    if entry is None or entry[0] is not xy:
+        d = xy - np.asarray(center, dtype=float)
+        radius = np.hypot(d[:, 0], d[:, 1])
+        angle = (np.arctan2(d[:, 1], d[:, 0]) + np.pi) / (2 * np.pi)
+        radius.setflags(write=False); angle.setflags(write=False)
+        entry = _POLAR_CACHE[key] = (xy, radius, angle)
+    return entry[1:]
+
+# --- SALIDA DIRECTA A CONTROLADOR (DDP / E1.31 / Art-Net) ---
+# Para instalaciones donde la tira la maneja un WLED/ESP sin pasar por Hyperion.
+# DDP direcciona por píxel; E1.31 y Art-Net por universos DMX de 512 canales,
+# así que cada universo lleva como máximo 170 LEDs RGB (510 canales).
+DDP_PIXEL_OFFSET      = 0     # Primer píxel de la tira dentro del controlador
+DMX_UNIVERSE_START    = 1     # Universo del LED 0
+DMX_LEDS_PER_UNIVERSE = 170
+
+def calculate_universe_map(n=N, start=DMX_UNIVERSE_START, per_universe=DMX_LEDS_PER_UNIVERSE):
+    """Lista de (universo, primer LED, nº de LEDs) que cubre la tira completa."""
+    return [(start + k, first, min(per_universe, n - first))
+            for k, first in enumerate(range(0, n, per_universe))]
+
+UNIVERSE_MAP = calculate_universe_map()
@@ -3,14 +3,26 @@
 # libios_show_v2b.py — Disparos también en el nuevo estante (Zona 1)
 # REFACTORIZADO: Usa layout.py unificado para 132 LEDs
 
-import os, time, math, random, json, socket, subprocess, atexit, argparse, requests
+import os, math, subprocess, atexit, argparse
+import numpy as np
 from typing import List
 
 # Importamos toda la definición física y lógica
 from layout import * 
+from frame import Frame, OutputLut, ZoneConstraints, as_index
+from particles import scatter
+from timeline import load_show
+from prerender import prerender, source_key
+from mpv_clock import JUMP_S, PlaybackClock
+from runtime import AsyncMpvClient, AsyncOutput, ShowRuntime
+from scheduler import FrameScheduler
+import latency # Lookahead calibrado de la salida
+import rng # Aleatoriedad con semilla por show y por frame
+from output import DIRECT_KINDS, OUTPUT_KINDS, open_output
 # ========= CONFIG =========
 VIDEO_FILE_DEFAULT = "/home/pi/libios.mp4"
 HOST       = "http://localhost:8090"
+CONTROLLER_HOST = "192.168.1.60"  # Solo para salida directa (--output ddp/e131/artnet)
 TOKEN      = None
 PRIORITY   = 64
 ORIGIN     = "bttf_libios"
@@ -19,40 +31,26 @@ GAMMA      = 1.0
 AUDIO_DEVICE = "alsa/hdmi:CARD=vc4hdmi,DEV=0"
 
 # ========= COLOR/UTILS =========
-def clamp(x): return max(0, min(255, int(x)))
 def lerp(a, b, t): return a + (b - a) * t
 def mix(c1, c2, t): return (lerp(c1[0], c2[0], t), lerp(c1[1], c2[1], t), lerp(c1[2], c2[2], t))
 def scale(c, k): return (c[0]*k, c[1]*k, c[2]*k)
 
-def apply_gamma(c):
-    if GAMMA == 1.0: return c
-    r,g,b = c
-    gfun = lambda v: 255*((v/255.0)**GAMMA)
-    return (gfun(r), gfun(g), gfun(b))
-
-def pack(pixels):
-    flat=[]
-    for r,g,b in pixels:
-        r,g,b = apply_gamma((r,g,b))
-        flat += [clamp(r),clamp(g),clamp(b)]
-    return flat
-
-headers = {"Content-Type":"application/json"}
-if TOKEN: headers["Authorization"]=f"Bearer {TOKEN}"
-
-def send_frame(pixels, duration=-1):
-    payload = {"command":"color","color":pack(pixels),
-               "priority":PRIORITY,"origin":ORIGIN,"duration":duration}
-    try:
-        requests.post(f"{HOST}/json-rpc", headers=headers, json=payload, timeout=2)
-    except Exception:
-        pass
+LUT = OutputLut(GAMMA)   # Gamma y balance de blancos por zona (layout.py)
+CONSTRAINTS = ZoneConstraints()   # Sin blanco en las zonas 2-4 (solo en los frames guardados)
+
+def pack(px, guarded=False):
+    return px.pack(LUT, CONSTRAINTS if guarded else None)
+
+output = None   # La abre main() solo si hay show: importar el módulo (prerender, benchs) no toca Hyperion
+
+def send_frame(px, duration=-1, guarded=False):
+    output.send(pack(px, guarded), duration)
+
+def frame_fill(c): return Frame.fill(c)
 
-def frame_fill(c): return [c]*N
-def add(px, i, c):
-    if 0<=i<N:
-        r,g,b = px[i]; cr,cg,cb = c
-        px[i]=(r+cr,g+cg,b+cb)
+FULL_PATH_IDX = as_index(FULL_PATH)
+FULL_PATH_REV = FULL_PATH_IDX[::-1].copy()
+TOP_ZONE = ZONE1   # police_sirens_fullrun lo usaba sin definir (NameError en la sirena)
 
 # ========= EFECTOS =========
 def idle_ambient(t):
@@ -60,61 +58,49 @@ def idle_ambient(t):
     return frame_fill(scale(DEEP_BLUE, k))
 
 def crackle(px, indices, spread=2, density=0.7, base=(255,255,255), mix_with=(0,0,0), mix_amt=0.2):
-    for c in indices:
-        for j in range(-spread, spread+1):
-            i = c + j
-            if 0<=i<N and random.random() < density*(1 - abs(j)/(spread+1)):
-                col = mix(base, mix_with, mix_amt)
-                add(px, i, col)
+    idx, _ = scatter(indices, spread, density)
+    px.add(idx, mix(base, mix_with, mix_amt))
+
+MUZZLE_COLOR = np.add(scale(WHITE, 2.5), scale(RED_SIREN, 0.25))
 
 def muzzle_blast_white(px, zones: List[List[int]], width=5, density=0.95):
-    for zone in zones:
-        if not zone: continue
-        centers = random.sample(zone, k=max(1, len(zone)//12))
-        for c in centers:
-            for j in range(-width, width+1):
-                i = c+j
-                if 0<=i<N and random.random()<density*(1 - abs(j)/(width+1)):
-                    add(px, i, scale(WHITE, 2.5*(1-abs(j)/(width+1))))
-                    add(px, i, scale(RED_SIREN, 0.25*(1-abs(j)/(width+1))))
-
-def sweep_path(px, path: List[int], color, width=7, pos=0.0, gain=1.8):
+    # Los centros de todas las zonas en un único scatter
+    centers = [rng.sample(zone, k=max(1, len(zone)//12)) for zone in zones if zone]
+    if not centers: return
+    idx, fall = scatter(np.concatenate(centers), width, density)
+    px.add(idx, MUZZLE_COLOR, fall)
+
+def sweep_path(px, path, color, width=7, pos=0.0, gain=1.8):
+    path = as_index(path)
     m=len(path)
     if m==0: return
     head = int(lerp(0, m-1, pos))
-    for k in range(width+1):
-        idx = head - k
-        if 0 <= idx < m:
-            led = path[idx]
-            fade = max(0.0, 1.0 - k/width)
-            add(px, led, scale(color, gain*fade))
-
-def tunnel_effect(px, path: List[int], speed_phase: float, strength=1.6, tail=12, color=ELECTRIC_BLUE):
+    k = np.arange(width+1)
+    idx = head - k
+    ok = (idx >= 0) & (idx < m)
+    px.add(path[idx[ok]], color, gain*np.maximum(0.0, 1.0 - k[ok]/width))
+
+def tunnel_effect(px, path, speed_phase: float, strength=1.6, tail=12, color=ELECTRIC_BLUE):
+    path = as_index(path)
     m = len(path)
     if m==0: return
     head_pos = (speed_phase % 1.0) * (m-1)
     head = int(head_pos)
-    for j in range(tail):
-        idx = head - j
-        if 0 <= idx < m:
-            led = path[idx]
-            k = max(0.0, 1.0 - j/tail)
-            add(px, led, scale(color, strength*k))
-            if led-1>=0: add(px, led-1, scale(color, 0.45*k))
-            if led+1<N:  add(px, led+1, scale(color, 0.45*k))
+    j = np.arange(tail)
+    idx = head - j
+    ok = (idx >= 0) & (idx < m)
+    led = path[idx[ok]]
+    k = np.maximum(0.0, 1.0 - j[ok]/tail)
+    px.add(np.concatenate((led, led-1, led+1)), color, np.concatenate((strength*k, 0.45*k, 0.45*k)))
 
 def pulse_zone(px, zone, color_a, color_b, phase, gain=1.0):
     k = 0.5 + 0.5*math.sin(phase*2*math.pi)
     col = mix(color_a, color_b, k)
-    for i in zone: add(px, i, scale(col, gain))
+    px.add(zone, col, gain)
 
 def one_frame_white_guarded():
-    px = frame_fill((0,0,0))
-    # Usa la función white_allowed importada de layout.py
-    for i in range(N):
-        if white_allowed(i): add(px, i, scale(WHITE, 2.5))
-        else:                add(px, i, scale(ELECTRIC_BLUE, 2.2))
-    send_frame(px, duration=int(1000/FPS))
+    # CONSTRAINTS lo deja en azul eléctrico fuera de las zonas que admiten blanco
+    return Frame.black().add_all(WHITE, 2.5)
 
 def police_sirens_fullrun(px, t, t0, duration=3.0):
     u = max(0.0, min(1.0, (t - t0)/duration))
@@ -124,8 +110,8 @@ def police_sirens_fullrun(px, t, t0, duration=3.0):
     colA = BLUE_SIREN if toggle==0 else RED_SIREN
     colB = RED_SIREN  if toggle==0 else BLUE_SIREN
     # FULL_PATH viene de layout.py
-    sweep_path(px, FULL_PATH, colA, width=7, pos=phase, gain=1.8)
-    sweep_path(px, list(reversed(FULL_PATH)), colB, width=7, pos=phase, gain=1.8)
+    sweep_path(px, FULL_PATH_IDX, colA, width=7, pos=phase, gain=1.8)
+    sweep_path(px, FULL_PATH_REV, colB, width=7, pos=phase, gain=1.8)
     pulse_zone(px, TOP_ZONE, BLUE_SIREN, RED_SIREN, phase=t*1.1, gain=0.15)
 
 # ========= SPEED FEEL =========
@@ -136,29 +122,26 @@ TRAIL_LEN_MAX        = 28
 TUNNEL_GAIN_BASE     = 1.6
 TUNNEL_GAIN_MAX      = 3.0
 BLUR_DECAY           = 0.45
-
-prev_px = None
+BLUR_FRAMES          = 8      # Frames que suma la estela (0.45^8 < 0.2 %: lo que queda no se ve)
 
 def roadside_markers(px, path, t, v, dash_gap=6):
+    path = as_index(path)
     m = len(path)
     if m == 0: return
     speed = 0.6 + 3.0*v
     phase = (t*speed) % 1.0
     step  = max(3, int(8 - 5*v))
-    for k in range(0, m, step):
-        idx = int((k + phase*(step)) % m)
-        led = path[idx]
-        add(px, led, scale(WHITE, 1.6 + 1.2*v))
-        if led-1 >= 0: add(px, led-1, scale(AMBER_SOFT, 0.6 + 0.6*v))
-        if led+1 < N:  add(px, led+1, scale(AMBER_SOFT, 0.6 + 0.6*v))
+    idx = ((np.arange(0, m, step) + phase*step) % m).astype(np.intp)
+    led = path[idx]
+    px.add(led, WHITE, 1.6 + 1.2*v)
+    px.add(np.concatenate((led-1, led+1)), AMBER_SOFT, 0.6 + 0.6*v)
 
 def warp_strobe(px, t, v):
     hz = SPEED_STROBE_BASE_HZ + (SPEED_STROBE_MAX_HZ - SPEED_STROBE_BASE_HZ)*v
     on = (int(t*hz) % 2) == 0
     if on:
         k = 0.6 + 0.6*v
-        for i in range(N):
-            add(px, i, scale(WHITE, k))
+        px.add_all(WHITE, k)
 
 def parallax_tunnel_bundle(px, t, v, accel_phase, side_path, top_path, right_path, color):
     tail = int(TRAIL_LEN_BASE + (TRAIL_LEN_MAX - TRAIL_LEN_BASE)*v)
@@ -168,55 +151,47 @@ def parallax_tunnel_bundle(px, t, v, accel_phase, side_path, top_path, right_pat
     tunnel_effect(px, right_path, accel_phase*1.18, strength=gain*1.05, tail=tail, color=color)
 
 # ========= TIMELINE =========
-def s_f(sec, frame): return sec + frame/24.0
-T_VAN_APPEAR      = s_f(23,5)
-T_SHOTS_START     = s_f(29,0)
-SHOT_IMPACTS      = [s_f(30,15), s_f(31,12), s_f(38,16), s_f(41,16), s_f(44,4)]
-DOC_BURST_START   = s_f(53,15)
-DOC_BURST_END     = s_f(56,17)
-GUN_JAM           = 74.0
-MARTY_TO_DELOREAN = 80.0
-DELOREAN_START    = s_f(94,10)
-TIME_CIRCUITS_ON  = s_f(105,2) - 0.4
-TIME_CIRCUITS_LEN = 3.0
-ACCEL1_START      = 131.0
-ACCEL1_END        = s_f(136,10)
-MORTAR_AIM        = 150.0
-ACCEL2_START      = s_f(160,4)
-JUMP_88MPH        = 176.0
-JUMP_FLASH_END    = 178.5
-SHOW_END_APPROX   = s_f(181,0)
-
-AUTO_SHOTS = [
-    30.52, 30.66, 30.87, 31.01, 31.14, 31.28, 37.44, 37.87, 38.08, 38.75,
-    38.87, 39.49, 43.16, 43.30, 43.58, 43.97, 46.67, 53.42, 53.63, 53.80,
-    53.97, 54.12, 54.27, 54.43, 54.59, 54.72, 54.89, 55.01, 55.18, 55.39,
-    55.54, 55.74, 55.91, 56.07, 56.26, 56.41, 56.60, 56.74, 57.67, 58.06,
-    63.54, 63.74, 63.92, 64.10, 64.26, 64.45, 64.64, 64.84, 65.02,
-    103.90, 112.63, 112.78, 112.92, 116.67, 118.60, 120.25, 122.80,
-    149.57, 159.86, 163.60, 163.72, 164.80, 169.80, 175.72, 176.70,
-    176.86, 177.03, 177.16, 177.29, 177.41, 177.53, 179.21, 179.33,
-    179.55, 179.68
-]
+# Tiempos y cues en timelines/libios.json (o el fichero de --timeline); aquí solo
+# los efectos que sabe pintar run_show, para validar el fichero al cargarlo
+EFFECTS = ("siren", "shots_start", "impact", "audshot", "doc_burst", "marty_in", "delorean",
+           "time_circuits", "accel1", "mortar", "accel2", "jump", "jump_white")
+TIMELINE_FILE = "libios.json"
+
+_bases = {}   # Frames sin estela por índice de frame (y semilla): la estela los reutiliza
+
+def load_timeline(path=TIMELINE_FILE):
+    """Carga el show y publica sus tiempos (T_VAN_APPEAR, JUMP_88MPH...) como globales del módulo."""
+    global SHOW, CUES, ACCEL1, ACCEL2
+    SHOW = load_show(path, effects=EFFECTS)
+    globals().update(SHOW.times)
+    CUES = SHOW.timeline()
+    spans = {name: (start, end) for start, end, name, _ in reversed(SHOW.cues) if end is not None}
+    ACCEL1, ACCEL2 = spans.get("accel1"), spans.get("accel2")
+    _bases.clear()
+
+load_timeline()
 
 # ========= MPV IPC =========
 SOCK_PATH = "/tmp/mpv-libios.sock"
 MPV_LOG   = "/tmp/mpv-libios.log"
 mpv_proc  = None
-ipc_sock  = None
+mpv       = AsyncMpvClient()   # Lo conecta y lo lee el runtime asyncio
+clock     = PlaybackClock()   # time-pos interpolado: el render no espera al IPC
 
 def cleanup():
+    clock.stop()
     try:
-        if ipc_sock: ipc_sock.close()
+        mpv.close()
     except: pass
     try:
         if mpv_proc and mpv_proc.poll() is None:
             mpv_proc.terminate()
     except: pass
-    try:
-        send_frame(frame_fill((0,0,0)), duration=500)
-    except: pass
-atexit.register(cleanup)
+    if output is not None:
+        try:
+            send_frame(frame_fill((0,0,0)), duration=500)
+        except: pass
+        output.close()
 
 def start_mpv(video_path):
     global mpv_proc
@@ -236,217 +211,236 @@ def start_mpv(video_path):
     logf = open(MPV_LOG, "w")
     mpv_proc = subprocess.Popen(cmd, stdout=logf, stderr=logf)
 
-def connect_ipc(timeout=10.0):
-    t0=time.time()
-    while time.time()-t0<timeout:
-        if os.path.exists(SOCK_PATH): break
-        time.sleep(0.05)
-    global ipc_sock
-    t0=time.time()
-    while time.time()-t0<timeout:
-        try:
-            s=socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            s.connect(SOCK_PATH)
-            ipc_sock=s
-            return
-        except Exception:
-            time.sleep(0.05)
-    raise RuntimeError("No se pudo conectar al socket IPC de mpv")
-
-def mpv_get_prop(prop: str, timeout=0.2):
-    req={"command":["get_property", prop],"request_id":1}
-    if not ipc_sock: return None
-    try:
-        ipc_sock.sendall((json.dumps(req)+"\n").encode("utf-8"))
-        ipc_sock.settimeout(timeout)
-        data=b""
-        while True:
-            chunk=ipc_sock.recv(4096)
-            if not chunk: break
-            data+=chunk
-            if b"\n" in data:
-                lines=data.split(b"\n")
-                for line in lines:
-                    if not line.strip(): continue
-                    try:
-                        msg=json.loads(line.decode("utf-8"))
-                        if msg.get("request_id")==1 and msg.get("error")=="success":
-                            return msg.get("data")
-                    except: continue
-                break
-    except Exception:
-        return None
-    return None
-
 # ========= COREOGRAFÍA =========
-def run_show(video_path):
-    global prev_px
-    random.seed()
+# CONSTRUCCIÓN DE PATHS UNIFICADOS
+# Usamos las claves del INDEX que definimos en layout.py
+# INDEX["Z1_L"] son los 9 LEDs de la izquierda superior, etc.
+SIDE_PATH  = as_index(INDEX["B_L"] + INDEX["M_L"] + INDEX["T_L"] + INDEX["Z1_L"])
+TOP_PATH   = as_index(ZONE2 + INDEX["Z1_T"]) # (ZONE2 es todo el nivel T_L+T_T+T_R) + Techo superior
+RIGHT_PATH = as_index(INDEX["B_R"] + INDEX["M_R"] + INDEX["T_R"] + INDEX["Z1_R"])
+
+# ========= RENDER =========
+# render_frame(t) no guarda estado entre frames: lo que antes se acumulaba frame a
+# frame (cues disparados, fase y velocidad del túnel, estela) sale de t y del
+# timeline. Se puede pedir cualquier instante en cualquier orden (seek en ensayo,
+# prerender por trozos) y da lo mismo que el show visto desde el principio.
+ACCEL1_SPEED_END = 1.4   # Velocidad al final de la aceleración 1 (0.6 + 0.8*v, v = 1): el suelo de la 2
+
+def accel_phase(t):
+    """
+    Fase acumulada del túnel en t. Antes cada frame de accel1 sumaba
+    0.035 + 0.12*speed y cada uno de accel2 0.05 + 0.25*speed; aquí esas sumas se
+    integran en forma cerrada (speed es lineal por tramos en el tiempo).
+    """
+    phase = 0.0
+    if ACCEL1 and t > ACCEL1[0]:
+        d = max(1e-9, ACCEL1[1] - ACCEL1[0])
+        u = min(t, ACCEL1[1]) - ACCEL1[0]
+        phase += FPS * (0.035*u + 0.12*(0.6*u + 0.4*u*u/d))
+    if ACCEL2 and t > ACCEL2[0]:
+        d = max(1e-9, ACCEL2[1] - ACCEL2[0])
+        u = min(t, ACCEL2[1]) - ACCEL2[0]
+        floor = ACCEL1_SPEED_END if ACCEL1 else 0.0
+        knee = min(u, max(0.0, (floor - 1.2) / 2.2 * d))   # Hasta aquí manda el suelo
+        speed = floor*knee + (1.2*(u - knee) + 1.1*(u*u - knee*knee)/d if u > knee else 0.0)
+        phase += FPS * (0.05*u + 0.25*speed)
+    return phase
+
+def grid_since(t):
+    """Inicio (exclusivo) del frame de t en la rejilla de FPS: el instante del frame anterior."""
+    return (math.ceil(t*FPS - 1e-6) - 1) / FPS
+
+def render_frame(t, since=None):
+    """
+    Frame del show en el instante t del vídeo: (Frame, guarded). Los cues puntuales
+    suenan si caen en (since, t]; since es por defecto el frame anterior de la
+    rejilla de FPS (en directo, el tiempo del frame enviado antes).
+    """
+    if since is None: since = grid_since(t)
+    px, guarded, trail = render_layers(t, since)
+    if trail is not None:
+        # Estela: los frames anteriores del mismo tramo con peso BLUR_DECAY^j
+        k = math.ceil(t*FPS - 1e-6)
+        if abs(t*FPS - k) < 1e-6 and since == (k - 1) / FPS:
+            _bases[(rng.show_seed, k)] = px.copy()   # En la rejilla: el frame siguiente lo reutiliza
+        for j in range(1, BLUR_FRAMES):
+            tj = (k - j) / FPS
+            if tj < trail: break
+            px.blend(_base(k - j), BLUR_DECAY ** j)
+    return px, guarded
+
+def _base(k):
+    key = (rng.show_seed, k)
+    px = _bases.get(key)
+    if px is None:
+        if len(_bases) > 4 * BLUR_FRAMES: _bases.clear()
+        px = _bases[key] = render_layers(k / FPS, (k - 1) / FPS)[0]
+    return px
+
+def render_layers(t, since):
+    """Frame en t sin la estela: (Frame, guarded, inicio del tramo con estela o None)."""
+    # Cada frame del vídeo sortea lo mismo en cada pase con la misma semilla
+    rng.cue("libios", int(t * FPS + 1e-6))   # Mismo índice que FrameCache.index: k/FPS*FPS puede quedar en k-1
+
+    px = idle_ambient(t or 0.0)
+    guarded = False
+    trail = None
+    now = CUES.query(t, since)   # Solo los cues que caen en este frame o siguen activos en t
+
+    # 1) Entrada van: sirena
+    if "siren" in now:
+        police_sirens_fullrun(px, t, T_VAN_APPEAR, duration=3.0)
+
+    # 2) Inicio disparos: todas las zonas
+    if "shots_start" in now:
+        muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
+
+    # Impactos puntuales
+    for _ in now.get("impact", ()):
+        muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
+        crackle(px, (ZONE2[::3] + ZONE1[::4]), spread=2, density=0.8, base=WHITE, mix_with=(0,0,0), mix_amt=0.15)
+
+    # 3) Disparos adicionales
+    for _ in now.get("audshot", ()):
+        muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
+        crackle(px, (ZONE2[::2] + ZONE1[::3]), spread=3, density=0.85, base=WHITE, mix_with=(0,0,0), mix_amt=0.10)
+
+    # 4) Doc acribillado
+    if "doc_burst" in now:
+        if int(t*24)%2==0:
+            muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
+        crackle(px, (ZONE2[::2] + ZONE1[::3]), spread=3, density=0.85, base=WHITE, mix_with=(0,0,0), mix_amt=0.10)
+
+    # 5) Marty + motor en Zona 3 (Middle)
+    if "marty_in" in now:
+        px.add_all(ELECTRIC_BLUE, 0.8)
+    if "delorean" in now:
+        if "time_circuits" not in now:
+            pulse_zone(px, ZONE3, AMBER_SOFT, YELLOW_WARM, phase=t*0.75, gain=0.35)
+
+    # 6) Time Circuits (2–4)
+    if "time_circuits" in now:
+        pulse_zone(px, ZONE2, RED_SIREN,      RED_SIREN,      phase=t*0.5,      gain=0.45)
+        pulse_zone(px, ZONE3, GREEN_CIRCUITS, GREEN_CIRCUITS, phase=t*0.5+0.33, gain=0.35)
+        pulse_zone(px, ZONE4, AMBER_SOFT,     AMBER_SOFT,     phase=t*0.5+0.66, gain=0.30)
+
+    # 7) Aceleración 1
+    if "accel1" in now:
+        cue = now["accel1"][0]
+        v = cue.progress(t)
+        trail = cue.start
+
+        color_flux = mix(AMBER_SOFT, ORANGE_INTENSE, 0.5 + 0.5*math.sin(t*2.0))
+
+        parallax_tunnel_bundle(px, t, v, accel_phase(t),
+                               SIDE_PATH,
+                               TOP_PATH,
+                               RIGHT_PATH,
+                               color_flux)
+
+        roadside_markers(px, SIDE_PATH,  t, v)
+        roadside_markers(px, TOP_PATH,   t, v)
+        roadside_markers(px, RIGHT_PATH, t, v)
+
+        warp_strobe(px, t, v*0.7)
+
+        crackle(px, np.arange(0, N, 4), spread=2, density=0.30,
+                base=color_flux, mix_with=WHITE, mix_amt=0.20)
+
+    # 8) Mortero/alarma
+    if "mortar" in now:
+        phase = (t-MORTAR_AIM)
+        ring = 0.5 + 0.5*math.sin(phase*4.0*math.pi)
+        px.add(ZONE2, RED_SIREN, 0.7*ring)
+        px.add(ZONE3, RED_SIREN, 0.35*ring)
+        px.add(ZONE4, RED_SIREN, 0.25*ring)
+
+    # 9) Aceleración final
+    if "accel2" in now:
+        cue = now["accel2"][0]
+        v = cue.progress(t)
+        trail = cue.start
+
+        color_flux = mix(AMBER_SOFT, ORANGE_INTENSE, 0.5 + 0.5*math.sin(t*3.0))
+
+        parallax_tunnel_bundle(px, t, v, accel_phase(t),
+                               SIDE_PATH,
+                               TOP_PATH,
+                               RIGHT_PATH,
+                               color_flux)
+
+        roadside_markers(px, SIDE_PATH,  t, v)
+        roadside_markers(px, TOP_PATH,   t, v)
+        roadside_markers(px, RIGHT_PATH, t, v)
+
+        warp_strobe(px, t, v)
+
+        crackle(px, np.arange(0, N, 3), spread=2, density=0.25+0.5*v,
+                base=color_flux, mix_with=WHITE, mix_amt=0.25)
+
+    # 10) Salto temporal — blanco guardado (solo Zona 1)
+    if "jump" in now:
+        guarded = True
+        p=(t-JUMP_88MPH)/max(0.01, (JUMP_FLASH_END-JUMP_88MPH))
+        if int(t*24)%2==0:
+            px.add_all(ELECTRIC_BLUE, 3.2*(0.8+0.4*math.sin(6.28*p)))
+        else:
+            px.add_all(WHITE, 2.5)
+        if "jump_white" in now:
+            px = one_frame_white_guarded()   # Primer frame del salto: blanco entero
+
+    return px, guarded, trail
+
+# ========= PRERENDER =========
+PRERENDER_SEED = 0   # Semilla por defecto de la caché (sin --seed)
+
+def _prerender_init(timeline, seed):
+    # Proceso del pool (o este, en serie): mismo timeline y semilla que el show
+    if SHOW.path != timeline: load_timeline(timeline)
+    rng.seed_show(seed)
+
+def render_bytes(t):
+    px, guarded = render_frame(t)
+    return pack(px, guarded)
+
+def prerender_job(seed=PRERENDER_SEED):
+    """Argumentos de prerender() para el show entero con `seed` (todos picklables, para el pool)."""
+    key = source_key("libios", seed, FPS, GAMMA, files=[SHOW.path])
+    return dict(name="libios", key=key, render=render_bytes, fps=FPS, duration=SHOW_END_APPROX, n=N,
+                init=_prerender_init, initargs=(SHOW.path, seed))
+
+def prerender_show(seed=PRERENDER_SEED, workers=1):
+    """Caché mmap del show entero a FPS; se rehace si cambia el código, el layout, el timeline o la semilla."""
+    return prerender(**prerender_job(seed), workers=workers)
+
+def run_show(video_path, seed=None, cache=None, lookahead=0.0):
+    """
+    Show sincronizado con el vídeo; con `cache` (FrameCache) solo se envían los
+    frames ya renderizados. Cada frame se pinta `lookahead` s por delante del vídeo.
+    """
+    if cache is None: print(f"[show] semilla {rng.seed_show(seed)}")
     start_mpv(video_path)
-    connect_ipc()
-
-    fired = set()
-    accel_phase = 0.0
-    accel_speed = 0.0
-
-    # CONSTRUCCIÓN DE PATHS UNIFICADOS
-    # Usamos las claves del INDEX que definimos en layout.py
-    # INDEX["Z1_L"] son los 9 LEDs de la izquierda superior, etc.
-    SIDE_PATH  = INDEX["B_L"] + INDEX["M_L"] + INDEX["T_L"] + INDEX["Z1_L"]
-    TOP_PATH   = ZONE2 + INDEX["Z1_T"] # (ZONE2 es todo el nivel T_L+T_T+T_R) + Techo superior
-    RIGHT_PATH = INDEX["B_R"] + INDEX["M_R"] + INDEX["T_R"] + INDEX["Z1_R"]
+    last = None
+
+    def tick(t):
+        nonlocal last
+        if cache is not None:
+            output.send(cache.frame(t), -1)
+        else:
+            # Puntuales desde el frame anterior; tras un seek, solo los de este frame
+            since = last if last is not None and 0.0 <= t - last < JUMP_S else grid_since(t)
+            px, guarded = render_frame(t, since)
+            send_frame(px, guarded=guarded)
+        last = t
+        return t > SHOW_END_APPROX
 
     try:
-        while True:
-            if mpv_proc.poll() is not None:
-                break
-            t = mpv_get_prop("time-pos")
-            if t is None:
-                time.sleep(1.0/FPS)
-                continue
-
-            px = idle_ambient(t or 0.0)
-
-            # 1) Entrada van: sirena
-            if T_VAN_APPEAR <= t < (T_VAN_APPEAR+3.0):
-                police_sirens_fullrun(px, t, T_VAN_APPEAR, duration=3.0)
-
-            # 2) Inicio disparos: todas las zonas
-            if t >= T_SHOTS_START and "shots_start" not in fired:
-                fired.add("shots_start")
-                muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
-
-            # Impactos puntuales
-            for k,imp_t in enumerate(SHOT_IMPACTS):
-                key=f"impact_{k}"
-                if t >= imp_t and key not in fired:
-                    fired.add(key)
-                    muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
-                    crackle(px, (ZONE2[::3] + ZONE1[::4]), spread=2, density=0.8, base=WHITE, mix_with=(0,0,0), mix_amt=0.15)
-
-            # 3) Disparos adicionales
-            for ds in AUTO_SHOTS:
-                key = f"audshot_{ds:.2f}"
-                if t >= ds and key not in fired:
-                    fired.add(key)
-                    muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
-                    crackle(px, (ZONE2[::2] + ZONE1[::3]), spread=3, density=0.85, base=WHITE, mix_with=(0,0,0), mix_amt=0.10)
-
-            # 4) Doc acribillado
-            if DOC_BURST_START <= t <= DOC_BURST_END:
-                if int(t*24)%2==0:
-                    muzzle_blast_white(px, [ZONE4, ZONE3, ZONE2, ZONE1], width=5, density=0.95)
-                crackle(px, (ZONE2[::2] + ZONE1[::3]), spread=3, density=0.85, base=WHITE, mix_with=(0,0,0), mix_amt=0.10)
-
-            # 5) Marty + motor en Zona 3 (Middle)
-            if t >= MARTY_TO_DELOREAN and "marty_in" not in fired:
-                fired.add("marty_in")
-                for i in range(N): add(px, i, scale(ELECTRIC_BLUE, 0.8))
-            if t >= DELOREAN_START:
-                accel_speed = max(accel_speed, 0.35)
-                if not (TIME_CIRCUITS_ON <= t < (TIME_CIRCUITS_ON + TIME_CIRCUITS_LEN)):
-                    pulse_zone(px, ZONE3, AMBER_SOFT, YELLOW_WARM, phase=t*0.75, gain=0.35)
-
-            # 6) Time Circuits (2–4)
-            if TIME_CIRCUITS_ON <= t < (TIME_CIRCUITS_ON + TIME_CIRCUITS_LEN):
-                pulse_zone(px, ZONE2, RED_SIREN,      RED_SIREN,      phase=t*0.5,      gain=0.45)
-                pulse_zone(px, ZONE3, GREEN_CIRCUITS, GREEN_CIRCUITS, phase=t*0.5+0.33, gain=0.35)
-                pulse_zone(px, ZONE4, AMBER_SOFT,     AMBER_SOFT,     phase=t*0.5+0.66, gain=0.30)
-
-            # 7) Aceleración 1
-            if ACCEL1_START <= t <= ACCEL1_END:
-                u = (t - ACCEL1_START)/max(0.1, (ACCEL1_END - ACCEL1_START))
-                v = max(0.0, min(1.0, u))
-                accel_speed = max(accel_speed, 0.6 + 0.8*v)
-                accel_phase += 0.035 + 0.12*accel_speed
-
-                color_flux = mix(AMBER_SOFT, ORANGE_INTENSE, 0.5 + 0.5*math.sin(t*2.0))
-
-                parallax_tunnel_bundle(px, t, v, accel_phase, 
-                                       SIDE_PATH,
-                                       TOP_PATH,
-                                       RIGHT_PATH,
-                                       color_flux)
-
-                roadside_markers(px, SIDE_PATH,  t, v)
-                roadside_markers(px, TOP_PATH,   t, v)
-                roadside_markers(px, RIGHT_PATH, t, v)
-
-                warp_strobe(px, t, v*0.7)
-
-                crackle(px, list(range(0, N, 4)), spread=2, density=0.30,
-                        base=color_flux, mix_with=WHITE, mix_amt=0.20)
-
-                if prev_px is not None:
-                    for i in range(N):
-                        r,g,b = px[i]; pr,pg,pb = prev_px[i]
-                        px[i] = (r + BLUR_DECAY*pr, g + BLUR_DECAY*pg, b + BLUR_DECAY*pb)
-                prev_px = px[:]
-
-            # 8) Mortero/alarma
-            if MORTAR_AIM <= t < MORTAR_AIM+3.0:
-                phase = (t-MORTAR_AIM)
-                ring = 0.5 + 0.5*math.sin(phase*4.0*math.pi)
-                for i in ZONE2: add(px, i, scale(RED_SIREN, 0.7*ring))
-                for i in ZONE3: add(px, i, scale(RED_SIREN, 0.35*ring))
-                for i in ZONE4: add(px, i, scale(RED_SIREN, 0.25*ring))
-
-            # 9) Aceleración final
-            if ACCEL2_START <= t < JUMP_88MPH:
-                v = (t - ACCEL2_START)/max(0.1, (JUMP_88MPH - ACCEL2_START))
-                v = max(0.0, min(1.0, v))
-                accel_speed = max(accel_speed, 1.2 + 2.2*v)
-                accel_phase += 0.05 + 0.25*accel_speed
-
-                color_flux = mix(AMBER_SOFT, ORANGE_INTENSE, 0.5 + 0.5*math.sin(t*3.0))
-
-                parallax_tunnel_bundle(px, t, v, accel_phase, 
-                                       SIDE_PATH,
-                                       TOP_PATH,
-                                       RIGHT_PATH,
-                                       color_flux)
-
-                roadside_markers(px, SIDE_PATH,  t, v)
-                roadside_markers(px, TOP_PATH,   t, v)
-                roadside_markers(px, RIGHT_PATH, t, v)
-
-                warp_strobe(px, t, v)
-
-                crackle(px, list(range(0, N, 3)), spread=2, density=0.25+0.5*v,
-                        base=color_flux, mix_with=WHITE, mix_amt=0.25)
-
-                if prev_px is not None:
-                    for i in range(N):
-                        r,g,b = px[i]; pr,pg,pb = prev_px[i]
-                        px[i] = (r + BLUR_DECAY*pr, g + BLUR_DECAY*pg, b + BLUR_DECAY*pb)
-                prev_px = px[:]
-
-            # 10) Salto temporal — blanco guardado (solo Zona 1)
-            if JUMP_88MPH <= t <= JUMP_FLASH_END:
-                prev_px = None
-                p=(t-JUMP_88MPH)/max(0.01, (JUMP_FLASH_END-JUMP_88MPH))
-                if int(t*24)%2==0:
-                    for i in range(N):
-                        add(px, i, scale(ELECTRIC_BLUE, 3.2*(0.8+0.4*math.sin(6.28*p))))
-                else:
-                    for i in range(N):
-                        # La función white_allowed ahora decide usando las propiedades de la zona
-                        if white_allowed(i): add(px, i, scale(WHITE, 2.5))
-                        else:                add(px, i, scale(ELECTRIC_BLUE, 2.2))
-                if abs(t - JUMP_88MPH) < (1.0/FPS) and "jump_white" not in fired:
-                    fired.add("jump_white")
-                    one_frame_white_guarded()
-
-            send_frame(px)
-            time.sleep(1.0/FPS)
-
-            if t and t > SHOW_END_APPROX:
-                break
-
-        for f in range(int(0.8*FPS)):
+        ShowRuntime(FPS, mpv, clock, output, proc=mpv_proc, lookahead=lookahead).run(tick, SOCK_PATH)
+
+        sched = FrameScheduler(FPS)
+        for f in sched.frames(int(0.8*FPS)):
             k = 1.0 - f/(0.8*FPS)
             send_frame(frame_fill(scale(ELECTRIC_BLUE, 0.06*k)))
-            time.sleep(1.0/FPS)
         send_frame(frame_fill((0,0,0)), duration=600)
 
     finally:
@@ -456,8 +450,27 @@ def run_show(video_path):
 def main():
     p = argparse.ArgumentParser(description="Persecución con los libios — Refactorizado (132 LEDs)")
     p.add_argument("--video", default=VIDEO_FILE_DEFAULT, help="Ruta al .mp4 (por defecto /home/pi/libios.mp4)")
+    p.add_argument("--output", choices=OUTPUT_KINDS, default="json", help="Protocolo de salida (por defecto json a Hyperion)")
+    p.add_argument("--controller", default=CONTROLLER_HOST, help="IP del WLED/ESP para ddp, e131 y artnet")
+    p.add_argument("--latency-ms", type=float, default=None, help="Latencia de salida a compensar (por defecto la calibrada con latency.py)")
+    p.add_argument("--seed", type=int, default=None, help="Semilla de los efectos aleatorios (por defecto una nueva en cada pase)")
+    p.add_argument("--timeline", default=TIMELINE_FILE, help="Fichero de timeline (por defecto timelines/libios.json)")
+    p.add_argument("--prerender", action="store_true", help="Renderizar el show entero antes y reproducir los frames desde la caché")
+    p.add_argument("--prerender-only", action="store_true", help="Solo generar la caché de frames y salir")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos para el prerender (por defecto uno por núcleo)")
     args = p.parse_args()
-    run_show(args.video)
+    load_timeline(args.timeline)
+    cache = None
+    if args.prerender or args.prerender_only:
+        cache = prerender_show(PRERENDER_SEED if args.seed is None else args.seed, args.workers)
+        if args.prerender_only: return
+    global output
+    host = args.controller if args.output in DIRECT_KINDS else HOST
+    output = AsyncOutput(open_output(args.output, host, PRIORITY, ORIGIN, token=TOKEN, timeout=2))
+    atexit.register(cleanup)
+    lookahead = latency.lookahead(args.latency_ms, args.output, host)
+    print(f"[show] lookahead {lookahead * 1e3:.0f} ms")
+    run_show(args.video, args.seed, cache, lookahead)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,137 @@
+# mpv_clock.py
+# Reloj de reproducción interpolado: las muestras de time-pos (notificadas por
+# mpv con follow(), o preguntadas por un hilo con start()) ajustan una recta
+# posición = offset + rate * t contra time.monotonic(); pause y speed la
+# congelan o cambian su pendiente. El bucle de render lee now() sin tocar el
+# socket, así que no espera al IPC, no pierde frames cuando mpv tarda en
+# contestar y el tiempo tiene resolución de sub-frame.
+#
+# Cada muestra se fecha en el punto medio entre la petición y la respuesta (la
+# mitad de la latencia del IPC se cancela). Una pausa, un cambio de speed o un
+# salto de más de JUMP_S (seek) vacían la ventana y el ajuste empieza de nuevo.
+# Mientras se reproduce, now() no va nunca hacia atrás por los reajustes de la
+# recta: el timeline lo tomaría como un seek y rearmaría cues ya disparados.
+
+import threading
+import time
+from collections import deque
+
+JUMP_S = 0.25   # Error de predicción a partir del cual una muestra se toma como seek
+
+class PlaybackClock:
+    def __init__(self, window=12, max_drift=0.02, clock=time.monotonic):
+        self.clock = clock
+        self.samples = deque(maxlen=window)
+        self.max_drift = max_drift        # Desvío máximo del rate ajustado respecto a speed
+        self.paused = False
+        self.speed = 1.0
+        self._fit = None                  # (t_ref, pos_ref, rate): se reemplaza entero, lectura sin lock
+        self._last = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # --- muestras ---
+    def reset(self):
+        self.samples.clear()
+        self._fit = None
+        self._last = None
+
+    def set_state(self, paused=None, speed=None, at=None):
+        """Pausa o cambio de velocidad: la recta sigue desde la posición actual con el nuevo rate."""
+        if at is None: at = self.clock()
+        changed = (paused is not None and paused != self.paused) or (speed is not None and speed != self.speed)
+        if not changed: return
+        fit = self._fit
+        if paused is not None: self.paused = paused
+        if speed is not None:  self.speed = speed
+        self.samples.clear()
+        if fit is not None:
+            self._fit = (at, self._predict(fit, at), 0.0 if self.paused else self.speed)
+
+    def sample(self, pos, at=None, paused=None, speed=None):
+        """Añade una muestra: time-pos `pos` en el instante monotonic `at`."""
+        if at is None: at = self.clock()
+        self.set_state(paused, speed, at)
+        fit = self._fit
+        if fit is not None and self.samples and abs(self._predict(fit, at) - pos) > JUMP_S:
+            self.samples.clear()   # Seek (o vídeo reiniciado)
+            self._last = None
+        self.samples.append((at, pos))
+        self._fit = self._solve()
+
+    def _solve(self):
+        s = self.samples
+        t_ref, pos_ref = s[-1]
+        if self.paused: return (t_ref, pos_ref, 0.0)
+        rate = self.speed
+        if len(s) >= 3:
+            # Mínimos cuadrados sobre la ventana, centrados en la media
+            n = len(s)
+            mt = sum(a for a, _ in s) / n
+            mp = sum(p for _, p in s) / n
+            var = sum((a - mt) ** 2 for a, _ in s)
+            if var > 0:
+                slope = sum((a - mt) * (p - mp) for a, p in s) / var
+                lo, hi = self.speed * (1 - self.max_drift), self.speed * (1 + self.max_drift)
+                rate = min(hi, max(lo, slope))
+            return (mt, mp, rate)
+        return (t_ref, pos_ref, rate)
+
+    @staticmethod
+    def _predict(fit, at):
+        t_ref, pos_ref, rate = fit
+        return pos_ref + rate * (at - t_ref)
+
+    # --- lectura ---
+    def now(self):
+        """Tiempo del vídeo ahora mismo (s), sin IPC; None hasta la primera muestra."""
+        fit = self._fit
+        if fit is None: return None
+        t = self._predict(fit, self.clock())
+        last = self._last
+        if last is not None and not self.paused and last - JUMP_S < t < last:
+            t = last
+        self._last = t
+        return t
+
+    # --- muestreo en segundo plano ---
+    def start(self, get_prop, interval=0.1, props_every=5):
+        """
+        Hilo que muestrea mpv cada `interval` s con get_prop(nombre) (None si no
+        contesta); pause y speed se leen cada `props_every` muestras.
+        """
+        def run():
+            k = 0
+            while not self._stop.is_set():
+                t0 = self.clock()
+                pos = get_prop("time-pos")
+                t1 = self.clock()
+                paused = speed = None
+                if k % props_every == 0:
+                    paused = get_prop("pause")
+                    speed = get_prop("speed")
+                if isinstance(pos, (int, float)):
+                    self.sample(float(pos), (t0 + t1) / 2, paused, float(speed) if speed else None)
+                k += 1
+                self._stop.wait(interval)
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="mpv-clock", daemon=True)
+        self._thread.start()
+        return self
+
+    def follow(self, mpv):
+        """Alimenta el reloj con las notificaciones de mpv_ipc.MpvClient (observe_property), sin preguntar."""
+        def on_pos(name, value, at):
+            if isinstance(value, (int, float)): self.sample(float(value), at)
+        def on_pause(name, value, at):
+            if value is not None: self.set_state(paused=bool(value), at=at)
+        def on_speed(name, value, at):
+            if value: self.set_state(speed=float(value), at=at)
+        mpv.observe("pause", on_pause)
+        mpv.observe("speed", on_speed)
+        mpv.observe("time-pos", on_pos)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=1.0)
@@ -0,0 +1,164 @@
+# mpv_ipc.py
+# Cliente del socket JSON IPC de mpv. Un hilo lector corta las líneas según
+# llegan (un recv puede traer medio mensaje o varios), y cada respuesta va a la
+# petición que la pidió por su request_id único (un Future por petición). Así
+# una respuesta vieja no se confunde con la nueva, y los eventos intercalados
+# no se pierden.
+#
+# observe(prop, callback) usa observe_property: mpv avisa de cada cambio de
+# time-pos, pause, speed o eof-reached sin que el bucle del show pregunte nada.
+
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+class MpvError(Exception):
+    pass
+
+class MpvClient:
+    def __init__(self):
+        self.sock = None
+        self.eof = False                  # eof-reached, end-file o socket cerrado
+        self._ids = itertools.count(1)
+        self._pending = {}                # request_id -> Future
+        self._observers = {}              # id de observe_property -> (propiedad, callback)
+        self._events = {}                 # nombre de evento -> [callback]
+        self._lock = threading.Lock()     # sendall desde varios hilos
+        self._reader = None
+        self.observe("eof-reached", self._on_eof)
+
+    def _on_eof(self, name, value, at):
+        if value: self.eof = True
+
+    # --- conexión ---
+    def connect(self, path, timeout=10.0):
+        """Espera a que mpv cree el socket y se conecta; RuntimeError si no llega a tiempo."""
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < timeout:
+            if os.path.exists(path):
+                try:
+                    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    s.connect(path)
+                    break
+                except OSError:
+                    s.close()
+            time.sleep(0.05)
+        else:
+            raise RuntimeError("No se pudo conectar al socket IPC de mpv")
+        self.sock = s
+        self.eof = False
+        self._reader = threading.Thread(target=self._read_loop, name="mpv-ipc", daemon=True)
+        self._reader.start()
+        for oid, (name, _) in self._observers.items():
+            self.request("observe_property", oid, name)
+        return self
+
+    def close(self):
+        s, self.sock = self.sock, None
+        if s is not None:
+            try: s.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+            s.close()
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join(timeout=1.0)
+
+    @property
+    def connected(self):
+        return self.sock is not None and not self.eof
+
+    # --- lector ---
+    def _read_loop(self):
+        buf = b""
+        try:
+            while True:
+                chunk = self.sock.recv(65536)
+                if not chunk: break
+                buf += chunk
+                *lines, buf = buf.split(b"\n")   # Lo que queda tras el último \n es un mensaje a medias
+                for line in lines:
+                    if line.strip(): self._dispatch(line)
+        except (OSError, AttributeError):
+            pass
+        self._closed()
+
+    def _closed(self):
+        # Socket cerrado: las peticiones pendientes fallan en vez de esperar su timeout
+        self.eof = True
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            if not fut.done(): fut.set_exception(MpvError("Conexión con mpv cerrada"))
+
+    def _dispatch(self, line):
+        try:
+            msg = json.loads(line.decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            return
+        at = time.monotonic()
+        rid = msg.get("request_id")
+        if rid is not None and "error" in msg:
+            with self._lock:
+                fut = self._pending.pop(rid, None)
+            if fut is not None and not fut.done():
+                if msg["error"] == "success": fut.set_result(msg.get("data"))
+                else:                        fut.set_exception(MpvError(msg["error"]))
+            return
+        event = msg.get("event")
+        if event == "property-change":
+            obs = self._observers.get(msg.get("id"))
+            if obs is not None: obs[1](obs[0], msg.get("data"), at)
+            return
+        if event == "end-file": self.eof = True
+        for cb in self._events.get(event, ()):
+            cb(msg, at)
+
+    # --- peticiones ---
+    def request(self, *command):
+        """Envía un comando y devuelve su Future (resultado: el campo data)."""
+        fut = Future()
+        rid = next(self._ids)
+        data = (json.dumps({"command": list(command), "request_id": rid}) + "\n").encode("utf-8")
+        with self._lock:
+            if self.sock is None or self.eof:
+                fut.set_exception(MpvError("Sin conexión con mpv"))
+                return fut
+            self._pending[rid] = fut
+            try:
+                self._write(data)
+            except OSError as e:
+                self._pending.pop(rid, None)
+                fut.set_exception(MpvError(str(e)))
+        return fut
+
+    def _write(self, data):
+        self.sock.sendall(data)
+
+    def command(self, *command, timeout=1.0):
+        """Comando síncrono: devuelve data o lanza MpvError (también si no contesta a tiempo)."""
+        try:
+            return self.request(*command).result(timeout)
+        except FutureTimeout:
+            raise MpvError(f"mpv no contesta a {command[0]}") from None
+
+    def get_property(self, name, default=None, timeout=0.2):
+        """Valor de una propiedad, o default si mpv no la tiene o no contesta."""
+        try:
+            return self.command("get_property", name, timeout=timeout)
+        except MpvError:
+            return default
+
+    # --- suscripciones ---
+    def observe(self, name, callback):
+        """callback(nombre, valor, instante monotonic) en cada cambio de la propiedad."""
+        oid = len(self._observers) + 1
+        self._observers[oid] = (name, callback)
+        if self.connected: self.request("observe_property", oid, name)   # Si no, al conectar
+        return oid
+
+    def on_event(self, event, callback):
+        """callback(mensaje, instante monotonic) para cada evento `event` de mpv (seek, end-file...)."""
+        self._events.setdefault(event, []).append(callback)
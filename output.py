@@ -0,0 +1,294 @@
+# output.py
+# Salida de frames compartida por todos los shows.
+# Un único cliente Hyperion JSON-RPC con sesión keep-alive: la conexión TCP y las
+# cabeceras se reutilizan entre frames en vez de abrir una nueva en cada post.
+# Timeouts, reconexión y métricas de rendimiento viven aquí y en ningún otro sitio.
+# Los backends binarios (FlatBuffers/Protobuf) están en hyperion_binary.py.
+# ThreadedOutput saca el envío del bucle de render (buzón de una plaza).
+# La salida directa por UDP a WLED/ESP (DDP, E1.31, Art-Net) está en udp_output.py.
+# Los frames repetidos no se reenvían: el último sigue vivo gracias a su `duration`
+# en Hyperion y solo se refresca cada KEEPALIVE_S.
+
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HOST = "http://localhost:8090"
+DIRECT_KINDS = ("ddp", "e131", "artnet")
+OUTPUT_KINDS = ("json", "flatbuffers", "protobuf") + DIRECT_KINDS
+KEEPALIVE_S  = 1.0   # Refresco de un frame estático (None desactiva la deduplicación)
+
+# ========= MÉTRICAS =========
+class OutputStats:
+    """Frames/s, bytes/s y latencia p50/p99 de los envíos (ventana deslizante)."""
+
+    def __init__(self, window=600):
+        self.frames = 0
+        self.bytes = 0
+        self.errors = 0
+        self.dropped = 0
+        self.saved_frames = 0
+        self.saved_bytes = 0
+        self.t_start = time.monotonic()
+        self.latencies = deque(maxlen=window)
+
+    def record(self, nbytes, latency):
+        self.frames += 1
+        self.bytes += nbytes
+        self.latencies.append(latency)
+
+    def error(self):
+        self.errors += 1
+
+    def drop(self):
+        self.dropped += 1
+
+    def save(self, nbytes):
+        self.saved_frames += 1
+        self.saved_bytes += nbytes
+
+    def percentile(self, p):
+        if not self.latencies: return 0.0
+        data = sorted(self.latencies)
+        k = min(len(data) - 1, int(round(p / 100.0 * (len(data) - 1))))
+        return data[k]
+
+    def snapshot(self):
+        elapsed = max(1e-6, time.monotonic() - self.t_start)
+        return {
+            "frames": self.frames,
+            "fps": self.frames / elapsed,
+            "bytes_s": self.bytes / elapsed,
+            "p50_ms": self.percentile(50) * 1000.0,
+            "p99_ms": self.percentile(99) * 1000.0,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "saved_frames": self.saved_frames,
+            "saved_bytes": self.saved_bytes,
+        }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"{s['frames']} frames, {s['fps']:.1f} fps, {s['bytes_s'] / 1024:.1f} KiB/s, "
+                f"p50 {s['p50_ms']:.1f} ms, p99 {s['p99_ms']:.1f} ms, errores {s['errors']}, "
+                f"descartados {s['dropped']}, repetidos {s['saved_frames']} "
+                f"({s['saved_bytes'] / 1024:.1f} KiB ahorrados)")
+
+# ========= BASE =========
+class FrameOutput:
+    """
+    Base común de los backends. send() nunca lanza: si el destino no responde se
+    descarta el frame, se cierra la conexión y se deja de intentar durante
+    `retry_s` para no frenar el render. Las subclases implementan _open/_close/_send.
+
+    Un frame idéntico al último enviado (mismos bytes y misma duración) se salta y
+    cuenta como ahorrado. Se vuelve a mandar cada `keepalive_s`, o antes si su
+    duración finita caducaría en Hyperion; con duración -1 el frame ya persiste.
+    """
+    name = "Salida"
+
+    def __init__(self, timeout=2.0, retry_s=1.0, keepalive_s=KEEPALIVE_S):
+        self.timeout = timeout
+        self.retry_s = retry_s
+        self.keepalive_s = keepalive_s
+        self.stats = OutputStats()
+        self.connected = False
+        self.closed = False
+        self._retry_at = 0.0
+        self._last = None        # (rgb, duration, bytes enviados)
+        self._refresh_at = 0.0
+
+    def _open(self): pass
+    def _close(self): pass
+
+    def _send(self, rgb, duration):
+        """Envía un frame y devuelve los bytes puestos en el cable."""
+        raise NotImplementedError
+
+    def reconnect(self):
+        if self.connected:
+            try: self._close()
+            except Exception: pass
+        self.connected = False
+        self._last = None
+
+    def _is_repeat(self, rgb, duration, now):
+        last = self._last
+        if last is None or now >= self._refresh_at: return False
+        return last[1] == duration and last[0] == rgb
+
+    def send(self, rgb, duration=-1):
+        if self.closed: return False
+        now = time.monotonic()
+        if self.keepalive_s is not None and self._is_repeat(rgb, duration, now):
+            self.stats.save(self._last[2])
+            return True
+        if now < self._retry_at: return False
+        t0 = time.perf_counter()
+        try:
+            if not self.connected:
+                self._open()
+                self.connected = True
+            nbytes = self._send(rgb, duration)
+        except OSError:  # requests.RequestException también hereda de OSError
+            self.stats.error()
+            self.reconnect()
+            self._retry_at = now + self.retry_s
+            return False
+        self.stats.record(nbytes, time.perf_counter() - t0)
+        if self.keepalive_s is not None:
+            refresh = self.keepalive_s if duration < 0 else min(self.keepalive_s, duration / 2000.0)
+            self._last = (rgb, duration, nbytes)
+            self._refresh_at = now + refresh
+        return True
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        self.reconnect()
+        print(f"[{self.name}] {self.stats.summary()}")
+
+# ========= HYPERION JSON-RPC =========
+class HyperionClient(FrameOutput):
+    """Cliente persistente para el comando `color` de /json-rpc."""
+    name = "Hyperion"
+
+    def __init__(self, host=DEFAULT_HOST, priority=64, origin="estanteria",
+                 token=None, timeout=2.0, retry_s=1.0):
+        super().__init__(timeout, retry_s)
+        self.url = f"{host}/json-rpc"
+        self.headers = {"Content-Type": "application/json"}
+        if token: self.headers["Authorization"] = f"Bearer {token}"
+        # La parte fija del payload se serializa una sola vez
+        self._head = '{"command":"color","priority":%d,"origin":%s,' % (priority, json.dumps(origin))
+        self.session = None
+
+    def _open(self):
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        s.headers.update(self.headers)
+        self.session = s
+
+    def _close(self):
+        self.session.close()
+        self.session = None
+
+    def encode(self, rgb, duration=-1):
+        color = rgb if isinstance(rgb, list) else list(rgb)
+        body = self._head + '"duration":%d,"color":%s}' % (duration, json.dumps(color, separators=(",", ":")))
+        return body.encode("ascii")
+
+    def _send(self, rgb, duration):
+        body = self.encode(rgb, duration)
+        r = self.session.post(self.url, data=body, timeout=self.timeout)
+        r.content  # Consumir la respuesta devuelve la conexión al pool
+        return len(body)
+
+# ========= HILO DE ENVÍO =========
+class ThreadedOutput:
+    """
+    Envía desde un hilo propio con un buzón de una sola plaza: send() deja el frame
+    y vuelve al instante, así un Hyperion lento nunca retrasa el render. El hilo
+    siempre transmite el frame más reciente; si llega uno nuevo antes de que se
+    envíe el anterior, el viejo se sustituye y cuenta como descartado.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.timeout = inner.timeout
+        self.stats = inner.stats
+        self.closed = False
+        self._cond = threading.Condition()
+        self._slot = None
+        self._busy = False
+        self._stop = False
+        self._thread = None  # Se arranca con el primer frame
+        self.failures = 0    # Excepciones del backend que no son de red
+
+    def send(self, rgb, duration=-1):
+        if self.closed: return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-tx", daemon=True)
+            self._thread.start()
+        with self._cond:
+            if self._slot is not None: self.stats.drop()
+            self._slot = (rgb, duration)
+            self._cond.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._slot is None and not self._stop:
+                    self._cond.wait()
+                if self._slot is None: return
+                rgb, duration = self._slot
+                self._slot = None
+                self._busy = True
+            try:
+                self.inner.send(rgb, duration)
+            except Exception as e:
+                # Frame mal formado, codificador roto...: se cuenta y se sigue, el hilo no puede morir
+                self.stats.error()
+                self.failures += 1
+                if self.failures == 1 or self.failures % 100 == 0:
+                    print(f"[{self.name}] Error en el envío ({self.failures}): {e!r}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Espera a que el último frame depositado haya salido."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._slot is None and not self._busy, timeout)
+
+    def close(self):
+        # El frame pendiente (normalmente el negro final) se envía antes de parar
+        if self.closed: return
+        self.closed = True
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread: self._thread.join(timeout=self.timeout + 1.0)
+        self.inner.close()
+
+# ========= FACTORÍA =========
+def open_output(kind="json", host=DEFAULT_HOST, priority=64, origin="estanteria",
+                token=None, timeout=2.0, background=False, keepalive_s=KEEPALIVE_S):
+    """
+    Crea el backend pedido desde la CLI. Para Hyperion `host` es su URL HTTP y los
+    backends binarios usan su mismo hostname con el puerto por defecto. Para las
+    salidas directas (DIRECT_KINDS) `host` es la IP del controlador.
+    Con background=True el backend queda detrás de un ThreadedOutput;
+    keepalive_s=None desactiva la deduplicación de frames repetidos.
+    """
+    hostname = (urlsplit(host).hostname if "://" in host else host) or "localhost"
+    if kind == "json":
+        out = HyperionClient(host, priority, origin, token=token, timeout=timeout)
+    elif kind in ("flatbuffers", "protobuf"):
+        from hyperion_binary import HyperionFlatClient, HyperionProtoClient
+        if kind == "flatbuffers":
+            out = HyperionFlatClient(hostname, priority=priority, origin=origin, timeout=timeout)
+        else:
+            out = HyperionProtoClient(hostname, priority=priority, timeout=timeout)
+    elif kind in DIRECT_KINDS:
+        from udp_output import ArtNetOutput, DdpOutput, E131Output
+        if kind == "ddp":
+            out = DdpOutput(hostname, timeout=timeout)
+        elif kind == "e131":
+            out = E131Output(hostname, source=origin, timeout=timeout)
+        else:
+            out = ArtNetOutput(hostname, timeout=timeout)
+    else:
+        raise ValueError(f"Salida desconocida: {kind}")
+    out.keepalive_s = keepalive_s
+    return ThreadedOutput(out) if background else out
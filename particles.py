@@ -0,0 +1,116 @@
+# particles.py
+# Motor de partículas struct-of-arrays para chispas, fragmentos y ráfagas.
+# Posición, velocidad, vida, color, path y objetivo viven en arrays NumPy de
+# capacidad fija: nada se crea ni se borra por partícula, una partícula muerta
+# (vida 0) deja su hueco libre para el siguiente spawn. Nacer, avanzar y pintar
+# todas las partículas de un frame son unas pocas operaciones vectorizadas.
+#
+# Una partícula con path >= 0 se mueve a lo largo de ese recorrido (posición en
+# LEDs del path, con vuelta al final); con path -1 su posición es el LED directamente.
+
+import numpy as np
+
+import rng
+from frame import as_color, as_index
+from layout import N
+
+def scatter(centers, spread, density, n=N):
+    """
+    Chispas alrededor de cada centro: cada LED a distancia j (|j| <= spread) se
+    enciende con probabilidad density*(1-|j|/(spread+1)). Devuelve (LEDs, caída).
+    """
+    j = np.arange(-spread, spread + 1)
+    idx = (as_index(centers)[:, None] + j).ravel()
+    fall = np.tile(1.0 - np.abs(j) / (spread + 1), len(centers))
+    ok = (idx >= 0) & (idx < n)
+    idx, fall = idx[ok], fall[ok]
+    hit = rng.bernoulli(density * fall)
+    return idx[hit], fall[hit]
+
+class Particles:
+    """Pool de partículas de capacidad fija; si se llena, los spawns sobrantes se cuentan en `dropped`."""
+
+    def __init__(self, capacity=256, paths=(), n=N):
+        self.capacity = capacity
+        self.n = n
+        paths = [as_index(p) for p in paths]
+        self._flat = np.concatenate(paths) if paths else np.zeros(0, dtype=np.intp)
+        # Longitud y desplazamiento de cada path en _flat; path -1 cae en el último: longitud 0
+        self._length = np.array([len(p) for p in paths] + [0], dtype=np.intp)
+        self._offset = np.concatenate(([0], np.cumsum(self._length)[:-1])).astype(np.intp)
+        self.pos = np.zeros(capacity)
+        self.vel = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.intp)       # Frames que le quedan por pintarse
+        self.color = np.zeros((capacity, 3))
+        self.path = np.full(capacity, -1, dtype=np.intp)
+        self.target = np.full(capacity, -1.0)                # Se detiene al llegar (-1: sin objetivo)
+        self.dropped = 0
+
+    def count(self):
+        return int(np.count_nonzero(self.life > 0))
+
+    def clear(self):
+        self.life[:] = 0
+
+    def spawn(self, pos, vel=0.0, life=1, color=(255, 255, 255), path=-1, target=-1.0):
+        """Crea len(pos) partículas; el resto de campos son escalares o uno por partícula."""
+        pos = np.atleast_1d(np.asarray(pos, dtype=float))
+        k = len(pos)
+        free = np.flatnonzero(self.life <= 0)
+        if len(free) < k:
+            self.dropped += k - len(free)
+        slots = free[:k]
+        m = len(slots)
+        self.pos[slots] = pos[:m]
+        self.vel[slots] = np.broadcast_to(np.asarray(vel, dtype=float), (k,))[:m]
+        self.life[slots] = np.broadcast_to(np.asarray(life, dtype=np.intp), (k,))[:m]
+        self.color[slots] = np.broadcast_to(as_color(color), (k, 3))[:m]
+        self.path[slots] = np.broadcast_to(np.asarray(path, dtype=np.intp), (k,))[:m]
+        self.target[slots] = np.broadcast_to(np.asarray(target, dtype=float), (k,))[:m]
+        return slots
+
+    def leds(self, slots):
+        """LED en el que está cada partícula de slots."""
+        path = self.path[slots]
+        pos = self.pos[slots].astype(np.intp)
+        on = path >= 0
+        if not on.any(): return pos
+        led = pos.copy()
+        p = path[on]
+        led[on] = self._flat[self._offset[p] + pos[on] % self._length[p]]
+        return led
+
+    def advance(self):
+        """Mueve las partículas vivas un frame; las que tienen objetivo se paran en él."""
+        a = np.flatnonzero((self.life > 0) & (self.vel != 0.0))
+        if not len(a): return
+        old, vel, path = self.pos[a], self.vel[a], self.path[a]
+        length = self._length[path]
+        wrap = length > 0
+        length = np.maximum(length, 1)
+        new = old + vel
+        tgt = self.target[a]
+        has = tgt >= 0
+        if has.any():
+            # Distancia al objetivo en el sentido de la marcha (con vuelta en los paths)
+            dist = (tgt - old) * np.sign(vel)
+            dist = np.where(wrap, np.mod(dist, length), dist)
+            arrive = has & (dist >= 0) & (dist <= np.abs(vel))
+            new = np.where(arrive, tgt, new)
+            self.vel[a[arrive]] = 0.0
+        self.pos[a] = np.where(wrap, np.mod(new, length), new)
+
+    def age(self):
+        alive = self.life > 0
+        self.life[alive] -= 1
+
+    def splat(self, frame, k=1.0):
+        """Suma el color de cada partícula viva en su LED del frame."""
+        a = np.flatnonzero(self.life > 0)
+        if len(a): frame.add_rgb(self.leds(a), self.color[a] * k)
+
+    def update(self, frame, k=1.0):
+        """Un frame completo: avanzar, pintar y envejecer."""
+        self.advance()
+        self.splat(frame, k)
+        self.age()
@@ -1,7 +1,16 @@
-# pip install requests
-import requests, time, math, random
+# pip install requests numpy
+import math, argparse
 from itertools import chain
 
+import numpy as np
+
+from frame import Frame, OutputLut
+from layout import calculate_coordinates, path_positions, polar_coordinates
+from output import open_output
+from particles import Particles
+from scheduler import FrameScheduler
+import rng
+
 # ===== CONFIG =====
 HOST     = "http://localhost:8090"
 TOKEN    = None
@@ -52,13 +61,29 @@ LEFT_CHAIN  = Z[4]["L"] + Z[3]["L"] + Z[2]["L"] + Z[1]["L"]
 RIGHT_CHAIN = Z[4]["R"] + Z[3]["R"] + Z[2]["R"] + Z[1]["R"]
 TOPS_CHAIN  = Z[4]["T"] + Z[3]["T"] + Z[2]["T"] + Z[1]["T"]
 
+# Mismo mueble que layout.py sin fuego ni estante 0: su geometría por nombre de segmento
+LAYOUT_NAMES = {"Z4_L": "B_L", "Z4_T": "B_T", "Z4_R": "B_R",
+                "Z3_R": "M_R", "Z3_T": "M_T", "Z3_L": "M_L",
+                "Z2_L": "T_L", "Z2_T": "T_T", "Z2_R": "T_R",
+                "Z1_R": "Z1_R", "Z1_T": "Z1_T", "Z1_L": "Z1_L"}
+LED_XY = calculate_coordinates({LAYOUT_NAMES[k]: v for k, v in INDEX.items()}, n=N)
+
 PATH = Z[4]["L"] + Z[4]["T"] + Z[4]["R"] + \
        Z[3]["R"] + Z[3]["T"] + Z[3]["L"] + \
        Z[2]["L"] + Z[2]["T"] + Z[2]["R"] + \
        Z[1]["R"] + Z[1]["T"] + Z[1]["L"]
 
+# Posición de cada LED a lo largo de cada recorrido (-1 si no pertenece)
+PATH_POS        = path_positions(PATH, N)
+LEFT_CHAIN_POS  = path_positions(LEFT_CHAIN, N)
+TOPS_CHAIN_POS  = path_positions(TOPS_CHAIN, N)
+RIGHT_CHAIN_POS = path_positions(RIGHT_CHAIN, N)
+
+# Pools de partículas: fragmentos que recorren PATH (path 0) y chispas de un frame
+SHARDS = Particles(256, paths=[PATH], n=N)
+SPARKS = Particles(2*N, n=N)
+
 # ===== COLOR/UTIL =====
-def clamp(x): return max(0, min(255, int(x)))
 def lerp(a,b,t): return a + (b-a)*t
 def mix(c1,c2,t): return (lerp(c1[0],c2[0],t), lerp(c1[1],c2[1],t), lerp(c1[2],c2[2],t))
 def scale(c,k):   return (c[0]*k, c[1]*k, c[2]*k)
@@ -76,29 +101,18 @@ RANGERS = {
 }
 ORDER = ["RED","BLUE","YELLOW","PINK","GREEN","WHITE","BLACK"]
 
-headers = {"Content-Type":"application/json"}
-if TOKEN: headers["Authorization"] = f"Bearer {TOKEN}"
+output = open_output("json", HOST, PRIORITY, ORIGIN, token=TOKEN, timeout=5, background=True)
+SCHED  = FrameScheduler(FPS)   # Deadlines absolutos: cada efecto dura sus `seconds` de verdad
 
-def apply_gamma(c):
-    if GAMMA == 1.0: return c
-    r,g,b = c
-    gfun = lambda v: 255 * ((v/255.0) ** GAMMA)
-    return (gfun(r), gfun(g), gfun(b))
+# Gamma precalculada; este show tiene su propio layout, así que sin tablas por zona
+LUT = OutputLut(GAMMA, zones={}, n=N)
 
 def pack(pixels):
-    flat=[]
-    for r,g,b in pixels:
-        r,g,b = apply_gamma((r,g,b))
-        flat += [clamp(r), clamp(g), clamp(b)]
-    return flat
+    if not isinstance(pixels, Frame): pixels = Frame(np.asarray(pixels, dtype=float))
+    return pixels.pack(LUT)
 
 def send_frame(pixels, duration=-1):
-    payload = {"command":"color","color":pack(pixels),
-               "priority":PRIORITY,"origin":ORIGIN,"duration":duration}
-    try:
-        requests.post(f"{HOST}/json-rpc", headers=headers, json=payload, timeout=5)
-    except Exception:
-        pass
+    output.send(pack(pixels), duration)
 
 def frame_fill(c): return [c]*N
 def add(px, i, c):
@@ -106,37 +120,20 @@ def add(px, i, c):
         r,g,b = px[i]; cr,cg,cb = c
         px[i] = (r+cr, g+cg, b+cb)
 
-# ===== EFECTOS (idénticos a v3) =====
+# ===== EFECTOS (los de v3) =====
+# Mismos efectos y parámetros que v3, no los mismos bytes: ahora van con su
+# semilla (rng) y con el reloj de frames, y los fragmentos de shard_rain
+# (Particles) se paran al llegar a su lateral en vez de oscilar alrededor.
 def vortex(center=(0.0,0.20), base=(0,0,255), accent=WHITE, seconds=1.2, spin=2.2):
-    coords = [(0.0,0.0)]*N
-    def set_coords(ids, x0,y0,x1,y1):
-        L=len(ids)
-        for k,idx in enumerate(ids):
-            t = 0 if L==1 else k/(L-1)
-            coords[idx] = (lerp(x0,x1,t), lerp(y0,y1,t))
-    set_coords(Z[4]["L"], -1.0,-1.0, -1.0,-0.33)
-    set_coords(Z[4]["R"], +1.0,-1.0, +1.0,-0.33)
-    set_coords(Z[4]["T"], -0.9,-0.33, +0.9,-0.33)
-    set_coords(Z[3]["L"], -1.0,-0.1, -1.0,+0.33)
-    set_coords(Z[3]["R"], +1.0,-0.1, +1.0,+0.33)
-    set_coords(Z[3]["T"], -0.9,+0.12, +0.9,+0.12)
-    set_coords(Z[2]["L"], -1.0,+0.6, -1.0,+1.0)
-    set_coords(Z[2]["R"], +1.0,+0.6, +1.0,+1.0)
-    set_coords(Z[2]["T"], -0.9,+0.85, +0.9,+0.85)
-    set_coords(Z[1]["L"], -1.0,+1.05, -1.0,+1.30)
-    set_coords(Z[1]["R"], +1.0,+1.05, +1.0,+1.30)
-    set_coords(Z[1]["T"], -0.9,+1.25, +0.9,+1.25)
-
-    frames=int(FPS*seconds); cx,cy=center
-    for f in range(frames):
-        t=f/frames; px=frame_fill((0,0,0))
-        for i,(x,y) in enumerate(coords):
-            dx,dy=x-cx,y-cy; ang=(math.atan2(dy,dx)+math.pi)/(2*math.pi)
-            ring=math.hypot(dx,dy); phase=(ang+spin*t)%1.0
-            k=max(0.0,1.0-ring*1.2)*(0.4+0.6*phase)
-            col=mix(base,accent,0.3+0.7*phase)
-            add(px,i,scale(col,k))
-        send_frame(px); time.sleep(1/FPS)
+    ring, ang = polar_coordinates(center, LED_XY)
+    k_ring = np.maximum(0.0, 1.0 - ring*1.2)
+    base = np.asarray(base, dtype=float); accent = np.asarray(accent, dtype=float)
+    frames=int(FPS*seconds)
+    for f in SCHED.frames(frames):
+        t=f/frames; phase=(ang+spin*t)%1.0
+        k=k_ring*(0.4+0.6*phase)
+        col=base+(accent-base)*(0.3+0.7*phase)[:,None]
+        send_frame(col*k[:,None])
 
 def volumetric_beam(color, seconds=0.9):
     chains = [(Z[4]["L"], Z[4]["T"], Z[4]["R"]),
@@ -144,7 +141,7 @@ def volumetric_beam(color, seconds=0.9):
               (Z[2]["L"], Z[2]["T"], Z[2]["R"]),
               (Z[1]["L"], Z[1]["T"], Z[1]["R"])]
     frames=int(FPS*seconds)
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         t=f/frames; px=frame_fill(BG_DIM)
         for lefts,top,rights in chains:
             for seg in (lefts, rights):
@@ -155,11 +152,11 @@ def volumetric_beam(color, seconds=0.9):
                 if 0<=k<L:
                     i=top[k]; fall=1.0-abs(k-center)/max(1,spread)
                     add(px,i,mix(color,WHITE,0.5*fall))
-        send_frame(px); time.sleep(1/FPS)
+        send_frame(px)
 
 def column_climb(base, accent, seconds=1.1, length=8, glow=0.5):
     frames=int(FPS*seconds)
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         t=f/frames; pos=int(t*(len(LEFT_CHAIN)-1))
         px=frame_fill(BG_DIM)
         for j in range(length):
@@ -168,43 +165,39 @@ def column_climb(base, accent, seconds=1.1, length=8, glow=0.5):
                 if 0<=i<len(chain):
                     idx=chain[i]; k=max(0.0,1.0-j/length)
                     add(px,idx,scale(color,glow+k))
-        send_frame(px); time.sleep(1/FPS)
+        send_frame(px)
 
 def ladder_loop(color, seconds=1.6, length=12, glow=0.45):
     path = list(chain.from_iterable([LEFT_CHAIN, TOPS_CHAIN,
                                      list(reversed(RIGHT_CHAIN)),
                                      list(reversed(TOPS_CHAIN))]))
     frames=int(FPS*seconds)
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         t=f/frames; pos=int(t*len(path)); px=frame_fill(BG_DIM)
         for j in range(length):
             i=pos-j
             if 0<=i<len(path):
                 idx=path[i]; k=max(0.0,1.0-j/length)
                 add(px,idx,scale(color,glow+k))
-        send_frame(px); time.sleep(1/FPS)
+        send_frame(px)
 
 def shard_rain(color, seconds=1.2, density=0.09):
     frames=int(FPS*seconds)
-    active=[]; tops=TOPS_CHAIN
-    sides=LEFT_CHAIN+RIGHT_CHAIN
-    for f in range(frames):
-        if random.random()<density:
-            spawn=random.choice(tops); target=random.choice(sides)
-            active.append({"pos":spawn,"target":target,"life":random.randint(12,20)})
-        px=frame_fill(BG_DIM)
-        for s in active[:]:
-            life=s["life"]; 
-            if life<=0: active.remove(s); continue
-            pi=PATH.index(s["pos"]); ti=PATH.index(s["target"])
-            step=2 if (ti-pi)%len(PATH)<(pi-ti)%len(PATH) else -2
-            s["pos"]=PATH[(pi+step)%len(PATH)]; s["life"]-=1
-            add(px,s["pos"],mix(color,WHITE,0.4))
-        send_frame(px); time.sleep(1/FPS)
+    tops=TOPS_CHAIN; sides=LEFT_CHAIN+RIGHT_CHAIN; total=len(PATH)
+    SHARDS.clear()
+    for f in SCHED.frames(frames):
+        if rng.chance(density):
+            # Nace en un techo y baja por PATH hacia un lateral por el camino más corto
+            pi=PATH_POS[rng.choice(tops)]; ti=PATH_POS[rng.choice(sides)]
+            step=2 if (ti-pi)%total<(pi-ti)%total else -2
+            SHARDS.spawn(pi, vel=step, life=rng.integers(12,21), color=mix(color,WHITE,0.4), path=0, target=ti)
+        px=Frame.fill(BG_DIM, n=N)
+        SHARDS.update(px)
+        send_frame(px)
 
 def dual_comet(color, accent, seconds=4.6, length=14, glow=0.55):
     frames=int(FPS*seconds); total=len(PATH)
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         t=f/frames; h1=int(t*total)%total; h2=(total-h1)%total
         px=frame_fill(BG_DIM)
         def draw(head,col):
@@ -216,72 +209,70 @@ def dual_comet(color, accent, seconds=4.6, length=14, glow=0.55):
                         q=PATH[(idx+side)%total]
                         add(px,q,scale(col,glow*k*0.5))
         draw(h1,accent); draw(h2,color)
-        send_frame(px); time.sleep(1/FPS)
+        send_frame(px)
 
 def prism_tops(color, seconds=1.0):
     chain=TOPS_CHAIN; frames=int(FPS*seconds); trail=12
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         t=f/frames; pos=int(t*(len(chain)+trail)); px=frame_fill(BG_DIM)
         for k in range(trail):
             i=pos-k
             if 0<=i<len(chain):
                 idx=chain[i]; w=max(0.0,1.0-k/trail)
                 add(px,idx,mix(color,WHITE,0.75*w))
-        send_frame(px); time.sleep(1/FPS)
+        send_frame(px)
+
+BRIDGE_ENDS = np.array(LEFT_CHAIN[:3]+LEFT_CHAIN[-3:]+RIGHT_CHAIN[:3]+RIGHT_CHAIN[-3:])
 
 def lightning_bridge(base, accent=WHITE, seconds=1.2, density=0.18):
-    path=TOPS_CHAIN; L=len(path); frames=int(FPS*seconds)
-    for f in range(frames):
-        t=f/frames; px=frame_fill(BG_DIM)
-        head=int(t*(L-1)); width=12
-        for i in range(L):
-            d=abs(i-head)
-            if d<=width:
-                jitter=0.6+0.4*random.random()
-                k=max(0.0,1.0-d/(width+1))
-                col=mix(accent,base,0.3+0.7*(1.0-k))
-                add(px,path[i],scale(col,k*jitter))
-        for ends in (LEFT_CHAIN[:3]+LEFT_CHAIN[-3:], RIGHT_CHAIN[:3]+RIGHT_CHAIN[-3:]):
-            for idx in ends:
-                if random.random()<density:
-                    add(px,idx,mix(WHITE,base,0.5))
-        send_frame(px); time.sleep(1/FPS)
+    path=np.array(TOPS_CHAIN); L=len(path); frames=int(FPS*seconds); width=12
+    base_c=np.asarray(base, dtype=float); accent_c=np.asarray(accent, dtype=float)
+    for f in SCHED.frames(frames):
+        t=f/frames; px=Frame.fill(BG_DIM, n=N)
+        head=int(t*(L-1))
+        i=np.arange(max(0,head-width), min(L,head+width+1))
+        k=1.0-np.abs(i-head)/(width+1)
+        jitter=rng.uniform(0.6, 1.0, len(i))
+        col=accent_c+(base_c-accent_c)*(0.3+0.7*(1.0-k))[:,None]
+        px.add_rgb(path[i], col*(k*jitter)[:,None])
+        px.add(BRIDGE_ENDS[rng.bernoulli(density, len(BRIDGE_ENDS))], mix(WHITE,base,0.5))
+        send_frame(px)
 
 def global_sparkstorm(base, accent=WHITE, seconds=1.9, density=0.65, intensity_mult=2.6):
     frames=int(FPS*seconds)
-    for f in range(frames):
-        px=frame_fill(BG_DIM)
-        for i in range(N):
-            if random.random()<density:
-                w = random.uniform(0.7, 1.0)
-                col = mix(base, accent, w)
-                add(px, i, scale(col, intensity_mult*w))
-        if random.random()<0.15:
-            boost = random.uniform(0.4,0.7)
-            for i in range(N):
-                add(px, i, scale(accent, boost))
-        send_frame(px); time.sleep(1/FPS)
+    base_c=np.asarray(base, dtype=float); accent_c=np.asarray(accent, dtype=float)
+    for f in SCHED.frames(frames):
+        px=Frame.fill(BG_DIM, n=N)
+        # Chispas de un frame en cualquier LED, cada una con su mezcla e intensidad
+        hit=np.flatnonzero(rng.bernoulli(density, N))
+        w=rng.uniform(0.7, 1.0, len(hit))[:, None]
+        SPARKS.spawn(hit, life=1, color=(base_c+(accent_c-base_c)*w)*intensity_mult*w)
+        SPARKS.update(px)
+        if rng.chance(0.15):
+            px.add_all(accent, rng.uniform(0.4,0.7))
+        send_frame(px)
     flash = frame_fill(mix(base, accent, 0.85))
-    send_frame([scale(c, 2.4) for c in flash]); time.sleep(0.06)
+    send_frame([scale(c, 2.4) for c in flash]); SCHED.hold(0.06)
 
 def supernova(color, seconds=0.65):
     frames=int(FPS*seconds)
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         t=f/frames; px=frame_fill(mix(WHITE,color,t))
         upto=int(len(PATH)*t)
         for i in PATH[:upto]:
             add(px,i,scale(color,0.6*(1.0-t)))
-        send_frame(px); time.sleep(1/FPS)
+        send_frame(px)
 
 def settle(color, seconds=1.0):
     frames=int(FPS*seconds)
-    for f in range(frames):
+    for f in SCHED.frames(frames):
         k=0.85+0.15*math.sin(f*2*math.pi/(FPS*0.9))
-        send_frame(frame_fill(scale(color,k))); time.sleep(1/FPS)
+        send_frame(frame_fill(scale(color,k)))
 
 # ===== SECUENCIA =====
 def ranger_show(name):
     base, accent = RANGERS[name]
+    rng.cue(name)   # Cada ranger sortea lo mismo con la misma semilla, pase lo que pase antes
     vortex((0.0,0.20), base, accent, seconds=1.1, spin=2.3)
     volumetric_beam(base, seconds=0.9)
     column_climb(base, accent, seconds=1.1)
@@ -296,10 +287,14 @@ def ranger_show(name):
 
 # ===== MAIN =====
 if __name__ == "__main__":
-    random.seed()
+    p = argparse.ArgumentParser(description="Morph de los Power Rangers (132 LEDs)")
+    p.add_argument("--seed", type=int, default=None, help="Semilla de los efectos aleatorios (por defecto una nueva en cada pase)")
+    print(f"[show] semilla {rng.seed_show(p.parse_args().seed)}")
     try:
-        send_frame(frame_fill(BG_DIM)); time.sleep(0.25)
+        SCHED.start()
+        send_frame(frame_fill(BG_DIM)); SCHED.hold(0.25)
         for r in ORDER:
             ranger_show(r)
     finally:
-        pass
+        print(f"[frames] {SCHED.stats.summary()}")
+        output.close()
@@ -6,16 +6,12 @@
 # - Zords se quedan en Z1_T.
 # - Sincronización real-time intacta.
 
-import time
 import math
-import random
+import argparse
 import sys
 import os
-import socket
-import json
 import subprocess
 import atexit
-import requests
 from itertools import chain
 
 # --- IMPORTACIÓN SEGURA ---
@@ -29,6 +25,17 @@ except ImportError:
     print("[ERROR] Falta 'layout.py'.")
     sys.exit(1)
 
+import numpy as np
+
+from compositor import Compositor
+from frame import Frame, as_index
+from output import open_output
+from mpv_clock import PlaybackClock
+from runtime import AsyncMpvClient, AsyncOutput, ShowRuntime
+import latency
+from timeline import load_show
+import rng
+
 try:
     from rf_control import RFManager
     HAS_RF = True
@@ -44,6 +51,12 @@ VIDEO_FILE = "/home/pi/251121/power.mp4"
 AUDIO_DEVICE = "alsa/hdmi:CARD=vc4hdmi,DEV=0"
 SOCK_PATH = "/tmp/mpv_rangers.sock"
 MPV_LOG = "/tmp/mpv_rangers.log"
+FPS = 25
+LOOKAHEAD = 0.0   # Latencia de salida compensada (s); --latency-ms o la calibrada con latency.py
+
+# La abre el arranque del show; timeout corto: mejor perder un frame que frenar la sincronización con el vídeo
+output = None
+OUTPUT_TIMEOUT = 0.04
 
 # COLORES
 C_OFF    = (0, 0, 0)
@@ -109,21 +122,11 @@ for k, v in INDEX.items():
         ALL_SIDES.extend(v)
 
 # TIMELINE
-T_RITA_END        = 9.84
-T_ZEDD_END        = 14.12
-T_START_ALARM     = 14.12
-T_START_ALFA      = 16.52
-T_START_TELEPORT  = 19.60
-T_START_PREMORPH  = 24.28
-T_START_RED       = 28.08
-T_START_YELLOW    = 34.60
-T_START_BLACK     = 40.36
-T_START_BLUE      = 46.20
-T_START_PINK      = 52.24
-T_START_WHITE     = 58.52
-T_START_NEED_MZ   = 67.52
-T_START_MEGAZORD  = 71.20 
-T_START_FINAL     = 113.40
+# Tiempos (T_RITA_END, T_START_RED...) y escenas en timelines/power_rangers_same_morph.json
+SCENE_EFFECTS = ("rita", "zedd", "alarm", "alfa", "teleport", "zordon", "ranger",
+                 "call_megazord", "megazord", "final")
+SHOW = load_show("power_rangers_same_morph.json", effects=SCENE_EFFECTS)
+globals().update(SHOW.times)
 
 RANGERS_TIMELINE = [
     (T_START_RED,    "RED",    POS_R_RED,    C_RED,    LEDS_ZORD_RED),
@@ -136,20 +139,22 @@ RANGERS_TIMELINE = [
 
 # ========= GESTIÓN MPV =========
 mpv_proc = None
-ipc_sock = None
+mpv = AsyncMpvClient()   # Lo conecta y lo lee el runtime asyncio
+clock = PlaybackClock()   # time-pos interpolado: el render no espera al IPC
 
 def cleanup_mpv():
+    clock.stop()
     try:
-        if ipc_sock: ipc_sock.close()
+        mpv.close()
     except: pass
     try:
         if mpv_proc: mpv_proc.terminate()
     except: pass
-    try:
-        send_frame(frame_fill(C_OFF))
-    except: pass
-
-atexit.register(cleanup_mpv)
+    if output is not None:
+        try:
+            send_frame(frame_fill(C_OFF))
+        except: pass
+        output.close()
 
 def start_mpv(video_path):
     global mpv_proc
@@ -169,410 +174,272 @@ def start_mpv(video_path):
     logf = open(MPV_LOG, "w")
     mpv_proc = subprocess.Popen(cmd, stdout=logf, stderr=logf)
 
-def connect_ipc(timeout=10.0):
-    global ipc_sock
-    t0 = time.time()
-    while time.time() - t0 < timeout:
-        if os.path.exists(SOCK_PATH): break
-        time.sleep(0.1)
-    try:
-        ipc_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        ipc_sock.connect(SOCK_PATH)
-        return True
-    except: return False
-
-def get_video_time():
-    if not ipc_sock: return -1.0
-    req = json.dumps({"command": ["get_property", "time-pos"], "request_id": 1}) + "\n"
-    try:
-        ipc_sock.sendall(req.encode("utf-8"))
-        ipc_sock.settimeout(0.1)
-        data = ipc_sock.recv(4096).decode("utf-8")
-        for line in data.split('\n'):
-            if not line: continue
-            msg = json.loads(line)
-            if msg.get("error") == "success" and "data" in msg:
-                val = msg["data"]
-                return float(val) if val is not None else 0.0
-    except: pass
-    return -1.0
-
 # ========= UTILIDADES GRÁFICAS =========
-ACTIVE_ZORDS = {} 
+# Capas, de abajo arriba: fondo y zords activos son estáticos (se componen una
+# vez y se reutilizan mientras no cambien); los efectos suman y los flashes
+# tapan, y ambos se vacían al empezar cada frame.
+comp = Compositor([
+    ("background", "replace", 1.0, True),
+    ("zords",      "replace", 1.0, True),
+    ("effects",    "add"),
+    ("flashes",    "replace"),
+])
+BACKGROUND, ZORDS, EFFECTS, FLASHES = comp["background"], comp["zords"], comp["effects"], comp["flashes"]
 
-def send_frame(pixels, duration=-1):
-    flat = []
-    for r, g, b in pixels:
-        flat.extend([int(r), int(g), int(b)])
-    try:
-        requests.post(f"{HOST}/json-rpc", 
-                      json={"command":"color", "color":flat, "priority":PRIORITY, "origin":ORIGIN, "duration":-1}, 
-                      timeout=0.04) 
-    except: pass
+def send_frame(px, duration=-1):
+    output.send(px.pack(), -1)
+
+def frame_fill(color): return Frame.fill(color)
 
-def frame_fill(color): return [color] * N
+def activate_zord(leds, col):
+    ZORDS.set(leds, col)
 
-def get_base_frame():
-    px = [C_OFF] * N
-    for idx, col in ACTIVE_ZORDS.items(): px[idx] = col
-    return px
+def zord_leds(): return np.flatnonzero(ZORDS.mask)
 
-def set_color(px, i, c): 
-    if 0 <= i < N: px[i] = c
+def free_leds(idx=None, exclude=()):
+    """LEDs de idx (o todos) sin zord activo ni en exclude: los efectos no los pisan."""
+    idx = np.arange(N) if idx is None else as_index(idx)
+    m = ~ZORDS.mask[idx]
+    if len(exclude): m &= ~np.isin(idx, exclude)
+    return idx[m]
 
-def add_color(px, i, c):
-    if 0 <= i < N:
-        r,g,b = px[i]
-        px[i] = (min(255, r+c[0]), min(255, g+c[1]), min(255, b+c[2]))
+def sparkle(idx, density):
+    return idx[rng.bernoulli(density, len(idx))]
 
 def scale(c, k): return (int(c[0]*k), int(c[1]*k), int(c[2]*k))
 def mix(c1, c2, t): 
     return (int(c1[0]+(c2[0]-c1[0])*t), int(c1[1]+(c2[1]-c1[1])*t), int(c1[2]+(c2[2]-c1[2])*t))
 
+LEVELS = [as_index(INDEX["B_L"]+INDEX["B_R"]+INDEX["B_T"]),
+          as_index(INDEX["M_L"]+INDEX["M_R"]+INDEX["M_T"]),
+          as_index(INDEX["T_L"]+INDEX["T_R"]+INDEX["T_T"]),
+          as_index(INDEX["Z1_L"]+INDEX["Z1_R"]+INDEX["Z1_T"])]
+CLIMB_STRIPS = [as_index(COL_RIGHT_UP), as_index(COL_LEFT_UP)]
+ZORDON_COLS  = [as_index(INDEX[k]) for k in ("Z1_L", "Z1_R", "T_L", "T_R")]
+
 # ========= EFECTOS =========
-def effect_climb(base_col, duration):
-    t0 = time.time()
-    while (time.time() - t0) < duration:
-        t_norm = (time.time() - t0) / duration
-        phase = (t_norm * 3) % 1.0
-        px = get_base_frame()
-        h_active = phase * 4
-        zones = [INDEX["B_L"]+INDEX["B_R"]+INDEX["B_T"], 
-                 INDEX["M_L"]+INDEX["M_R"]+INDEX["M_T"], 
-                 INDEX["T_L"]+INDEX["T_R"]+INDEX["T_T"], 
-                 INDEX["Z1_L"]+INDEX["Z1_R"]+INDEX["Z1_T"]]
-        for z_idx, zone in enumerate(zones):
-            dist = abs(z_idx - h_active)
-            if dist < 1.2:
-                k = 1.0 - (dist/1.2)
-                for i in zone: 
-                    if i not in ACTIVE_ZORDS: add_color(px, i, scale(base_col, k))
-        send_frame(px); time.sleep(0.05)
-
-def effect_lightning(base_col, duration):
-    t0 = time.time()
-    while (time.time() - t0) < duration:
-        px = get_base_frame()
-        for i in range(N):
-            if i not in ACTIVE_ZORDS and random.random() < 0.1:
-                add_color(px, i, scale(base_col, 0.3))
-        for _ in range(5):
-            pos = random.randint(0, N-1)
-            if pos not in ACTIVE_ZORDS:
-                set_color(px, pos, C_WHITE)
-                if pos+1 < N: add_color(px, pos+1, scale(base_col, 0.7))
-        send_frame(px); time.sleep(0.04)
-
-def effect_energy_implosion(ranger_leds, color, duration):
-    t0 = time.time()
-    while (time.time() - t0) < duration:
-        t_norm = (time.time() - t0) / duration
-        px = get_base_frame()
-        ranger_bright = scale(color, 0.2 + 0.8 * (t_norm**2))
-        for i in ranger_leds: set_color(px, i, ranger_bright)
-        density = 0.2 * (1.0 - t_norm)
-        for i in range(N):
-            if i not in ACTIVE_ZORDS and i not in ranger_leds:
-                if random.random() < density:
-                    add_color(px, i, scale(color, 0.8))
-        send_frame(px); time.sleep(0.05)
-
-def effect_snake_transfer(start_leds, end_leds, color, duration):
-    t0 = time.time()
-    while (time.time() - t0) < duration:
-        t_norm = (time.time() - t0) / duration
-        px = get_base_frame()
-        if t_norm < 0.3:
-            for i in start_leds: set_color(px, i, color)
-        if t_norm > 0.1 and t_norm < 0.9:
-            climb_t = (t_norm - 0.1) / 0.7
-            for col_strip in [COL_RIGHT_UP, COL_LEFT_UP]:
-                strip_len = len(col_strip)
-                head_pos = int(climb_t * strip_len)
-                for k in range(5):
-                    idx = head_pos - k
-                    if 0 <= idx < strip_len:
-                        intensity = 1.0 - (k/5.0)
-                        led_idx = col_strip[idx]
-                        add_color(px, led_idx, scale(color, intensity))
-        if t_norm > 0.8:
-            if int(time.time()*20) % 2 == 0:
-                for i in end_leds: set_color(px, i, C_WHITE)
-            else:
-                for i in end_leds: set_color(px, i, color)
-        send_frame(px); time.sleep(0.03)
+# Cada fase pinta en las capas del frame en curso; los render_* las combinan.
+def _implosion(t, ranger_leds, color):
+    FLASHES.set(ranger_leds, scale(color, 0.2 + 0.8 * (t**2)))
+    density = 0.2 * (1.0 - t)
+    EFFECTS.add(sparkle(free_leds(exclude=ranger_leds), density), scale(color, 0.8))
+
+def _climb(t, base_col):
+    h_active = (t * 3) % 1.0 * 4
+    for z_idx, zone in enumerate(LEVELS):
+        dist = abs(z_idx - h_active)
+        if dist < 1.2:
+            EFFECTS.add(free_leds(zone), scale(base_col, 1.0 - (dist/1.2)))
+
+def _snake(t, start_leds, end_leds, color, blink):
+    if t < 0.3:
+        FLASHES.set(start_leds, color)
+    if t > 0.1 and t < 0.9:
+        climb_t = (t - 0.1) / 0.7
+        k = np.arange(5)
+        for col_strip in CLIMB_STRIPS:
+            idx = int(climb_t * len(col_strip)) - k
+            ok = (idx >= 0) & (idx < len(col_strip))
+            EFFECTS.add(col_strip[idx[ok]], color, 1.0 - k[ok]/5.0)
+    if t > 0.8:
+        FLASHES.set(end_leds, C_WHITE if blink else color)
+
+def _lightning(base_col):
+    EFFECTS.add(sparkle(free_leds(), 0.1), scale(base_col, 0.3))
+    pos = rng.integers(0, N, 5)
+    pos = pos[~ZORDS.mask[pos]]
+    FLASHES.set(pos, C_WHITE)
+    EFFECTS.add(pos + 1, scale(base_col, 0.7))
 
 # ========= RENDERIZADORES =========
 
 def render_rita(elapsed):
     k = 0.2 + 0.8 * ((math.sin(elapsed*3)+1)/2)
-    px = get_base_frame()
-    for i in LEDS_RITA: set_color(px, i, scale(C_RITA, k))
-    send_frame(px)
+    comp.begin()
+    FLASHES.set(LEDS_RITA, scale(C_RITA, k))
+    send_frame(comp.render())
 
 def render_zedd(elapsed):
     k = 0.4 + 0.6 * ((math.sin(elapsed*4)+1)/2)
-    px = get_base_frame()
-    for i in LEDS_ZEDD: set_color(px, i, scale(C_ZEDD, k))
-    send_frame(px)
+    comp.begin()
+    FLASHES.set(LEDS_ZEDD, scale(C_ZEDD, k))
+    send_frame(comp.render())
 
 def render_alarm(elapsed):
     state = int(elapsed * 4) % 2
     col = C_ALARM_A if state == 0 else C_ALARM_B
-    px = [C_OFF] * N
-    for i in range(N): px[i] = scale(col, 0.8)
-    send_frame(px)
+    comp.begin()
+    FLASHES.paint(scale(col, 0.8))
+    send_frame(comp.render())
 
 def render_alfa(elapsed):
-    px = get_base_frame()
+    comp.begin()
     state = int(elapsed * 18) % 2
     alfa_color = C_ALFA if state == 0 else C_WHITE
-    for i in LEDS_ALFA: set_color(px, i, alfa_color)
-    send_frame(px)
+    FLASHES.set(LEDS_ALFA, alfa_color)
+    send_frame(comp.render())
 
 def render_teleport(elapsed):
-    px = get_base_frame()
-    for _ in range(10):
-        i = random.randint(0, N-1)
-        if random.random() > 0.5: px[i] = C_WHITE
-        else: px[i] = C_BLUE
-    send_frame(px)
+    comp.begin()
+    pos = rng.integers(0, N, 10)
+    white = rng.bernoulli(0.5, 10)
+    FLASHES.set(pos[white], C_WHITE)
+    FLASHES.set(pos[~white], C_BLUE)
+    send_frame(comp.render())
 
 def render_zordon(elapsed):
-    px = get_base_frame()
-    z_int = random.uniform(0.6, 1.0)
-    for i in LEDS_ZORDON: set_color(px, i, scale(C_ZORDON, z_int))
+    comp.begin()
+    z_int = rng.uniform(0.6, 1.0)
+    FLASHES.set(LEDS_ZORDON, scale(C_ZORDON, z_int))
     wave = (elapsed * 8) % 10
-    for col_list in [INDEX["Z1_L"], INDEX["Z1_R"], INDEX["T_L"], INDEX["T_R"]]:
-         L = len(col_list)
-         for idx, led in enumerate(col_list):
-             dist = abs((L - 1 - idx) - wave)
-             if dist < 2: add_color(px, led, scale(C_ZORDON, 0.5))
-    send_frame(px)
+    for col_list in ZORDON_COLS:
+        dist = np.abs(np.arange(len(col_list))[::-1] - wave)
+        EFFECTS.add(col_list[dist < 2], scale(C_ZORDON, 0.5))
+    send_frame(comp.render())
 
 def render_call_megazord(elapsed):
-    px = get_base_frame()
+    comp.begin()
     blink = int(elapsed * 15) % 2
     z_pulse = (math.sin(elapsed*20) + 1) / 2
-    for i in LEDS_ZORDON: set_color(px, i, scale(C_ZORDON, 0.5 + 0.5*z_pulse))
-    for idx, col in ACTIVE_ZORDS.items():
-        if blink == 0: set_color(px, idx, C_WHITE)
-        else: set_color(px, idx, col)
-    send_frame(px)
+    FLASHES.set(LEDS_ZORDON, scale(C_ZORDON, 0.5 + 0.5*z_pulse))
+    if blink == 0: FLASHES.set(zord_leds(), C_WHITE)
+    send_frame(comp.render())
 
 def render_ranger_morph(elapsed, duration, r_leds, r_col, z_leds):
-    px = get_base_frame()
+    comp.begin()
     
     p1 = duration * 0.35
     p2 = p1 + (duration * 0.20)
     p3 = p2 + (duration * 0.25)
     
     if elapsed < p1: 
-        t = elapsed / p1
-        ranger_bright = scale(r_col, 0.2 + 0.8 * (t**2))
-        for i in r_leds: set_color(px, i, ranger_bright)
-        density = 0.2 * (1.0 - t)
-        for i in range(N):
-            if i not in ACTIVE_ZORDS and i not in r_leds:
-                if random.random() < density: add_color(px, i, scale(r_col, 0.8))
-    
+        _implosion(elapsed / p1, r_leds, r_col)
     elif elapsed < p2: 
-        t = (elapsed - p1) / (duration * 0.20)
-        h_active = (t * 3) % 1.0 * 4
-        zones = [INDEX["B_L"]+INDEX["B_R"]+INDEX["B_T"], 
-                 INDEX["M_L"]+INDEX["M_R"]+INDEX["M_T"], 
-                 INDEX["T_L"]+INDEX["T_R"]+INDEX["T_T"], 
-                 INDEX["Z1_L"]+INDEX["Z1_R"]+INDEX["Z1_T"]]
-        for z_idx, zone in enumerate(zones):
-            if abs(z_idx - h_active) < 1.2:
-                k = 1.0 - (abs(z_idx - h_active)/1.2)
-                for i in zone: 
-                    if i not in ACTIVE_ZORDS: add_color(px, i, scale(r_col, k))
-        
+        _climb((elapsed - p1) / (duration * 0.20), r_col)
     elif elapsed < p3: 
-        t = (elapsed - p2) / (duration * 0.25)
-        if t < 0.3:
-            for i in r_leds: set_color(px, i, r_col)
-        if t > 0.1 and t < 0.9:
-            climb_t = (t - 0.1) / 0.7
-            for col_strip in [COL_RIGHT_UP, COL_LEFT_UP]:
-                strip_len = len(col_strip)
-                head_pos = int(climb_t * strip_len)
-                for k in range(5):
-                    idx = head_pos - k
-                    if 0 <= idx < strip_len:
-                        intensity = 1.0 - (k/5.0)
-                        led_idx = col_strip[idx]
-                        add_color(px, led_idx, scale(r_col, intensity))
-        if t > 0.8:
-            if int(elapsed*20) % 2 == 0:
-                for i in z_leds: set_color(px, i, C_WHITE)
-            else:
-                for i in z_leds: set_color(px, i, r_col)
-
+        _snake((elapsed - p2) / (duration * 0.25), r_leds, z_leds, r_col, int(elapsed*20) % 2 == 0)
     else: 
-        for i in range(N):
-            if i not in ACTIVE_ZORDS and random.random() < 0.1:
-                add_color(px, i, scale(r_col, 0.3))
-        for _ in range(5):
-            pos = random.randint(0, N-1)
-            if pos not in ACTIVE_ZORDS:
-                set_color(px, pos, C_WHITE)
-                if pos+1 < N: add_color(px, pos+1, scale(r_col, 0.7))
+        _lightning(r_col)
     
-    send_frame(px)
+    send_frame(comp.render())
+
+MZ_ZONES = list(zip(LEVELS, [C_YELLOW, C_BLUE, C_PINK, C_RED]))
+Z1_STRIP_IDX = as_index(Z1_STRIP)
+ALL_SIDES_IDX = as_index(ALL_SIDES)
 
 def render_megazord_complex(elapsed):
-    px = get_base_frame() 
-    ASSEMBLY_COLORS = [C_YELLOW, C_BLACK, C_BLUE, C_PINK, C_WHITE]
-    
-    ZONES_MAP = [
-        (INDEX["B_L"]+INDEX["B_R"]+INDEX["B_T"], C_YELLOW), 
-        (INDEX["M_L"]+INDEX["M_R"]+INDEX["M_T"], C_BLUE),   
-        (INDEX["T_L"]+INDEX["T_R"]+INDEX["T_T"], C_PINK),   
-        (INDEX["Z1_L"]+INDEX["Z1_R"]+INDEX["Z1_T"], C_RED)  
-    ]
+    comp.begin()
     
     if elapsed < 8.0:
-        for zone_leds, z_col in ZONES_MAP:
-            for i in zone_leds:
-                set_color(px, i, scale(z_col, 0.15))
-        #for i in LEDS_ZORD_RED: set_color(px, i, C_RED)
+        for zone_leds, z_col in MZ_ZONES:
+            FLASHES.set(zone_leds, scale(z_col, 0.15))
         scan_pos = int((elapsed * 15) % len(Z1_STRIP))
-        set_color(px, Z1_STRIP[scan_pos], C_GOLD)
+        FLASHES.set(Z1_STRIP_IDX[scan_pos], C_GOLD)
         
     elif elapsed < 18.0:
         breath = (math.sin(elapsed * 10) + 1) / 2
-        for zone_leds, z_col in ZONES_MAP:
-            for i in zone_leds:
-                set_color(px, i, scale(z_col, 0.2 + 0.6*breath))
-        for i in ALL_SIDES:
-            if random.random() < 0.15: set_color(px, i, scale(C_WHITE, 0.6))
+        for zone_leds, z_col in MZ_ZONES:
+            FLASHES.set(zone_leds, scale(z_col, 0.2 + 0.6*breath))
+        FLASHES.set(sparkle(ALL_SIDES_IDX, 0.15), scale(C_WHITE, 0.6))
             
     elif elapsed < 28.0:
-        for _ in range(3):
-            pos = random.randint(0, N-1)
-            #if pos not in ACTIVE_ZORDS:
-            set_color(px, pos, C_WHITE)
-            if pos+1 < N: add_color(px, pos+1, C_BLUE)
+        pos = rng.integers(0, N, 3)
+        FLASHES.set(pos, C_WHITE)
+        EFFECTS.add(pos + 1, C_BLUE)
                 
     elif elapsed < 35.0:
         for _, _, r_leds, r_col, _ in RANGERS_TIMELINE:
-            for i in r_leds: set_color(px, i, r_col)
-        for idx in ACTIVE_ZORDS.keys():
-            set_color(px, idx, C_GOLD)
+            FLASHES.set(r_leds, r_col)
+        FLASHES.set(zord_leds(), C_GOLD)
             
     else:
         cycle = (elapsed - 35.0) * 2
         h_fill = (cycle % 1.0) * 4
-        zones_list = [z[0] for z in ZONES_MAP]
-        for z_idx, zone in enumerate(zones_list):
+        for z_idx, (zone, _) in enumerate(MZ_ZONES):
             if z_idx < h_fill:
-                for i in zone: 
-                    set_color(px, i, scale(C_GOLD, 0.3))
+                FLASHES.set(zone, scale(C_GOLD, 0.3))
             if abs(z_idx - h_fill) < 0.5:
-                for i in zone: 
-                    set_color(px, i, C_WHITE)
-    send_frame(px)
+                FLASHES.set(zone, C_WHITE)
+    send_frame(comp.render())
+
+def render_final():
+    # Escena fija: se pinta una vez en el fondo y después solo se reenvía la mezcla guardada
+    if not BACKGROUND.mask.any():
+        BACKGROUND.set(ZONE1 + ZONE2, C_FINAL_AMBIENT)
+        for _, _, r_leds, r_col, _ in RANGERS_TIMELINE:
+            BACKGROUND.set(r_leds, r_col)
+        BACKGROUND.set(LEDS_VILLAINS_FULL, C_RITA)
+        BACKGROUND.set(LEDS_ZEDD, C_ZEDD)
+    comp.begin()
+    send_frame(comp.render())
+
+# ========= ESCENAS =========
+# Una escena activa en cada instante del vídeo; las simples solo necesitan su renderizador
+RENDERERS = {"rita": render_rita, "zedd": render_zedd, "alarm": render_alarm, "alfa": render_alfa,
+             "teleport": render_teleport, "zordon": render_zordon, "megazord": render_megazord_complex}
+RANGER_INDEX = {name: i for i, (_, name, *_) in enumerate(RANGERS_TIMELINE)}
+for cue in SHOW.cues:
+    if cue[2] == "ranger" and (cue[3] or {}).get("ranger") not in RANGER_INDEX:
+        raise ValueError(f"{SHOW.path}: ranger desconocido en {cue}")
+SCENES = SHOW.timeline()
 
 # ========= MAIN LOOP =========
-def run_show():
+def run_show(seed=None):
+    print(f">>> Semilla: {rng.seed_show(seed)}")
     rf = None
     if HAS_RF: rf = RFManager()
     
     print(f">>> Iniciando Video: {VIDEO_FILE}")
     start_mpv(VIDEO_FILE)
-    if not connect_ipc():
-        print("[ERROR] MPV no responde.")
-        return
-
     print(">>> Sincronizando (Motor Stateless)...")
     video_started = False
     last_ranger_processed = -1 
-    
-    try:
-        while True:
-            if mpv_proc.poll() is not None: break
-            t_video = get_video_time()
-            
-            if t_video < 0:
-                time.sleep(0.04)
-                continue
-
-            if not video_started:
-                if t_video > 0.1:
-                    video_started = True
-                    print("\n>>> VIDEO DETECTADO!")
-                else:
-                    send_frame(frame_fill(C_OFF))
-                    time.sleep(0.04)
-                    continue
-            
-            # --- SELECTOR DE ESCENA ---
-            if t_video < T_RITA_END:
-                render_rita(t_video)
-            elif t_video < T_ZEDD_END:
-                render_zedd(t_video - T_RITA_END)
-            elif t_video < T_START_ALFA:
-                render_alarm(t_video - T_START_ALARM)
-            elif t_video < T_START_TELEPORT:
-                render_alfa(t_video - T_START_ALFA)
-            elif t_video < T_START_PREMORPH:
-                render_teleport(t_video - T_START_TELEPORT)
-            elif t_video < T_START_RED:
-                render_zordon(t_video - T_START_PREMORPH)
-            
-            elif t_video < T_START_MEGAZORD:
-                if t_video < T_START_NEED_MZ:
-                    curr_ranger_idx = -1
-                    for idx, (start_t, _, _, _, _) in enumerate(RANGERS_TIMELINE):
-                        if t_video >= start_t: curr_ranger_idx = idx
-                        else: break
-                    
-                    if curr_ranger_idx >= 0:
-                        if curr_ranger_idx > last_ranger_processed:
-                            if last_ranger_processed >= 0:
-                                prev_z_leds = RANGERS_TIMELINE[last_ranger_processed][4]
-                                prev_z_col  = RANGERS_TIMELINE[last_ranger_processed][3]
-                                for i in prev_z_leds: ACTIVE_ZORDS[i] = prev_z_col
-                            last_ranger_processed = curr_ranger_idx
-                            print(f"\nRanger: {RANGERS_TIMELINE[curr_ranger_idx][1]}")
-                        
-                        r_start, _, r_leds, r_col, z_leds = RANGERS_TIMELINE[curr_ranger_idx]
-                        if curr_ranger_idx < len(RANGERS_TIMELINE) - 1:
-                            r_end = RANGERS_TIMELINE[curr_ranger_idx+1][0]
-                        else:
-                            r_end = T_START_NEED_MZ
-                        
-                        render_ranger_morph(t_video - r_start, r_end - r_start, r_leds, r_col, z_leds)
-                else:
-                    if last_ranger_processed == 5:
-                         prev_z_leds = RANGERS_TIMELINE[5][4]
-                         prev_z_col  = RANGERS_TIMELINE[5][3]
-                         for i in prev_z_leds: ACTIVE_ZORDS[i] = prev_z_col
-                         last_ranger_processed = 6
-                    
-                    render_call_megazord(t_video - T_START_NEED_MZ)
-
-            elif t_video < T_START_FINAL:
-                render_megazord_complex(t_video - T_START_MEGAZORD)
 
+    def tick(t_video):
+        # t_video ya lleva el lookahead (lo suma el runtime)
+        nonlocal video_started, last_ranger_processed
+        if not video_started:
+            if t_video > 0.1:
+                video_started = True
+                print("\n>>> VIDEO DETECTADO!")
             else:
-                px = [C_OFF] * N
-                FINAL_ZONES = set(ZONE1 + ZONE2)
-                for i in FINAL_ZONES: px[i] = C_FINAL_AMBIENT
-                for idx, col in ACTIVE_ZORDS.items(): px[idx] = col
-                for _, _, r_leds, r_col, _ in RANGERS_TIMELINE:
-                    for i in r_leds: px[i] = r_col
-                
-                for i in LEDS_VILLAINS_FULL: px[i] = C_RITA
-                for i in LEDS_ZEDD: px[i] = C_ZEDD
-
-                send_frame(px)
-                time.sleep(0.5)
-
-            time.sleep(0.04)
+                send_frame(frame_fill(C_OFF))
+                return False
+
+        # Mismo frame del vídeo, mismas chispas (con la misma semilla)
+        rng.cue("same_morph", int(t_video * FPS + 1e-6))
+
+        # --- SELECTOR DE ESCENA ---
+        for name, (cue, *_) in SCENES.advance(t_video).items():
+            elapsed = cue.elapsed(t_video)
+            if name == "ranger":
+                curr_ranger_idx = RANGER_INDEX[cue.data["ranger"]]
+                if curr_ranger_idx > last_ranger_processed:
+                    if last_ranger_processed >= 0:
+                        prev_z_leds = RANGERS_TIMELINE[last_ranger_processed][4]
+                        prev_z_col  = RANGERS_TIMELINE[last_ranger_processed][3]
+                        activate_zord(prev_z_leds, prev_z_col)
+                    last_ranger_processed = curr_ranger_idx
+                    print(f"\nRanger: {RANGERS_TIMELINE[curr_ranger_idx][1]}")
+                _, _, r_leds, r_col, z_leds = RANGERS_TIMELINE[curr_ranger_idx]
+                render_ranger_morph(elapsed, cue.end - cue.start, r_leds, r_col, z_leds)
+            elif name == "call_megazord":
+                if last_ranger_processed == 5:
+                    prev_z_leds = RANGERS_TIMELINE[5][4]
+                    prev_z_col  = RANGERS_TIMELINE[5][3]
+                    activate_zord(prev_z_leds, prev_z_col)
+                    last_ranger_processed = 6
+                render_call_megazord(elapsed)
+            elif name == "final":
+                render_final()   # Escena fija: la salida no reenvía el frame repetido (solo el keepalive)
+            else:
+                RENDERERS[name](elapsed)
+        return False
 
+    try:
+        ShowRuntime(FPS, mpv, clock, output, proc=mpv_proc, lookahead=LOOKAHEAD).run(tick, SOCK_PATH)
+    except RuntimeError as e:
+        print(f"[ERROR] MPV no responde: {e}")
     except KeyboardInterrupt:
         print("\nCancelado.")
     finally:
@@ -580,4 +447,12 @@ def run_show():
         cleanup_mpv()
 
 if __name__ == "__main__":
-    run_show()
\ No newline at end of file
+    p = argparse.ArgumentParser(description="Power Rangers: morph sincronizado con el vídeo")
+    p.add_argument("--latency-ms", type=float, default=None, help="Latencia de salida a compensar (por defecto la calibrada con latency.py)")
+    p.add_argument("--seed", type=int, default=None, help="Semilla de los efectos aleatorios (por defecto una nueva en cada pase)")
+    args = p.parse_args()
+    output = AsyncOutput(open_output("json", HOST, PRIORITY, ORIGIN, timeout=OUTPUT_TIMEOUT))
+    atexit.register(cleanup_mpv)
+    LOOKAHEAD = latency.lookahead(args.latency_ms, "json", HOST)
+    print(f">>> Lookahead: {LOOKAHEAD * 1e3:.0f} ms")
+    run_show(args.seed)
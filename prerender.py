@@ -0,0 +1,132 @@
+# prerender.py
+# Prerender offline de un show completo a una caché de frames en disco: un .npy
+# uint8 (frames, N, 3) con los bytes ya listos para la salida (clamp, reglas de
+# zona y LUT aplicados) y un .json con fps, número de frames y la clave. En el
+# show se abre con mmap y el frame de cada instante es un índice por time-pos:
+# sin render por frame, el coste en la Pi no depende de lo complejo del efecto.
+#
+# La clave es un hash del código de los módulos del show (todos los .py de este
+# directorio que tiene cargados), del timeline, de la semilla y de los parámetros
+# de render: si cambia el show, el layout o la semilla, la caché se rehace sola.
+#
+# Con workers > 1 el show se parte en trozos de CHUNK_S segundos que renderiza un
+# ProcessPoolExecutor, y cada proceso escribe sus frames directamente en el .npy
+# compartido (mmap r+), sin pasar los frames de vuelta por el pool. Vale porque
+# los shows pintan sin estado (render_frame): el azar sale de rng.cue(semilla del
+# show, cue, frame), así que cada trozo sortea lo mismo que en un render seguido,
+# y el estado al inicio del trozo (fases, estela) se reconstruye desde t.
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from timeline import CACHE_DIR
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHUNK_S = 10.0   # Segundos de show por trozo en el render en paralelo
+
+def source_key(*extra, files=()):
+    """Hash del código local cargado (show, layout, frame...), de los ficheros dados y de extra."""
+    h = hashlib.sha256()
+    paths = {os.path.abspath(m.__file__) for m in list(sys.modules.values())
+             if getattr(m, "__file__", None) and os.path.dirname(os.path.abspath(m.__file__)) == HERE
+             and m.__file__.endswith(".py")}
+    for path in sorted(paths) + [os.path.abspath(f) for f in files]:
+        h.update(path.encode("utf-8"))
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    h.update(repr(extra).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+class FrameCache:
+    """Frames prerenderizados de un show, abiertos con mmap e indexados por tiempo."""
+
+    def __init__(self, path):
+        with open(path + ".json") as f:
+            self.meta = json.load(f)
+        self.fps = self.meta["fps"]
+        self.frames = np.load(path + ".npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        return len(self.frames) / self.fps
+
+    def index(self, t):
+        # El frame k cubre [k/fps, (k+1)/fps); el margen evita que k/fps*fps caiga en k-1
+        return min(max(int(t * self.fps + 1e-6), 0), len(self.frames) - 1)
+
+    def frame(self, t):
+        """Bytes RGB del frame del instante t (el último si t pasa del final)."""
+        return self.frames[self.index(t)].tobytes()
+
+def cache_path(name, key):
+    return os.path.join(CACHE_DIR, "frames", f"{name}-{key}")
+
+def _render_chunk(path, render, fps, n, k0, k1):
+    # En el proceso del pool: frames [k0, k1) directamente al .npy compartido
+    frames = np.load(path, mmap_mode="r+")
+    for k in range(k0, k1):
+        frames[k] = np.frombuffer(render(k / fps), dtype=np.uint8).reshape(n, 3)
+    frames.flush()
+    return k1 - k0
+
+def render_frames(path, render, fps, count, n, workers=1, init=None, initargs=(), chunk_s=CHUNK_S, label=None):
+    """
+    Crea el .npy `path` con `count` frames y lo rellena con render(t). Con
+    workers > 1 lo hacen `workers` procesos por trozos de chunk_s segundos: render
+    e init deben ser funciones de módulo (se pasan por pickle). init(*initargs)
+    prepara cada proceso (timeline, semilla), o este mismo si va en serie.
+    Devuelve los segundos empleados.
+    """
+    frames = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(count, n, 3))
+    t0 = time.perf_counter()
+    if workers <= 1:
+        if init is not None: init(*initargs)
+        for k in range(count):
+            frames[k] = np.frombuffer(render(k / fps), dtype=np.uint8).reshape(n, 3)
+            if label and k % (10 * fps) == 0:
+                print(f"\r[prerender] {label}: {k}/{count} frames", end="", flush=True)
+        frames.flush()
+        del frames
+        return time.perf_counter() - t0
+    frames.flush()
+    del frames   # Los procesos abren el fichero por su cuenta
+    step = max(1, int(chunk_s * fps))
+    done = 0
+    with ProcessPoolExecutor(workers, initializer=init, initargs=initargs) as pool:
+        jobs = [pool.submit(_render_chunk, path, render, fps, n, k0, min(count, k0 + step))
+                for k0 in range(0, count, step)]
+        for job in as_completed(jobs):
+            done += job.result()
+            if label: print(f"\r[prerender] {label}: {done}/{count} frames ({workers} procesos)", end="", flush=True)
+    return time.perf_counter() - t0
+
+def prerender(name, key, render, fps, duration, n, progress=True, workers=1, init=None, initargs=()):
+    """
+    Devuelve la caché `name` con clave `key`, renderizándola antes si no existe.
+    render(t) devuelve los bytes del frame en t. Con workers > 1 se renderiza en
+    paralelo por trozos (ver render_frames); el resultado es el mismo byte a byte.
+    """
+    path = cache_path(name, key)
+    if os.path.exists(path + ".json"):
+        return FrameCache(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    count = int(duration * fps) + 1
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    secs = render_frames(tmp, render, fps, count, n, workers, init, initargs, label=name if progress else None)
+    if progress:
+        print(f"\r[prerender] {name}: {count} frames en {secs:.1f} s ({secs / count * 1e3:.2f} ms/frame)")
+    os.replace(tmp, path + ".npy")
+    # El .json se escribe el último: si existe, la caché está completa
+    with open(path + ".json.tmp", "w") as f:
+        json.dump({"name": name, "key": key, "fps": fps, "frames": count, "n": n}, f)
+    os.replace(path + ".json.tmp", path + ".json")
+    return FrameCache(path)
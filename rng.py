@@ -0,0 +1,75 @@
+# rng.py
+# Aleatoriedad de los shows: campos enteros por frame (Bernoulli, uniforme,
+# enteros) en una sola llamada NumPy en vez de un random.random() por LED, y
+# con semilla explícita en lugar de random.seed().
+#
+# seed_show(semilla) fija la semilla del show; cue(nombre, frame) reinicia el
+# generador a partir de (semilla del show, nombre del cue, frame). Así lo que
+# sale en un cue no depende de lo que se haya sorteado antes: el mismo show con
+# la misma semilla da exactamente los mismos frames (se pueden cachear, comparar
+# y prerenderizar), y cambiar un cue no altera las chispas de los demás.
+
+import hashlib
+
+import numpy as np
+
+show_seed = None
+_bits = np.random.PCG64()
+_gen = np.random.Generator(_bits)
+
+def _reseed(key):
+    # Estado PCG64 sacado de un hash de la clave: ~3 us frente a ~15 us de
+    # default_rng(), que importa porque se reinicia en cada frame
+    h = hashlib.blake2b(key.encode("utf-8"), digest_size=32).digest()
+    _bits.state = {"bit_generator": "PCG64",
+                   "state": {"state": int.from_bytes(h[:16], "little"),
+                             "inc": int.from_bytes(h[16:], "little") | 1},
+                   "has_uint32": 0, "uinteger": 0}
+
+def seed_show(seed=None):
+    """Fija la semilla del show (None: una nueva al azar). Devuelve la semilla usada para poder repetir el pase."""
+    global show_seed
+    if seed is None: seed = int(np.random.SeedSequence().entropy % 2**32)
+    show_seed = int(seed)
+    _reseed(f"{show_seed}")
+    return show_seed
+
+def cue(name, frame=None, seed=None):
+    """
+    Reinicia el generador para el cue `name` (y opcionalmente un frame dentro de él).
+    `seed` fija una semilla propia del cue en lugar de derivarla de la del show.
+    """
+    _reseed(f"{show_seed if seed is None else int(seed)}/{name}/{'' if frame is None else int(frame)}")
+    return _gen
+
+def generator():
+    return _gen
+
+# ========= CAMPOS POR FRAME =========
+def bernoulli(p, size=None):
+    """Array bool: True con probabilidad p (escalar o una probabilidad por elemento)."""
+    if size is None: size = np.shape(p)
+    return _gen.random(size) < p
+
+def uniform(lo=0.0, hi=1.0, size=None):
+    return _gen.uniform(lo, hi, size)
+
+def integers(lo, hi, size=None):
+    """Enteros en [lo, hi)."""
+    return _gen.integers(lo, hi, size)
+
+def chance(p):
+    """Un único sorteo: True con probabilidad p."""
+    return _gen.random() < p
+
+def choice(seq, size=None):
+    """Elemento(s) de seq al azar, con repetición."""
+    i = _gen.integers(0, len(seq), size)
+    if size is None: return seq[i]
+    return np.asarray(seq)[i]
+
+def sample(seq, k):
+    """k elementos distintos de seq, como random.sample (devuelve un array)."""
+    return np.asarray(seq)[_gen.random(len(seq)).argsort()[:k]]
+
+seed_show()
@@ -0,0 +1,215 @@
+# runtime.py
+# Runtime asyncio de los shows. En lugar de un único bucle que pregunta a mpv,
+# renderiza, envía y duerme uno detrás de otro, cada parte es una tarea y las
+# esperas de E/S se solapan:
+#
+#   mpv     lee el socket IPC (streams asyncio) y reparte respuestas y eventos;
+#           el PlaybackClock se alimenta de los time-pos que notifica mpv
+#   ticker  llama a tick(t) del show con el tiempo del reloj, en los deadlines
+#           de un FrameScheduler (FPS reales, retraso de cada tick medido)
+#   output  vacía el buzón de frames; el backend (requests, sockets) bloquea,
+#           así que cada envío corre en un hilo propio del executor
+#   rf      duerme hasta el siguiente cue RF del timeline y lo dispara, sin
+#           esperar al tick de frame; tras un seek hacia atrás los relés ya
+#           disparados no se repiten (salvo rf_rearm=True)
+#
+# Todo corre en el hilo del bucle salvo el envío del backend: el show no
+# necesita locks. Al acabar (tick devuelve True, mpv se cierra o llega al final)
+# se cancelan las tareas, sale el último frame pendiente y el buzón vuelve a
+# enviar en línea, para que los fundidos finales y cleanup() sigan funcionando.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from mpv_ipc import MpvClient
+from scheduler import FrameScheduler
+from timeline import INF
+
+RF_POLL_S = 0.05   # Máximo sin mirar el reloj en la tarea RF (seek, pausa, cambio de speed)
+
+# ========= MPV =========
+class AsyncMpvClient(MpvClient):
+    """MpvClient cuyo lector es una tarea del bucle (asyncio streams) en vez de un hilo."""
+
+    def __init__(self):
+        super().__init__()
+        self._loop = None
+        self._writer = None
+
+    async def connect_async(self, path, timeout=10.0):
+        """Conecta (esperando a que mpv cree el socket) y devuelve el StreamReader para ingest()."""
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(path, limit=1 << 20)
+                break
+            except OSError:
+                if loop.time() - t0 > timeout: raise RuntimeError("No se pudo conectar al socket IPC de mpv") from None
+                await asyncio.sleep(0.05)
+        self._loop, self._writer = loop, writer
+        self.sock = writer
+        self.eof = False
+        for oid, (name, _) in self._observers.items():
+            self.request("observe_property", oid, name)
+        return reader
+
+    async def ingest(self, reader):
+        """Tarea lectora: readline ya junta los mensajes partidos y separa los pegados."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                if line.strip(): self._dispatch(line)
+        except (OSError, ValueError):
+            pass
+        self._closed()
+
+    def _write(self, data):
+        if self._writer is None: return super()._write(data)
+        # request() puede llamarse desde otro hilo: la escritura siempre en el bucle
+        self._loop.call_soon_threadsafe(self._writer.write, data)
+
+    def close(self):
+        if self._writer is None: return super().close()
+        w, self._writer, self.sock = self._writer, None, None
+        try: w.close()
+        except RuntimeError: pass   # El bucle ya terminó
+        self._closed()
+
+# ========= SALIDA =========
+class AsyncOutput:
+    """
+    Buzón de una plaza, como ThreadedOutput, vaciado por una tarea del runtime:
+    send() deja el frame y vuelve; si llega otro antes de enviarse, el viejo se
+    descarta. Fuera del runtime (antes de run() o tras acabar) envía y espera.
+    Todos los envíos pasan por el mismo hilo: el backend nunca se usa a la vez.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.timeout = inner.timeout
+        self.stats = inner.stats
+        self.closed = False
+        self._slot = None
+        self._ready = None        # asyncio.Event mientras la tarea está viva
+        self._idle = None
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix=f"{inner.name}-tx")
+        self.failures = 0         # Excepciones del backend que no son de red
+
+    def send(self, rgb, duration=-1):
+        if self.closed: return False
+        if self._ready is None: return self._pool.submit(self.inner.send, rgb, duration).result()
+        if self._slot is not None: self.stats.drop()
+        self._slot = (rgb, duration)
+        self._ready.set()
+        return True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._ready, self._idle = asyncio.Event(), asyncio.Event()
+        try:
+            while True:
+                self._idle.set()
+                await self._ready.wait()
+                self._ready.clear()
+                self._idle.clear()
+                rgb, duration = self._slot
+                self._slot = None
+                try:
+                    await loop.run_in_executor(self._pool, self.inner.send, rgb, duration)
+                except Exception as e:
+                    # Igual que ThreadedOutput: un fallo del backend no puede parar la tarea
+                    self.stats.error()
+                    self.failures += 1
+                    if self.failures == 1 or self.failures % 100 == 0:
+                        print(f"[{self.name}] Error en el envío ({self.failures}): {e!r}")
+        finally:
+            self._ready = self._idle = None
+            if self._slot is not None:   # Cancelado con un frame pendiente: sale detrás del que está en vuelo
+                self._pool.submit(self.inner.send, *self._slot)
+                self._slot = None
+
+    async def flush(self):
+        """Espera a que el último frame depositado haya salido."""
+        while self._idle is not None and (self._slot is not None or not self._idle.is_set()):
+            await asyncio.sleep(0.001)
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        self._pool.shutdown(wait=True)
+        self.inner.close()
+
+# ========= RUNTIME =========
+class ShowRuntime:
+    """
+    Ejecuta un show: tick(t) pinta el frame del instante t del vídeo (y lo envía
+    con output.send) y devuelve True cuando el show ha terminado. `proc` es el
+    Popen de mpv; `rf_timeline` un Timeline con cues "rf" para `rf` (RFManager).
+    `lookahead` (s, ver latency.py) adelanta el tiempo que recibe tick() para
+    compensar lo que tarda un frame en llegar a las luces; el RF va sin él.
+    Los cues RF solo salen una vez por pase: si el vídeo vuelve atrás, los que
+    ya se dispararon no se repiten hasta dejar atrás el punto más lejano
+    alcanzado. Con `rf_rearm` se rearman como el resto del timeline.
+    """
+
+    def __init__(self, fps, mpv, clock, output=None, proc=None, rf=None, rf_timeline=None, lookahead=0.0,
+                 rf_rearm=False):
+        self.fps = fps
+        self.lookahead = lookahead
+        self.rf_rearm = rf_rearm
+        self.mpv = mpv
+        self.clock = clock
+        self.output = output
+        self.proc = proc
+        self.rf = rf
+        self.rf_timeline = rf_timeline
+        self.sched = FrameScheduler(fps)
+
+    def run(self, tick, sock_path, timeout=10.0):
+        asyncio.run(self._main(tick, sock_path, timeout))
+
+    async def _main(self, tick, sock_path, timeout):
+        self.clock.follow(self.mpv)   # time-pos, pause y speed llegan como eventos
+        reader = await self.mpv.connect_async(sock_path, timeout)
+        tasks = [asyncio.create_task(self.mpv.ingest(reader), name="mpv")]
+        if isinstance(self.output, AsyncOutput):
+            tasks.append(asyncio.create_task(self.output.run(), name="output"))
+        if self.rf is not None and self.rf_timeline is not None:
+            tasks.append(asyncio.create_task(self._rf(), name="rf"))
+        try:
+            await self._ticker(tick)
+            if isinstance(self.output, AsyncOutput): await self.output.flush()
+        finally:
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.mpv.close()
+            print(f"[frames] {self.sched.stats.summary()}")
+
+    def _finished(self):
+        return (self.proc is not None and self.proc.poll() is not None) or self.mpv.eof
+
+    async def _ticker(self, tick):
+        self.sched.start()
+        while not self._finished():
+            t = self.clock.now()
+            if t is not None and tick(t + self.lookahead): return
+            await self.sched.wait_async()
+
+    async def _rf(self):
+        tl = self.rf_timeline
+        reached = -INF   # Cue RF más tardío ya disparado (los relés no se deshacen con un seek)
+        while True:
+            wait = RF_POLL_S
+            t = self.clock.now()
+            if t is not None:
+                done = reached
+                for cue in tl.advance(t).get("rf", ()):
+                    if cue.start <= done and not self.rf_rearm: continue
+                    reached = max(reached, cue.start)
+                    self.rf.send(cue.data)
+                if not self.clock.paused:
+                    wait = min(wait, (tl.next_at() - t) / max(self.clock.speed, 1e-3))
+            await asyncio.sleep(max(0.0, wait))
@@ -0,0 +1,104 @@
+# scheduler.py
+# Reloj de frames a ritmo fijo. Los bucles hacían `send_frame(px);
+# time.sleep(1/FPS)`, así que el periodo real era render + envío + 1/FPS y los
+# shows iban por debajo de su FPS (y los efectos de power_rangers.py duraban más
+# que sus `seconds`). Aquí cada tick tiene un deadline absoluto t0 + k/FPS sobre
+# time.monotonic(): se duerme solo lo que falta hasta él, así que el trabajo del
+# frame no se suma al periodo y el error no se acumula.
+#
+# Si un frame llega tarde más de un periodo entero, los ticks vencidos se saltan
+# en vez de recuperarlos en ráfaga: el show sigue en hora y frames() devuelve el
+# índice real del tick, así que un efecto de N frames dura siempre N/FPS. Cada
+# tick guarda cuánto tarde despertó (TickStats) para poder decir cuándo la Pi
+# no llega a los FPS pedidos.
+
+import asyncio
+import time
+from collections import deque
+
+class TickStats:
+    """Ticks, ticks saltados y retraso p50/p99/máximo respecto al deadline."""
+
+    def __init__(self, window=600):
+        self.ticks = 0
+        self.skipped = 0
+        self.max_late = 0.0
+        self.late = deque(maxlen=window)
+
+    def record(self, late):
+        self.ticks += 1
+        self.late.append(late)
+        if late > self.max_late: self.max_late = late
+
+    def percentile(self, p):
+        if not self.late: return 0.0
+        data = sorted(self.late)
+        return data[min(len(data) - 1, int(round(p / 100.0 * (len(data) - 1))))]
+
+    def summary(self):
+        return (f"{self.ticks} ticks, {self.skipped} saltados, retraso p50 {self.percentile(50) * 1e3:.1f} ms, "
+                f"p99 {self.percentile(99) * 1e3:.1f} ms, máx {self.max_late * 1e3:.1f} ms")
+
+class FrameScheduler:
+    def __init__(self, fps, clock=time.monotonic, sleep=time.sleep):
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.clock = clock
+        self._sleep = sleep
+        self.stats = TickStats()
+        self.start()
+
+    def start(self, at=None):
+        """Tick 0 en `at` (por defecto ahora)."""
+        self.t0 = self.clock() if at is None else at
+        self.tick = 0
+
+    def deadline(self, k=None):
+        return self.t0 + (self.tick if k is None else k) * self.period
+
+    def _next(self, now):
+        # Siguiente tick; si ya vencieron varios, el último vencido (los anteriores se saltan)
+        k = self.tick + 1
+        late = now - self.deadline(k)
+        if late >= self.period:
+            skip = int(late / self.period)
+            k += skip
+            self.stats.skipped += skip
+        return k, self.deadline(k)
+
+    def wait(self):
+        """Duerme hasta el deadline del siguiente tick y devuelve su índice."""
+        k, due = self._next(self.clock())
+        delay = due - self.clock()
+        if delay > 0: self._sleep(delay)
+        self.tick = k
+        self.stats.record(max(0.0, self.clock() - due))
+        return k
+
+    async def wait_async(self):
+        """wait() para el runtime asyncio: cede el bucle en vez de bloquearlo."""
+        k, due = self._next(self.clock())
+        delay = due - self.clock()
+        await asyncio.sleep(max(0.0, delay))
+        self.tick = k
+        self.stats.record(max(0.0, self.clock() - due))
+        return k
+
+    def frames(self, n):
+        """
+        Índices 0..n-1 de un efecto de n frames, cada uno en su deadline (el 0
+        en el tick actual). Los que no llegan a tiempo se saltan, y al acabar el
+        efecto ha durado n ticks: el siguiente empieza en hora.
+        """
+        base = self.tick
+        f = 0
+        while f < n:
+            yield f
+            f = self.wait() - base
+
+    def hold(self, seconds):
+        """Mantiene el frame actual `seconds` y sigue contando desde ahí (flashes, pausas)."""
+        due = self.deadline() + seconds
+        delay = due - self.clock()
+        if delay > 0: self._sleep(delay)
+        self.start(due)
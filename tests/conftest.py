@@ -0,0 +1,11 @@
+# Los módulos del repo son scripts planos en la raíz: se importan desde ahí.
+# La caché (timelines compilados, frames, latencia) va a un directorio temporal
+# para que los tests no lean ni escriban la de la Pi.
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["ESTANTERIA_CACHE"] = tempfile.mkdtemp(prefix="estanteria-tests-")
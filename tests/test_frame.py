@@ -0,0 +1,124 @@
+# Frame, ZoneConstraints y OutputLut sobre un layout de prueba de pocos LEDs.
+
+import numpy as np
+import pytest
+
+from frame import Frame, OutputLut, ZoneConstraints
+
+ZONES = {
+    "NO_WHITE": {"set": {0, 1, 2}, "white_allowed": False},
+    "CAPPED":   {"set": {3}, "white_allowed": True, "max_brightness": 100},
+    "WARM":     {"set": {4}, "white_allowed": True, "gamma": 2.0, "white_balance": (1.0, 0.5, 0.0)},
+}
+N_TEST = 6   # El LED 5 no tiene zona
+SUBSTITUTE = (150, 200, 255)
+
+def pixels(*colors):
+    px = np.zeros((N_TEST, 3))
+    px[:len(colors)] = colors
+    return px
+
+# ========= FRAME =========
+def test_out_of_range_indices_are_ignored_everywhere():
+    f = Frame.black(N_TEST)
+    f.add([-1, 0, N_TEST], (10, 10, 10))
+    f.set([-2, 1, N_TEST + 3], (5, 5, 5))
+    f.scale(2.0, [-1, 1, N_TEST])
+    f.mix((0, 0, 0), 0.5, [-1, 0, N_TEST])
+    f.unguard([-1, N_TEST])
+    f.add(N_TEST, (1, 1, 1)).set(-1, (1, 1, 1))
+    assert f.px[:, 0].tolist() == [5.0, 10.0, 0.0, 0.0, 0.0, 0.0]
+    assert not f.exempt.any()
+
+def test_add_accumulates_repeated_indices_with_weights():
+    f = Frame.black(N_TEST)
+    f.add([1, 1, 2], (10, 0, 0), k=np.array([1.0, 0.5, 2.0]))
+    f.add_rgb([3, 3], [(1, 2, 3), (1, 2, 3)])
+    assert f.px[:4, 0].tolist() == [0.0, 15.0, 20.0, 2.0]
+    assert f.px[3].tolist() == [2.0, 4.0, 6.0]
+
+def test_mix_per_led_targets():
+    f = Frame.fill((100, 100, 100), N_TEST)
+    f.mix(np.zeros((2, 3)), 1.0, [0, N_TEST])   # El destino del índice fuera se descarta con él
+    assert f.px[0].tolist() == [0.0, 0.0, 0.0] and f.px[1].tolist() == [100.0] * 3
+
+def test_pack_clamps():
+    f = Frame.fill((300, -5, 12.7), N_TEST)
+    assert f.pack()[:3] == bytes([255, 0, 12])
+    assert len(f.pack()) == N_TEST * 3
+
+# ========= ZONE CONSTRAINTS =========
+@pytest.fixture
+def zc():
+    return ZoneConstraints(ZONES, N_TEST, SUBSTITUTE)
+
+def test_white_becomes_dimmed_substitute(zc):
+    px = pixels((255, 255, 255), (100, 100, 100))
+    zc.apply(px)
+    gain = ZoneConstraints.SUBSTITUTE_GAIN
+    assert px[0] == pytest.approx(np.array(SUBSTITUTE) * gain)
+    assert px[1] == pytest.approx(np.array(SUBSTITUTE) / 255 * 100 * gain)
+
+@pytest.mark.parametrize("color", [(255, 240, 225), (255, 220, 180), SUBSTITUTE])
+def test_pastels_amber_and_substitute_are_kept(zc, color):
+    px = pixels(color)
+    zc.apply(px)
+    assert px[0].tolist() == list(map(float, color))
+
+def test_white_allowed_and_unzoned(zc):
+    px = pixels((0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (255, 255, 255), (255, 255, 255))
+    zc.apply(px)
+    assert px[4].tolist() == [255.0] * 3                 # Zona con blanco
+    assert px[5].tolist() != [255.0] * 3                 # Sin zona: no admite blanco
+
+def test_exempt_leds_keep_white(zc):
+    f = Frame.fill((255, 255, 255), N_TEST).unguard([0])
+    px = np.clip(f.px, 0, 255)
+    zc.apply(px, f.exempt)
+    assert px[0].tolist() == [255.0] * 3 and px[1].tolist() != [255.0] * 3
+
+def test_max_brightness_caps_highest_channel(zc):
+    px = pixels((0, 0, 0), (0, 0, 0), (0, 0, 0), (200, 100, 50))
+    zc.apply(px)
+    assert px[3].tolist() == [100.0, 50.0, 25.0]
+
+def test_torre_crackle_shows_no_white_in_no_white_zones():
+    # El crackle blanco de la campanada cae sobre LEDs sin blanco (zona 3)
+    import rng
+    import torre_reloj as T
+    from layout import ELECTRIC_BLUE, WHITE_ALLOWED_MASK
+    rng.seed_show(7); rng.cue("crackle", 0)
+    f = Frame.black()
+    T.crackle(f, T.LED_CLOCK, spread=5, density=0.9, color='white')
+    lit = np.flatnonzero(f.px.max(axis=1) > 0)
+    guarded = lit[~WHITE_ALLOWED_MASK[lit]]
+    assert guarded.size
+    px = np.clip(f.px, 0.0, 255.0)
+    T.CONSTRAINTS.apply(px)
+    blue = np.asarray(ELECTRIC_BLUE, dtype=float)
+    for i in guarded:
+        assert px[i] / px[i].max() == pytest.approx(blue / blue.max()), i
+
+# ========= OUTPUT LUT =========
+def test_lut_identity_at_gamma_1():
+    lut = OutputLut(1.0, zones={}, n=256)
+    v = np.repeat(np.arange(256, dtype=float)[:, None], 3, axis=1)
+    assert lut.apply(v) == v.astype(np.uint8).tobytes()
+
+def test_lut_per_zone_gamma_and_white_balance():
+    lut = OutputLut(1.0, ZONES, N_TEST)
+    px = np.full((N_TEST, 3), 128.0)
+    out = np.frombuffer(lut.apply(px), np.uint8).reshape(N_TEST, 3)
+    assert out[0].tolist() == [128, 128, 128]            # Zona sin calibrar: gamma del show
+    assert out[5].tolist() == [128, 128, 128]            # Sin zona: igual
+    g = 255 * (128 / 255) ** 2.0
+    assert out[4].tolist() == [int(g), int(g * 0.5), 0]  # gamma 2 y balance (1, 0.5, 0)
+
+def test_lut_keeps_sub_levels_before_gamma():
+    lut = OutputLut(0.5, zones={}, n=2)
+    out = np.frombuffer(lut.apply(np.array([[0.5] * 3, [1.0] * 3])), np.uint8)
+    assert out[0] > 0 and out[0] < out[3]                # 0.5 no se redondea a 0 antes de la gamma
+
+def test_pack_applies_lut():
+    f = Frame.fill((128, 128, 128), N_TEST)
+    assert f.pack(OutputLut(1.0, ZONES, N_TEST))[12:15] == bytes([64, 32, 0])
@@ -0,0 +1,100 @@
+# Encoders FlatBuffers/Protobuf de hyperion_binary.py: cabeceras byte a byte,
+# lectura con la librería flatbuffers (si está) y frames completos contra el stub.
+
+import struct
+import time
+
+import pytest
+
+from hyperion_binary import (FB_CMD_IMAGE, FB_CMD_REGISTER, FB_IMG_RAW, FlatImageMessage,
+                             HyperionFlatClient, HyperionProtoClient, ProtoImageMessage,
+                             _varint, fb_encode_register)
+from layout import N
+
+def rgb_frame(n_leds):
+    return bytes((7 * i) % 256 for i in range(n_leds * 3))
+
+# ========= FLATBUFFERS =========
+def test_fb_register_frame_and_header():
+    msg = fb_encode_register("show", 64)
+    size = struct.unpack(">I", msg[:4])[0]
+    assert size == len(msg) - 4 == 48 + 8
+    body = msg[4:]
+    assert struct.unpack_from("<I", body, 0)[0] == 12        # raíz -> Request
+    assert body[20] == FB_CMD_REGISTER
+    assert struct.unpack_from("<i", body, 40)[0] == 64      # priority
+    assert struct.unpack_from("<I", body, 44)[0] == 4
+    assert body[48:53] == b"show\x00"
+
+def test_fb_image_layout():
+    rgb = rgb_frame(5)
+    view = FlatImageMessage(len(rgb)).fill(rgb, 500)
+    msg = bytes(view)
+    assert struct.unpack(">I", msg[:4])[0] == len(msg) - 4 == 84 + 16
+    body = msg[4:]
+    assert body[20] == FB_CMD_IMAGE
+    assert struct.unpack_from("<i", body, 44)[0] == 500     # duration
+    assert body[48] == FB_IMG_RAW
+    assert struct.unpack_from("<ii", body, 72) == (5, 1)    # width, height
+    assert struct.unpack_from("<I", body, 80)[0] == 15
+    assert body[84:99] == rgb
+
+def test_fb_image_reads_back_with_flatbuffers():
+    flatbuffers = pytest.importorskip("flatbuffers")
+    from flatbuffers.table import Table
+    rgb = rgb_frame(N)
+    body = bytearray(bytes(FlatImageMessage(len(rgb)).fill(rgb, -1))[4:])
+    root = flatbuffers.encode.Get(flatbuffers.packer.uoffset, body, 0)
+    request = Table(body, root)
+    # Request: command_type (campo 0), command (campo 1)
+    assert request.Get(flatbuffers.number_types.Uint8Flags, request.Offset(4) + root) == FB_CMD_IMAGE
+    image = Table(body, 0)
+    request.Union(image, request.Offset(6))
+    # Image: data_type (0), data (1), duration (2)
+    assert image.Get(flatbuffers.number_types.Uint8Flags, image.Offset(4) + image.Pos) == FB_IMG_RAW
+    assert image.Get(flatbuffers.number_types.Int32Flags, image.Offset(8) + image.Pos) == -1
+    raw = Table(body, 0)
+    image.Union(raw, image.Offset(6))
+    # RawImage: data (0), width (1), height (2)
+    assert raw.Get(flatbuffers.number_types.Int32Flags, raw.Offset(6) + raw.Pos) == N
+    assert raw.Get(flatbuffers.number_types.Int32Flags, raw.Offset(8) + raw.Pos) == 1
+    start, length = raw.Vector(raw.Offset(4)), raw.VectorLen(raw.Offset(4))
+    assert bytes(body[start:start + length]) == rgb
+
+# ========= PROTOBUF =========
+def test_varint():
+    assert _varint(0) == b"\x00"
+    assert _varint(300) == b"\xac\x02"
+    assert _varint(-1) == b"\xff" * 9 + b"\x01"   # int32 negativo: 10 bytes
+
+def test_proto_image_bytes():
+    rgb = rgb_frame(2)
+    msg = bytes(ProtoImageMessage(len(rgb), 64, 500).fill(rgb))
+    fields = b"\x08\x02\x10\x01\x20\x40\x28\xf4\x03\x1a\x06"
+    head = b"\x08\x02" + b"\x5a" + bytes([len(fields) + 6]) + fields
+    assert msg == struct.pack(">I", len(head) + 6) + head + rgb
+
+# ========= CONTRA EL STUB =========
+@pytest.fixture
+def stub():
+    from hyperion_stub import HyperionStub
+    s = HyperionStub(http_port=None, fb_port=0, proto_port=0).start()
+    yield s
+    s.stop()
+
+def wait_records(stub, count, timeout=2.0):
+    t0 = time.monotonic()
+    while len(stub.records) < count and time.monotonic() - t0 < timeout:
+        time.sleep(0.005)
+    return stub.records
+
+@pytest.mark.parametrize("client, proto", [(HyperionFlatClient, "flatbuffers"), (HyperionProtoClient, "protobuf")])
+def test_frames_reach_stub(stub, client, proto):
+    out = client("127.0.0.1", port=stub.ports[proto], ack=True)
+    rgb = rgb_frame(N)
+    assert out.send(rgb, 750)
+    assert out.send(rgb[::-1], -1)
+    recs = wait_records(stub, 2)
+    assert [(r.proto, r.leds, r.valid, r.duration) for r in recs] == [(proto, N, True, 750), (proto, N, True, -1)]
+    assert recs[0].rgb == rgb and recs[1].rgb == rgb[::-1]
+    out.close()
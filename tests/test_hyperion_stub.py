@@ -0,0 +1,58 @@
+# Hyperion de pruebas: registro de frames JSON-RPC, LEDs inválidos y pérdida simulada.
+
+import pytest
+import requests
+
+from hyperion_stub import HyperionStub
+from output import HyperionClient
+
+LEDS = 4
+
+@pytest.fixture
+def make_stub():
+    stubs = []
+    def make(**kw):
+        s = HyperionStub(http_port=0, fb_port=None, proto_port=None, n_leds=LEDS, **kw).start()
+        stubs.append(s)
+        return s
+    yield make
+    for s in stubs:
+        s.stop()
+
+def frames(count):
+    return [bytes([k]) * (LEDS * 3) for k in range(count)]
+
+def test_json_frames_are_recorded(make_stub):
+    stub = make_stub()
+    out = HyperionClient(stub.url)
+    for rgb in frames(3):
+        assert out.send(rgb, 250)
+    assert [(r.proto, r.leds, r.valid, r.duration, r.rgb) for r in stub.records] == \
+           [("json", LEDS, True, 250, rgb) for rgb in frames(3)]
+    out.close()
+
+def test_wrong_led_count_is_an_error(make_stub):
+    stub = make_stub()
+    reply = requests.post(stub.url + "/json-rpc", json={"command": "color", "color": [1, 2, 3]}).json()
+    assert not reply["success"] and "Se esperaban 4 LEDs" in reply["error"]
+    assert not stub.records[0].valid
+
+def test_lost_frames_are_not_recorded(make_stub):
+    stub = make_stub(loss=1.0)
+    out = HyperionClient(stub.url)
+    for rgb in frames(5):
+        assert out.send(rgb)   # El emisor no ve la pérdida
+    assert stub.records == [] and stub.lost == 5
+    assert "perdidos 5" in stub.report()
+    out.close()
+
+def test_partial_loss_drops_some_frames(make_stub):
+    stub = make_stub(loss=0.5, seed=3)
+    out = HyperionClient(stub.url)
+    sent = frames(40)
+    for rgb in sent:
+        out.send(rgb)
+    got = [r.rgb for r in stub.records]
+    assert 0 < stub.lost < 40 and len(got) + stub.lost == 40
+    assert all(rgb in sent for rgb in got) and got == sorted(got)   # Huecos, no desorden
+    out.close()
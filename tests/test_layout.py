@@ -0,0 +1,26 @@
+# Geometría de layout.py: coordenadas por segmento y caché polar.
+
+import numpy as np
+
+import layout
+from layout import LED_XY, calculate_coordinates, polar_coordinates
+
+def test_coordinates_follow_segment_polyline():
+    xy = calculate_coordinates({"A": [2, 1, 0]}, {"A": [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]}, n=4)
+    assert xy.tolist() == [[1.0, 1.0], [1.0, 0.0], [0.0, 0.0], [0.0, 0.0]]   # El LED 3 no está en el índice
+    assert not xy.flags.writeable
+
+def test_polar_is_cached_per_array_and_center():
+    a = polar_coordinates((0.5, 0.0))
+    assert polar_coordinates((0.5, 0.0), LED_XY)[0] is a[0]
+    assert polar_coordinates((0.0, 0.0))[0] is not a[0]
+    radius, angle = a
+    assert np.allclose(radius, np.hypot(LED_XY[:, 0] - 0.5, LED_XY[:, 1]))
+    assert angle.min() >= 0.0 and angle.max() <= 1.0
+
+def test_polar_of_temporary_arrays_never_mixes_geometries():
+    for k in range(50):
+        xy = np.full((3, 2), float(k))   # Temporales: sus id() se reutilizan
+        radius, _ = polar_coordinates((0.0, 0.0), xy)
+        assert np.allclose(radius, np.hypot(k, k))
+    layout._POLAR_CACHE.clear()
@@ -0,0 +1,63 @@
+# PlaybackClock: ajuste de la recta time-pos, pausa, speed, seek y monotonía.
+
+import pytest
+
+from mpv_clock import JUMP_S, PlaybackClock
+
+class FakeClock:
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+def feed(clock, mono, start, count, rate=1.0, period=0.1, noise=()):
+    for k in range(count):
+        at = mono.t + k * period
+        clock.sample(start + k * period * rate + (noise[k % len(noise)] if noise else 0.0), at)
+    mono.t += (count - 1) * period
+
+def test_none_until_first_sample():
+    assert PlaybackClock(clock=FakeClock()).now() is None
+
+def test_interpolates_between_samples():
+    mono = FakeClock()
+    clock = PlaybackClock(clock=mono)
+    feed(clock, mono, 10.0, 8, noise=(0.004, -0.004))
+    mono.t += 0.05
+    assert clock.now() == pytest.approx(10.75, abs=0.006)
+
+def test_rate_is_bounded_by_drift():
+    mono = FakeClock()
+    clock = PlaybackClock(clock=mono, max_drift=0.02)
+    feed(clock, mono, 0.0, 10, rate=1.5)   # Muestras absurdas: el rate se queda en speed ± 2 %
+    assert clock._fit[2] == pytest.approx(1.02)
+
+def test_pause_freezes_and_speed_changes_slope():
+    mono = FakeClock()
+    clock = PlaybackClock(clock=mono)
+    feed(clock, mono, 5.0, 5)
+    t = clock.now()
+    clock.set_state(paused=True, at=mono.t)
+    mono.t += 3.0
+    assert clock.now() == pytest.approx(t)
+    clock.set_state(paused=False, speed=2.0, at=mono.t)
+    mono.t += 1.0
+    assert clock.now() == pytest.approx(t + 2.0)
+
+def test_seek_resets_fit():
+    mono = FakeClock()
+    clock = PlaybackClock(clock=mono)
+    feed(clock, mono, 5.0, 5)
+    mono.t += 0.1
+    clock.sample(60.0, mono.t)
+    assert len(clock.samples) == 1
+    assert clock.now() == pytest.approx(60.0)
+
+def test_now_never_steps_back_by_less_than_a_jump():
+    mono = FakeClock()
+    clock = PlaybackClock(clock=mono)
+    feed(clock, mono, 5.0, 5)
+    t = clock.now()
+    clock.sample(t - JUMP_S / 2, mono.t)   # Reajuste hacia atrás: no es un seek
+    assert clock.now() >= t
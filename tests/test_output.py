@@ -0,0 +1,103 @@
+# FrameOutput (reintentos, deduplicación) y ThreadedOutput con un backend en memoria.
+
+import json
+import threading
+import time
+
+from output import FrameOutput, HyperionClient, ThreadedOutput
+
+class Memory(FrameOutput):
+    """Backend que guarda los frames; `fail` hace que el siguiente envío lance."""
+    name = "Memoria"
+
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.sent = []
+        self.fail = None
+        self.gate = None   # threading.Event que bloquea el envío hasta que se abre
+
+    def _send(self, rgb, duration):
+        if self.gate: self.gate.wait(2.0)
+        if self.fail:
+            e, self.fail = self.fail, None
+            raise e
+        self.sent.append((rgb, duration))
+        return len(rgb)
+
+def test_network_error_backs_off():
+    out = Memory(retry_s=60.0, keepalive_s=None)
+    out.fail = OSError("caído")
+    assert not out.send(b"\x00")
+    assert not out.send(b"\x01")     # Dentro de retry_s ni se intenta
+    assert out.stats.errors == 1 and out.sent == []
+    out._retry_at = 0.0
+    assert out.send(b"\x01") and out.sent == [(b"\x01", -1)]
+    assert out.stats.frames == 1 and out.stats.bytes == 1
+
+def test_json_payload_matches_json_rpc_color():
+    out = HyperionClient("http://hyperion.local:8090", priority=50, origin="torre \"reloj\"")
+    body = out.encode(bytes([1, 2, 255]), 500)
+    assert json.loads(body) == {"command": "color", "priority": 50, "origin": 'torre "reloj"',
+                                "duration": 500, "color": [1, 2, 255]}
+    assert out.url == "http://hyperion.local:8090/json-rpc"
+
+# ========= FRAMES REPETIDOS =========
+def test_repeated_frames_are_saved_until_keepalive():
+    out = Memory(keepalive_s=60.0)
+    for _ in range(5):
+        assert out.send(b"\x01\x02\x03")
+    out.send(b"\x01\x02\x03", 500)   # Otra duración: se envía
+    assert len(out.sent) == 2
+    assert (out.stats.saved_frames, out.stats.saved_bytes) == (4, 12)
+    out._refresh_at = 0.0            # Caduca el keepalive
+    out.send(b"\x01\x02\x03", 500)
+    assert len(out.sent) == 3
+
+def test_finite_duration_is_refreshed_before_it_expires():
+    out = Memory(keepalive_s=60.0)
+    t0 = time.monotonic()
+    out.send(b"\x00", 1000)
+    assert out._refresh_at - t0 < 0.6   # La mitad de la duración, no el keepalive
+
+def test_keepalive_none_disables_dedup():
+    out = Memory(keepalive_s=None)
+    for _ in range(3):
+        out.send(b"\x00")
+    assert len(out.sent) == 3 and out.stats.saved_frames == 0
+
+def test_reconnect_forgets_last_frame():
+    out = Memory(keepalive_s=60.0)
+    out.send(b"\x00")
+    out.reconnect()
+    out.send(b"\x00")
+    assert len(out.sent) == 2
+
+# ========= HILO DE ENVÍO =========
+def test_threaded_output_sends_latest_frame():
+    inner = Memory(keepalive_s=None)
+    inner.gate = threading.Event()
+    out = ThreadedOutput(inner)
+    out.send(b"\x01")
+    t0 = time.monotonic()
+    while not out._busy and time.monotonic() - t0 < 2.0:
+        time.sleep(0.001)            # Hasta que el hilo se atasca en el primero
+    for v in (2, 3, 4):
+        out.send(bytes([v]))
+    inner.gate.set()
+    assert out.flush(timeout=2.0)
+    assert [rgb for rgb, _ in inner.sent] == [b"\x01", b"\x04"]
+    assert out.stats.dropped == 2
+    out.close()
+
+def test_threaded_output_survives_backend_exceptions():
+    inner = Memory()
+    out = ThreadedOutput(inner)
+    inner.fail = ValueError("frame roto")
+    out.send(b"\x00")
+    assert out.flush(timeout=2.0)
+    assert out.failures == 1 and out.stats.errors == 1
+    out.send(b"\x07")
+    assert out.flush(timeout=2.0)
+    assert inner.sent == [(b"\x07", -1)]
+    out.close()
+    assert inner.closed
@@ -0,0 +1,57 @@
+# Particles: spawn en huecos libres, paths con vuelta, objetivos y vida; scatter con rng.
+
+import numpy as np
+
+from frame import Frame
+from particles import Particles, scatter
+import rng
+
+PATH = [10, 11, 12, 13, 14, 15]
+
+def test_spawn_reuses_dead_slots_and_counts_drops():
+    p = Particles(capacity=3, n=20)
+    p.spawn([1, 2], life=1)
+    assert p.count() == 2
+    p.spawn([3, 4], life=1)
+    assert p.count() == 3 and p.dropped == 1
+    p.age()
+    assert p.count() == 0
+    p.spawn([5, 6, 7], life=2)
+    assert p.count() == 3
+
+def test_path_motion_wraps():
+    p = Particles(capacity=4, paths=[PATH], n=20)
+    s = p.spawn(4, vel=1.0, life=5, path=0)
+    seen = []
+    for _ in range(3):
+        p.advance()
+        seen.append(int(p.leds(s)[0]))
+    assert seen == [15, 10, 11]
+
+def test_target_stops_particle_on_arrival():
+    p = Particles(capacity=4, paths=[PATH], n=20)
+    s = p.spawn(0, vel=2.0, life=10, path=0, target=3)
+    for _ in range(5):
+        p.advance()
+    assert p.pos[s][0] == 3 and p.vel[s][0] == 0.0       # Se queda en el objetivo, no oscila
+    back = p.spawn(1, vel=-2.0, life=10, path=0, target=4)
+    p.advance(); p.advance()
+    assert p.pos[back][0] == 4                           # Hacia atrás, con vuelta: 1 -> 5 -> 4
+
+def test_update_paints_then_ages():
+    p = Particles(capacity=4, n=20)
+    p.spawn([2, 2, 7], life=[1, 2, 1], color=(10, 20, 30))
+    f = Frame.black(20)
+    p.update(f)
+    assert f.px[2].tolist() == [20.0, 40.0, 60.0] and f.px[7].tolist() == [10.0, 20.0, 30.0]
+    assert p.count() == 1
+
+def test_scatter_is_deterministic_and_in_range():
+    rng.seed_show(5); rng.cue("s", 1)
+    a = scatter([0, 19], spread=3, density=1.0, n=20)
+    rng.cue("s", 1)
+    b = scatter([0, 19], spread=3, density=1.0, n=20)
+    assert np.array_equal(a[0], b[0])
+    assert a[0].min() >= 0 and a[0].max() < 20
+    assert {0, 19} <= set(a[0].tolist())                 # En el centro la probabilidad es density = 1
+    assert scatter([5], spread=3, density=0.0, n=20)[0].size == 0
@@ -0,0 +1,55 @@
+# Caché de frames prerenderizados: fichero, índice por tiempo, reutilización y
+# render en paralelo por trozos.
+
+import threading
+
+import numpy as np
+import pytest
+
+import prerender
+from prerender import FrameCache
+
+FPS = 10
+LEDS = 2
+
+def ramp(t):
+    # Frame k: todos los canales a k (cabe en un byte para shows cortos)
+    return bytes([int(round(t * FPS))]) * (LEDS * 3)
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(prerender, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+def test_prerender_writes_every_frame(cache_dir):
+    cache = prerender.prerender("ramp", "k1", ramp, FPS, 2.0, LEDS, progress=False)
+    assert len(cache) == 21 and cache.fps == FPS
+    assert [cache.frame(k / FPS)[0] for k in range(21)] == list(range(21))
+    assert cache.meta == {"name": "ramp", "key": "k1", "fps": FPS, "frames": 21, "n": LEDS}
+
+def test_frame_index_by_time(cache_dir):
+    cache = prerender.prerender("ramp", "k1", ramp, FPS, 2.0, LEDS, progress=False)
+    assert cache.index(0.3) == 3                 # 0.3*10 = 2.9999...: sigue siendo el frame 3
+    assert cache.index(0.349) == 3
+    assert cache.index(-1.0) == 0 and cache.index(99.0) == 20
+
+def test_existing_cache_is_reused(cache_dir):
+    prerender.prerender("ramp", "k1", ramp, FPS, 1.0, LEDS, progress=False)
+    calls = []
+    cache = prerender.prerender("ramp", "k1", lambda t: calls.append(t) or ramp(t), FPS, 1.0, LEDS, progress=False)
+    assert calls == [] and len(cache) == 11
+    assert isinstance(prerender.prerender("ramp", "k2", ramp, FPS, 0.5, LEDS, progress=False), FrameCache)
+    assert len(list(cache_dir.glob("frames/*.npy"))) == 2
+
+def test_importing_a_show_opens_no_output():
+    before = threading.active_count()
+    import libios
+    import torre_reloj
+    assert libios.output is None and torre_reloj.output is None
+    assert threading.active_count() == before
+
+def test_parallel_render_matches_serial(tmp_path):
+    serial, parallel = str(tmp_path / "serial.npy"), str(tmp_path / "parallel.npy")
+    prerender.render_frames(serial, ramp, FPS, 25, LEDS)
+    prerender.render_frames(parallel, ramp, FPS, 25, LEDS, workers=2, chunk_s=0.7)   # Trozos de 7 frames
+    assert np.array_equal(np.load(serial), np.load(parallel))
@@ -0,0 +1,49 @@
+# rng: la misma semilla y el mismo cue dan los mismos sorteos, pase lo que pase antes.
+
+import numpy as np
+
+import rng
+
+def draws():
+    return (rng.bernoulli(0.3, 50).tolist(), rng.uniform(0.0, 1.0, 5).tolist(),
+            rng.integers(0, 100, 5).tolist(), rng.chance(0.5), rng.sample(list(range(20)), 4).tolist())
+
+def test_same_cue_same_draws():
+    rng.seed_show(42)
+    rng.cue("sparks", 10)
+    a = draws()
+    rng.uniform(size=1000)   # Sorteos intermedios de otro efecto
+    rng.cue("other", 3)
+    rng.uniform(size=7)
+    rng.cue("sparks", 10)
+    assert draws() == a
+
+def test_different_frame_cue_or_seed_differ():
+    rng.seed_show(42)
+    rng.cue("sparks", 10); a = draws()
+    rng.cue("sparks", 11); b = draws()
+    rng.cue("flash", 10);  c = draws()
+    rng.seed_show(43)
+    rng.cue("sparks", 10); d = draws()
+    assert a != b and a != c and a != d
+
+def test_explicit_cue_seed_ignores_show_seed():
+    rng.seed_show(1)
+    rng.cue("x", 0, seed=99); a = draws()
+    rng.seed_show(2)
+    rng.cue("x", 0, seed=99)
+    assert draws() == a
+
+def test_seed_show_returns_reusable_seed():
+    seed = rng.seed_show()
+    rng.cue("x"); a = rng.uniform(size=3)
+    assert rng.seed_show(seed) == seed
+    rng.cue("x")
+    assert np.array_equal(rng.uniform(size=3), a)
+
+def test_field_shapes_and_ranges():
+    rng.seed_show(0); rng.cue("x")
+    assert rng.bernoulli(np.array([0.0, 1.0, 0.0])).tolist() == [False, True, False]
+    assert set(rng.integers(2, 4, 200).tolist()) == {2, 3}
+    s = rng.sample(list(range(10)), 10)
+    assert sorted(s.tolist()) == list(range(10))
@@ -0,0 +1,45 @@
+# ShowRuntime: disparo de cues RF desde el reloj de reproducción.
+
+import asyncio
+
+from runtime import RF_POLL_S, ShowRuntime
+from timeline import Timeline
+
+class Clock:
+    paused = False
+    speed = 1.0
+    t = 0.0
+
+    def now(self):
+        return self.t
+
+class RF:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+def run_rf(times, rearm):
+    clock = Clock()
+    tl = Timeline().at(0.5, "rf", "front").at(0.5, "rf", "rear").at(1.0, "rf", "wheels")
+    rt = ShowRuntime(30, None, clock, rf=RF(), rf_timeline=tl, rf_rearm=rearm)
+    async def drive():
+        task = asyncio.create_task(rt._rf())
+        for t in times:
+            clock.t = t
+            await asyncio.sleep(2 * RF_POLL_S)   # El reloj salta: la tarea lo ve en RF_POLL_S
+        task.cancel()
+    asyncio.run(drive())
+    return rt.rf.sent
+
+SEEK_BACK = [0.0, 0.6, 1.1, 0.2, 0.7, 1.2, 1.6]
+
+def test_simultaneous_rf_cues_all_fire():
+    assert run_rf([0.0, 0.6, 1.1], rearm=False) == ["front", "rear", "wheels"]
+
+def test_rf_cues_do_not_refire_after_seek_back():
+    assert run_rf(SEEK_BACK, rearm=False) == ["front", "rear", "wheels"]
+
+def test_rf_rearm_refires_after_seek_back():
+    assert run_rf(SEEK_BACK, rearm=True) == ["front", "rear", "wheels"] * 2
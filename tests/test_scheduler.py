@@ -0,0 +1,66 @@
+# FrameScheduler con un reloj simulado: deadlines absolutos, sin deriva y con saltos.
+
+from scheduler import FrameScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, dt):
+        self.sleeps.append(dt)
+        self.t += dt
+
+def make(fps=30):
+    clock = FakeClock()
+    return clock, FrameScheduler(fps, clock=clock, sleep=clock.sleep)
+
+def test_frames_yields_n_ticks_on_deadlines():
+    clock, sched = make(30)
+    t0 = clock.t
+    seen = []
+    for f in sched.frames(90):
+        seen.append((f, clock.t))
+        clock.t += 0.01   # Trabajo del frame: no se suma al periodo
+    assert [f for f, _ in seen] == list(range(90))
+    for f, t in seen:
+        assert abs(t - (t0 + f / 30)) < 1e-9
+    assert sched.stats.skipped == 0
+
+def test_no_drift_over_long_runs():
+    clock, sched = make(25)
+    t0 = clock.t
+    for _ in range(25 * 600):
+        clock.t += 0.013
+        sched.wait()
+    assert sched.tick == 25 * 600
+    assert abs(clock.t - (t0 + 600.0)) < 1e-6
+
+def test_late_frame_skips_ticks_but_effect_keeps_its_length():
+    clock, sched = make(10)
+    t0 = clock.t
+    seen = []
+    for f in sched.frames(20):
+        seen.append(f)
+        if f == 5: clock.t += 0.35   # Frame lento: acaba en t0 + 0.85
+    # Los ticks 6 y 7 se saltan; el 8 (vencido en t0 + 0.8) sale en el acto
+    assert seen == [0, 1, 2, 3, 4, 5] + list(range(8, 20))
+    assert sched.stats.skipped == 2
+    assert abs(clock.t - (t0 + 2.0)) < 1e-9   # Acaba en el deadline del tick 20: 20 ticks justos
+
+def test_hold_restarts_from_due_time():
+    clock, sched = make(30)
+    t0 = clock.t
+    sched.hold(0.5)
+    assert abs(clock.t - (t0 + 0.5)) < 1e-9
+    assert sched.tick == 0 and sched.t0 == clock.t
+    sched.wait()
+    assert abs(clock.t - (t0 + 0.5 + 1 / 30)) < 1e-9
+
+def test_stats_record_lateness():
+    clock, sched = make(30)
+    sched.wait()
+    assert sched.stats.ticks == 1 and sched.stats.max_late == 0.0
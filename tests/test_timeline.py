@@ -0,0 +1,101 @@
+# Timeline: cursor advance() frente a query(t, since), seeks, y el compilador de
+# ficheros de timeline con su caché.
+
+import glob
+import json
+import os
+import pickle
+import random
+
+import pytest
+
+import timeline
+from timeline import INF, Timeline, compile_show, load_show
+
+def random_timeline(seed, cues=200, length=60.0):
+    rnd = random.Random(seed)
+    tl = Timeline()
+    for _ in range(cues):
+        start = rnd.uniform(0.0, length)
+        if rnd.random() < 0.5: tl.at(start, f"p{rnd.randrange(8)}")
+        else:                  tl.during(start, start + rnd.uniform(0.01, 5.0) if rnd.random() < 0.9 else None, f"s{rnd.randrange(8)}")
+    return tl
+
+def names(out):
+    return {name: [c.order for c in cues] for name, cues in out.items()}
+
+def test_advance_matches_query_over_sweep():
+    tl = random_timeline(1)
+    ref = random_timeline(1)
+    prev = -INF
+    for k in range(0, 62 * 30):
+        t = k / 30.0
+        assert names(tl.advance(t)) == names(ref.query(t, prev)), t
+        prev = t
+
+def test_backward_seek_rearms_point_cues():
+    tl = random_timeline(2)
+    ref = random_timeline(2)
+    times = [k / 25.0 for k in range(0, 40 * 25)]
+    times += [k / 25.0 for k in range(10 * 25, 30 * 25)]   # Vuelta atrás a t=10
+    prev = -INF
+    for t in times:
+        since = prev if t >= prev else t - 1e-9   # Tras el seek solo suena lo que cae en t
+        assert names(tl.advance(t)) == names(ref.query(t, since)), t
+        prev = t
+
+def test_point_cue_fires_once_and_span_is_half_open():
+    tl = Timeline().at(1.0, "shot").during(1.0, 2.0, "glow")
+    assert tl.advance(0.9) == {}
+    assert set(tl.advance(1.0)) == {"shot", "glow"}
+    assert set(tl.advance(1.5)) == {"glow"}
+    assert tl.advance(2.0) == {}
+    assert tl.next_at() == INF
+
+def test_same_start_keeps_declaration_order():
+    tl = Timeline().during(0.0, 5.0, "b").at(1.0, "a").during(1.0, 3.0, "b")
+    out = tl.advance(1.0)
+    assert list(out) == ["b", "a"]
+    assert [c.order for c in out["b"]] == [0, 2]
+
+# ========= FICHEROS =========
+def test_named_offsets():
+    show = compile_show({"frame_rate": 24, "times": {"A": "10:12", "LEN": 3.0, "B": "A+LEN", "C": "B-0.5"},
+                         "cues": [{"effect": "x", "during": ["A", "A+LEN"]}]})
+    assert show.times == {"A": 10.5, "LEN": 3.0, "B": 13.5, "C": 13.0}
+    assert show.cues == [(10.5, 13.5, "x", None)]
+
+@pytest.mark.parametrize("doc, error", [
+    ({"times": {"A": "B+1"}}, "desconocido 'B'"),
+    ({"times": {"A": 1.0, "B": "A+C"}}, "desconocido 'C'"),
+    ({"cues": [{"effect": "x", "during": [2.0, 1.0]}]}, "antes de empezar"),
+    ({"cues": [{"rf": "front", "during": [1.0, 2.0]}]}, "puntuales"),
+    ({"cues": [{"effect": "x", "at": 1.0, "during": [1.0, 2.0]}]}, "solo uno"),
+])
+def test_compile_errors(doc, error):
+    with pytest.raises(ValueError, match=error):
+        compile_show(doc)
+
+def test_unknown_effect_and_rf_code():
+    with pytest.raises(ValueError, match="efecto desconocido"):
+        compile_show({"cues": [{"effect": "nope", "at": 1.0}]}, effects=("x",))
+    with pytest.raises(ValueError, match="RF desconocido"):
+        compile_show({"cues": [{"rf": "nope", "at": 1.0}]}, rf_codes={"front": 1})
+
+def test_bundled_timelines_compile():
+    for path in glob.glob(os.path.join(timeline.TIMELINE_DIR, "*.json")):
+        assert load_show(path).cues
+
+@pytest.mark.parametrize("junk", [b"", b"\x80\x05garbage", pickle.dumps([1, 2])])
+def test_bad_cache_is_recompiled(tmp_path, monkeypatch, junk):
+    monkeypatch.setattr(timeline, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(timeline, "_compiled", {})
+    path = tmp_path / "show.json"
+    path.write_text(json.dumps({"times": {"A": 1.0}, "cues": [{"effect": "x", "at": "A"}]}))
+    load_show(str(path))
+    (cache,) = glob.glob(str(tmp_path / "timelines" / "*.pickle"))
+    with open(cache, "wb") as f:
+        f.write(junk)
+    timeline._compiled.clear()
+    show = load_show(str(path))
+    assert isinstance(show, timeline.ShowTimeline) and show.cues == [(1.0, None, "x", None)]
@@ -0,0 +1,103 @@
+# Cabeceras DDP / E1.31 / Art-Net byte a byte, enviadas a un UdpRecorder local.
+
+import struct
+import time
+
+import pytest
+
+from udp_output import ArtNetOutput, DdpOutput, E131Output, UdpRecorder
+
+@pytest.fixture
+def recorder():
+    rec = UdpRecorder()
+    yield rec
+    rec.close()
+
+def received(rec, count, timeout=2.0):
+    t0 = time.monotonic()
+    while len(rec.packets) < count and time.monotonic() - t0 < timeout:
+        time.sleep(0.005)
+    assert len(rec.packets) == count
+    return [p[2] for p in rec.packets]
+
+def frame(n_leds):
+    return bytes(i % 251 for i in range(n_leds * 3))
+
+def test_ddp_single_packet(recorder):
+    out = DdpOutput("127.0.0.1", port=recorder.port, pixel_offset=0)
+    rgb = frame(10)
+    assert out.send(rgb)
+    assert out.send(frame(10)[::-1])   # Frame distinto: no se deduplica
+    first, second = received(recorder, 2)
+    # flags VER1|PUSH, secuencia 1, RGB24, display 1, offset 0, longitud 30
+    assert first[:10] == bytes([0x41, 1, 0x0B, 0x01, 0, 0, 0, 0, 0, 30])
+    assert first[10:] == rgb
+    assert second[1] == 2
+    out.close()
+
+def test_ddp_splits_and_pushes_last(recorder):
+    out = DdpOutput("127.0.0.1", port=recorder.port, pixel_offset=4)
+    rgb = frame(500)   # 1500 bytes: 1440 + 60
+    out.send(rgb)
+    a, b = received(recorder, 2)
+    assert a[0] == 0x40 and b[0] == 0x41                   # PUSH solo en el último
+    assert struct.unpack(">IH", a[4:10]) == (12, 1440)     # offset en bytes: 4 píxeles
+    assert struct.unpack(">IH", b[4:10]) == (12 + 1440, 60)
+    assert a[1] == b[1] == 1                               # Misma secuencia en todo el frame
+    assert a[10:] + b[10:] == rgb
+    out.close()
+
+def test_ddp_sequence_wraps_1_to_15(recorder):
+    out = DdpOutput("127.0.0.1", port=recorder.port)
+    out.keepalive_s = None
+    for _ in range(16):
+        out.send(frame(2))
+    seqs = [p[1] for p in received(recorder, 16)]
+    assert seqs == list(range(1, 16)) + [1]
+    out.close()
+
+def test_e131_packet_layout(recorder):
+    cid = bytes(range(16))
+    out = E131Output("127.0.0.1", port=recorder.port, universes=[(7, 0, 4)], source="tests", priority=90)
+    out.cid = cid
+    rgb = frame(4)
+    out.send(rgb)
+    (pkt,) = received(recorder, 1)
+    assert len(pkt) == 126 + 12
+    # Capa raíz
+    assert pkt[:16] == b"\x00\x10\x00\x00ASC-E1.17\x00\x00\x00"
+    assert struct.unpack(">HI", pkt[16:22]) == (0x7000 | (len(pkt) - 16), 4)
+    assert pkt[22:38] == cid
+    # Framing: vector 2, nombre, prioridad, secuencia 1, universo
+    assert struct.unpack(">HI", pkt[38:44]) == (0x7000 | (len(pkt) - 38), 2)
+    assert pkt[44:108] == b"tests" + bytes(59)
+    assert pkt[108] == 90
+    assert pkt[111] == 1
+    assert struct.unpack(">H", pkt[113:115])[0] == 7
+    # DMP: vector 2, tipo 0xA1, primera dirección 0, incremento 1, slots + start code
+    assert struct.unpack(">HBBHHHB", pkt[115:126]) == (0x7000 | (len(pkt) - 115), 2, 0xA1, 0, 1, 13, 0)
+    assert pkt[126:] == rgb
+    out.close()
+
+def test_e131_one_packet_per_universe(recorder):
+    out = E131Output("127.0.0.1", port=recorder.port, universes=[(1, 0, 3), (2, 3, 3)])
+    rgb = frame(5)   # El segundo universo queda a medias
+    out.send(rgb)
+    a, b = received(recorder, 2)
+    assert (a[113:115], b[113:115]) == (b"\x00\x01", b"\x00\x02")
+    assert a[126:] == rgb[:9] and b[126:] == rgb[9:]
+
+def test_artnet_packet_layout(recorder):
+    out = ArtNetOutput("127.0.0.1", port=recorder.port, universes=[(0x123, 0, 3)])
+    rgb = frame(3)   # 9 bytes: se rellena a longitud par
+    out.send(rgb)
+    (pkt,) = received(recorder, 1)
+    assert pkt[:8] == b"Art-Net\x00"
+    assert struct.unpack("<H", pkt[8:10])[0] == 0x5000
+    assert struct.unpack(">H", pkt[10:12])[0] == 14
+    assert pkt[12] == 1                     # Secuencia
+    assert pkt[13] == 0                     # Físico
+    assert (pkt[14], pkt[15]) == (0x23, 0x01)   # SubUni, Net
+    assert struct.unpack(">H", pkt[16:18])[0] == 10
+    assert pkt[18:27] == rgb and pkt[27] == 0
+    out.close()
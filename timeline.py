@@ -0,0 +1,260 @@
+# timeline.py
+# Motor de cues de los shows: los cues se ordenan una vez y un cursor avanza con
+# el tiempo del vídeo, en lugar de recorrer cada frame todas las listas de
+# disparos comprobando un set de "fired".
+#
+#   at(t, name)              cue puntual: se dispara una vez, el primer frame con tiempo >= t
+#   during(start, end, name) cue de intervalo: activo en cada frame con start <= tiempo < end
+#
+# Los intervalos se indexan por inicio y solo se recorren los activos, así que el
+# coste por frame depende de los cues que tocan ese frame, no de la longitud de la
+# lista. advance(t) devuelve {nombre: [cues]} en el orden en que se declararon, para
+# que los shows pinten en el mismo orden de siempre. Si el tiempo va hacia atrás
+# (seek del vídeo), el timeline se recoloca y los puntuales posteriores se rearman.
+#
+# query(t, since) responde lo mismo sin cursor: los puntuales con since < inicio <= t
+# y los intervalos activos en t, en O(log n). Con él un show puede pintar cualquier
+# instante sin haber pasado por los anteriores (seek, prerender por trozos).
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from bisect import bisect_left, bisect_right, insort
+
+INF = float("inf")
+
+class Cue:
+    __slots__ = ("start", "end", "name", "data", "order")
+
+    def __init__(self, start, end, name, data, order):
+        self.start = start
+        self.end = end          # None en los cues puntuales
+        self.name = name
+        self.data = data
+        self.order = order
+
+    def __lt__(self, other):
+        return self.order < other.order
+
+    def elapsed(self, t):
+        return t - self.start
+
+    def progress(self, t):
+        """Fracción 0..1 del intervalo recorrida en t."""
+        return max(0.0, min(1.0, (t - self.start) / max(1e-9, self.end - self.start)))
+
+    def __repr__(self):
+        return f"Cue({self.name!r}, {self.start:.2f}, {self.end})"
+
+class Timeline:
+    def __init__(self):
+        self.cues = []
+        self._shots = None      # Índices construidos en el primer advance()
+
+    def at(self, t, name, data=None):
+        self.cues.append(Cue(t, None, name, data, len(self.cues)))
+        self._shots = None
+        return self
+
+    def during(self, start, end, name, data=None):
+        self.cues.append(Cue(start, INF if end is None else end, name, data, len(self.cues)))
+        self._shots = None
+        return self
+
+    def __len__(self):
+        return len(self.cues)
+
+    def _build(self):
+        self._shots = sorted((c for c in self.cues if c.end is None), key=lambda c: (c.start, c.order))
+        self._spans = sorted((c for c in self.cues if c.end is not None), key=lambda c: (c.start, c.order))
+        self._shot_starts = [c.start for c in self._shots]
+        self._span_starts = [c.start for c in self._spans]
+        # Intervalos elementales entre bordes consecutivos: dentro de cada uno los activos no cambian
+        self._edges = sorted({c.start for c in self._spans} | {c.end for c in self._spans if c.end != INF})
+        self._stab = [sorted(c for c in self._spans if c.start <= e < c.end) for e in [-INF] + self._edges]
+        self.seek(-INF)
+
+    def seek(self, t):
+        """Recoloca los cursores en t: los puntuales desde t en adelante quedan pendientes."""
+        if self._shots is None: self._build()
+        self.t = t
+        self._next_shot = bisect_left(self._shot_starts, t)
+        self._next_span = bisect_right(self._span_starts, t)
+        self._active = sorted(c for c in self._spans[:self._next_span] if t < c.end)
+
+    def next_at(self):
+        """Instante del siguiente cue puntual pendiente (INF si no queda ninguno)."""
+        if self._shots is None: self._build()
+        i = self._next_shot
+        return self._shots[i].start if i < len(self._shots) else INF
+
+    def query(self, t, since):
+        """Como advance(t) pero sin cursor: puntuales con since < inicio <= t e intervalos activos en t."""
+        if self._shots is None: self._build()
+        now = self._shots[bisect_right(self._shot_starts, since):bisect_right(self._shot_starts, t)] if since < t else []
+        active = self._stab[bisect_right(self._edges, t)]
+        if now and active: now = sorted(now + active)
+        elif active:       now = active
+        out = {}
+        for c in now:
+            out.setdefault(c.name, []).append(c)
+        return out
+
+    def advance(self, t):
+        """Cues que tocan en t: los puntuales que vencen ahora y los intervalos activos."""
+        if self._shots is None: self._build()
+        if t < self.t: self.seek(t)
+        self.t = t
+        now = []
+        shots, i = self._shots, self._next_shot
+        while i < len(shots) and shots[i].start <= t:
+            now.append(shots[i]); i += 1
+        self._next_shot = i
+        spans, j = self._spans, self._next_span
+        while j < len(spans) and spans[j].start <= t:
+            insort(self._active, spans[j]); j += 1
+        self._next_span = j
+        if self._active:
+            self._active = [c for c in self._active if t < c.end]
+            if now: now = sorted(now + self._active)
+            else:   now = self._active
+        out = {}
+        for c in now:
+            out.setdefault(c.name, []).append(c)
+        return out
+
+# ========= FICHEROS DE TIMELINE =========
+# Un show se describe en JSON (timelines/<show>.json) y se compila una vez a
+# tiempos y cues; el resultado se guarda en CACHE_DIR con el hash del contenido,
+# así que las listas largas de cues cargan al instante y los errores (efecto
+# desconocido, código RF inexistente, intervalo al revés...) saltan al cargar, no
+# a mitad del show.
+#
+#   {
+#     "frame_rate": 24,                         para los tiempos "seg:frame"
+#     "times": {"T_SHOTS_START": "29:0", "T_END": "T_SHOTS_START+3.0", ...},
+#     "cues": [
+#       {"effect": "siren", "during": ["T_VAN_APPEAR", "T_VAN_APPEAR+3.0"]},
+#       {"effect": "audshot", "at": [30.52, 30.66, "31:3"]},
+#       {"effect": "delorean", "during": ["DELOREAN_START", null]},
+#       {"rf": "wheels", "at": "T_RUEDAS+1.5"},
+#       {"effect": "ranger", "during": [...], "params": {"ranger": "RED"}}
+#     ]
+#   }
+#
+# Un tiempo es un número (s), "seg:frame" o un nombre de "times" ya definido, con
+# un desplazamiento opcional en segundos o con nombre: "NOMBRE+1.5", "105:2-0.4",
+# "INICIO+DURACION". "at" admite un tiempo o una lista. Los cues "rf" son
+# puntuales con efecto "rf" y el nombre del código como dato; el resto lleva
+# "params" (o None) como dato del cue.
+
+CACHE_DIR = os.environ.get("ESTANTERIA_CACHE", os.path.expanduser("~/.cache/estanteria"))
+TIMELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timelines")
+COMPILER_VERSION = 1   # Subir si cambia el formato compilado: invalida la caché
+
+_TIME_REF = re.compile(r"^\s*(?:([A-Za-z_]\w*)|([0-9.]+):([0-9.]+))\s*(?:([+-])\s*(?:([0-9.]+)|([A-Za-z_]\w*)))?\s*$")
+_compiled = {}
+
+class ShowTimeline:
+    """Show compilado: tiempos con nombre y cues (start, end, efecto, dato) ya resueltos; end None en los puntuales."""
+
+    def __init__(self, path, times, cues):
+        self.version = COMPILER_VERSION
+        self.path = path
+        self.times = times
+        self.cues = cues
+
+    def timeline(self):
+        """Timeline nuevo (con su propio cursor) con los cues del fichero."""
+        tl = Timeline()
+        for start, end, name, data in self.cues:
+            if end is None: tl.at(start, name, data)
+            else:            tl.during(start, end, name, data)
+        return tl
+
+def _time(value, times, frame_rate, where):
+    if isinstance(value, (int, float)) and not isinstance(value, bool): return float(value)
+    m = _TIME_REF.match(value) if isinstance(value, str) else None
+    if not m: raise ValueError(f"{where}: tiempo no válido: {value!r}")
+    name, sec, frame, sign, k, k_name = m.groups()
+    for ref in (name, k_name):
+        if ref and ref not in times: raise ValueError(f"{where}: tiempo desconocido '{ref}'")
+    try:
+        t = times[name] if name else float(sec) + float(frame) / frame_rate
+        if sign:
+            k = times[k_name] if k_name else float(k)
+            t += k if sign == "+" else -k
+    except ValueError:
+        raise ValueError(f"{where}: tiempo no válido: {value!r}") from None
+    return t
+
+def compile_show(doc, path="<show>", effects=None, rf_codes=None, offsets=None):
+    """Resuelve y valida un show ya leído del JSON. offsets suma segundos a tiempos con nombre (--clock-offset...)."""
+    frame_rate = float(doc.get("frame_rate", 24))
+    offsets = offsets or {}
+    times = {}
+    for name, value in doc.get("times", {}).items():
+        times[name] = _time(value, times, frame_rate, f"{path}: times.{name}") + offsets.get(name, 0.0)
+    unknown = set(offsets) - set(times)
+    if unknown: raise ValueError(f"{path}: offsets de tiempos inexistentes: {sorted(unknown)}")
+    cues = []
+    for i, spec in enumerate(doc.get("cues", [])):
+        where = f"{path}: cue {i}"
+        if "rf" in spec:
+            name, data = "rf", spec["rf"]
+            if rf_codes is not None and data not in rf_codes: raise ValueError(f"{where}: código RF desconocido '{data}'")
+        else:
+            name, data = spec.get("effect"), spec.get("params")
+            if not name: raise ValueError(f"{where}: falta 'effect' o 'rf'")
+            if effects is not None and name not in effects: raise ValueError(f"{where}: efecto desconocido '{name}'")
+        if ("at" in spec) == ("during" in spec): raise ValueError(f"{where}: hace falta 'at' o 'during' (solo uno)")
+        if "at" in spec:
+            at = spec["at"] if isinstance(spec["at"], list) else [spec["at"]]
+            cues.extend((_time(v, times, frame_rate, where), None, name, data) for v in at)
+        else:
+            if name == "rf": raise ValueError(f"{where}: los cues RF son puntuales ('at')")
+            start, end = spec["during"]
+            start = _time(start, times, frame_rate, where)
+            end = INF if end is None else _time(end, times, frame_rate, where)
+            if end <= start: raise ValueError(f"{where}: el intervalo acaba antes de empezar")
+            cues.append((start, end, name, data))
+    return ShowTimeline(path, times, cues)
+
+def load_show(path, effects=None, rf_codes=None, offsets=None):
+    """
+    Carga y compila un fichero de timeline (ruta o nombre dentro de timelines/).
+    La compilación se cachea en memoria y en disco por el hash del contenido y
+    de los parámetros, así que un fichero sin cambios no se vuelve a procesar.
+    """
+    if not os.path.exists(path): path = os.path.join(TIMELINE_DIR, path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    key = hashlib.sha256(repr((COMPILER_VERSION, raw, sorted(effects or ()), effects is None,
+                               sorted(rf_codes or ()), rf_codes is None,
+                               sorted((offsets or {}).items()))).encode("utf-8")).hexdigest()
+    if key in _compiled: return _compiled[key]
+    cache = os.path.join(CACHE_DIR, "timelines", key + ".pickle")
+    show = None
+    try:
+        with open(cache, "rb") as f:
+            show = pickle.load(f)
+        if not isinstance(show, ShowTimeline) or getattr(show, "version", None) != COMPILER_VERSION:
+            show = None   # Pickle ajeno o de otro compilador: se recompila
+        else:
+            show.path = path
+    except Exception:   # Truncado, corrupto, de otra versión de Python...: se recompila
+        show = None
+    if show is None:
+        show = compile_show(json.loads(raw.decode("utf-8")), path, effects, rf_codes, offsets)
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            tmp = f"{cache}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(show, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache)
+        except OSError:
+            pass   # Sin caché en disco (solo lectura...): se compila en cada arranque
+    _compiled[key] = show
+    return show
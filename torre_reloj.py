@@ -3,16 +3,27 @@
 # regreso_al_futuro_torre_reloj_largo_refactored.py
 # REFACTORIZADO FINAL (CORREGIDO): Timeline limpio y variables de Spark definidas.
 
-import os, time, math, random, json, socket, subprocess, atexit, argparse, requests
+import os, math, subprocess, atexit, argparse
+import numpy as np
 from typing import List, Tuple
 
 # --- IMPORTACIONES PROPIAS ---
 from layout import * # Configuración de LEDs
-from rf_control import RFManager # Gestión de Radiofrecuencia (incluye el GAP de seguridad)
+from frame import Frame, OutputLut, ZoneConstraints, as_index # Frame de LEDs en NumPy
+from particles import scatter # Chispas vectorizadas
+from timeline import load_show # Timeline compilado desde timelines/
+from mpv_clock import JUMP_S, PlaybackClock # time-pos interpolado: el render no espera al IPC
+from runtime import AsyncMpvClient, AsyncOutput, ShowRuntime # mpv, frames y RF como tareas asyncio
+from scheduler import FrameScheduler # Ticks con deadline absoluto
+import latency # Lookahead calibrado de la salida
+import rng # Aleatoriedad con semilla por show y por frame
+from rf_control import CODES, RFManager # Gestión de Radiofrecuencia (incluye el GAP de seguridad)
+from output import DIRECT_KINDS, OUTPUT_KINDS, open_output # Salida persistente a Hyperion
 
 # ========= CONFIG =========
 VIDEO_FILE_DEFAULT = "/home/pi/bttflargo.mp4"
 HOST       = "http://localhost:8090"
+CONTROLLER_HOST = "192.168.1.60"  # Solo para salida directa (--output ddp/e131/artnet)
 TOKEN      = None
 PRIORITY   = 64
 ORIGIN     = "bttf"
@@ -20,17 +31,12 @@ FPS        = 30
 GAMMA      = 1.0
 AUDIO_DEVICE = "alsa/hdmi:CARD=vc4hdmi,DEV=0"
 
-# ========= TIMELINE BASE (Segundos) =========
-T_CLOCK_BASE  = 139.2   
-T_IMPACT_BASE = 143.5   
-T_BLUE_SPARK_START  = 149.2
-T_ORANGE_SPARK_BASE = 155.59
-
-# Tiempos de RF (Definidos aquí para usarlos en el Timeline)
-T_FALLO_MOTOR  = 40.23
-T_PRUEBA_MOTOR = 49.27
-T_ENCENDIDO    = 66.7
-T_RUEDAS       = 127.53
+# ========= TIMELINE =========
+# Tiempos base (s) y cola RF en timelines/torre_reloj.json; --clock-offset y
+# --car-offset se suman a T_CLOCK y T_IMPACT al compilarlo. La latencia de la
+# salida ya la compensa el lookahead (latency.py): los offsets quedan para
+# ajustes finos del show, no de la sala
+TIMELINE_FILE = "torre_reloj.json"
 
 # ========= PUNTOS CLAVE LEDs =========
 LED_CLOCK = [54, 55]   
@@ -45,40 +51,25 @@ PRE_TOTAL_S = 2.4
 PRE_HOLD_CLOCK = 0.18   
 
 # ========= HYPERION =========
-headers = {"Content-Type": "application/json"}
-if TOKEN: headers["Authorization"] = f"Bearer {TOKEN}"
+output = None   # La abre main() solo si hay show: importar el módulo (prerender, benchs) no toca Hyperion
 
-def clamp(x): return max(0, min(255, int(x)))
 def lerp(a, b, t): return a + (b - a) * t
 def mix(c1, c2, t): return (lerp(c1[0], c2[0], t), lerp(c1[1], c2[1], t), lerp(c1[2], c2[2], t))
 def scale(c, k): return (c[0] * k, c[1] * k, c[2] * k)
 
-def apply_gamma(c):
-    if GAMMA == 1.0: return c
-    r, g, b = c
-    gfun = lambda v: 255 * ((v / 255.0) ** GAMMA)
-    return (gfun(r), gfun(g), gfun(b))
-
-def pack(pixels):
-    flat = []
-    for r, g, b in pixels:
-        r, g, b = apply_gamma((r, g, b))
-        flat += [clamp(r), clamp(g), clamp(b)]
-    return flat
-
-def send_frame(pixels, duration=-1):
-    payload = {"command": "color", "color": pack(pixels),
-               "priority": PRIORITY, "origin": ORIGIN, "duration": duration}
-    try:
-        requests.post(f"{HOST}/json-rpc", headers=headers, json=payload, timeout=2)
-    except Exception:
-        pass
+LUT = OutputLut(GAMMA)   # Gamma y balance de blancos por zona (layout.py)
+CONSTRAINTS = ZoneConstraints()   # Sin blanco en las zonas 2-4: los efectos pintan libremente
+
+def pack(px):
+    return px.pack(LUT, CONSTRAINTS)
+
+def send_frame(px, duration=-1):
+    output.send(pack(px), duration)
+
+def frame_fill(c): return Frame.fill(c)
 
-def frame_fill(c): return [c] * N
-def add(px, i, c):
-    if 0 <= i < N:
-        r, g, b = px[i]; cr, cg, cb = c
-        px[i] = (r + cr, g + cg, b + cb)
+# LEDs de la zona 1
+ZONE1_MASK = ZONE_ID == ZONE_NAMES.index("ZONE1")
 
 # ========= EFECTOS BASE =========
 def idle_ambient(phase: float):
@@ -86,26 +77,18 @@ def idle_ambient(phase: float):
     base = scale(ELECTRIC_BLUE, k)
     return frame_fill(base)
 
-def _add_white_guarded(px, i, val):
-    if white_allowed(i): add(px, i, scale(WHITE, val))
-    else:                add(px, i, scale(ELECTRIC_BLUE, val * 0.8)) 
+def _flash(px, idx, color, power, side):
+    # Centro + vecinos en una sola suma
+    k = np.repeat(np.array([2.2, side, side]) * power, len(idx))
+    px.add(np.concatenate((idx, idx - 1, idx + 1)), color, k)
 
 def white_flash_local(px, indices, power=2.2, force=False):
-    for i in indices:
-        if force or white_allowed(i):
-            add(px, i, scale(WHITE, 2.2 * power))
-            if i - 1 >= 0: add(px, i - 1, scale(WHITE, 0.7 * power))
-            if i + 1 < N: add(px, i + 1, scale(WHITE, 0.7 * power))
-        else:
-            add(px, i, scale(ELECTRIC_BLUE, 2.2 * power))
-            if i - 1 >= 0: add(px, i - 1, scale(ELECTRIC_BLUE, 0.7 * power))
-            if i + 1 < N: add(px, i + 1, scale(ELECTRIC_BLUE, 0.7 * power))
+    idx = as_index(indices)
+    _flash(px, idx, WHITE, power, 0.7)
+    if force: px.unguard(np.concatenate((idx - 1, idx, idx + 1)))   # Blanco también en zonas sin blanco
 
 def blue_flash_local(px, indices, power=2.2):
-    for i in indices:
-        add(px, i, scale(ELECTRIC_BLUE, 2.2 * power))
-        if i - 1 >= 0: add(px, i - 1, scale(ELECTRIC_BLUE, 0.8 * power))
-        if i + 1 < N: add(px, i + 1, scale(ELECTRIC_BLUE, 0.8 * power))
+    _flash(px, as_index(indices), ELECTRIC_BLUE, power, 0.8)
 
 def crackle(px, centers, spread=5, density=0.6, color='white'):
     if color == 'white':
@@ -116,29 +99,24 @@ def crackle(px, centers, spread=5, density=0.6, color='white'):
         base = ORANGE_INTENSE; mix_with = WHITE; mix_amt = 0.35
     else:
         base = ELECTRIC_BLUE; mix_with = WHITE; mix_amt = 0.2
-    for c in centers:
-        for j in range(-spread, spread + 1):
-            i = c + j
-            if 0 <= i < N and random.random() < density * (1 - abs(j) / (spread + 1)):
-                col = mix(base, mix_with, mix_amt)
-                if color == 'white' and not white_allowed(i):
-                    col = ELECTRIC_BLUE
-                add(px, i, col)
+    idx, _ = scatter(centers, spread, density)
+    if color == 'white':
+        # Azul eléctrico puro en las zonas sin blanco: la mezcla blanco/azul es casi
+        # blanca (min/max ~0.84) y ZoneConstraints no la sustituye
+        ok = WHITE_ALLOWED_MASK[idx]
+        px.add(idx[~ok], ELECTRIC_BLUE)
+        idx = idx[ok]
+    px.add(idx, mix(base, mix_with, mix_amt))
 
 def draw_along_path(px, path: List[int], head_pos: float, tail: int = 10, color='blue', head_gain=2.0):
-    if not path: return
+    path = as_index(path)
+    if len(path) == 0: return
     head_idx = int(max(0, min(len(path) - 1, round(head_pos * (len(path) - 1)))))
-    for j in range(tail):
-        idx = head_idx - j
-        if idx < 0: break
-        led = path[idx]
-        fade = max(0.0, 1.0 - j / max(1, tail))
-        
-        effective_color = WHITE if color == 'white' and white_allowed(led) else ELECTRIC_BLUE
-        
-        add(px, led, scale(effective_color, head_gain * fade))
-        if led - 1 >= 0: add(px, led - 1, scale(effective_color, 0.45 * fade))
-        if led + 1 < N: add(px, led + 1, scale(effective_color, 0.45 * fade))
+    j = np.arange(min(tail, head_idx + 1))
+    led = path[head_idx - j]
+    fade = np.maximum(0.0, 1.0 - j / max(1, tail))
+    col = WHITE if color == 'white' else ELECTRIC_BLUE
+    px.add(np.concatenate((led, led - 1, led + 1)), col, np.concatenate((head_gain * fade, 0.45 * fade, 0.45 * fade)))
 
 def apply_converge_effect(px, progress, color, crackle_color, tail=5, bloom_base=0.35, bloom_amp=0.25, head_gain=2.4, center_gain=1.8):
     SPARK_LEFT_LED, SPARK_RIGHT_LED = 36, 54
@@ -147,19 +125,19 @@ def apply_converge_effect(px, progress, color, crackle_color, tail=5, bloom_base
     center = SPARK_CENTER_LED
     left_head  = int(round(lerp(SPARK_LEFT_LED, center, progress)))
     right_head = int(round(lerp(SPARK_RIGHT_LED, center + 1, progress)))
-    for k in range(tail):
-        fade = max(0.0, 1.0 - k / max(1, tail))
-        idx_left = left_head - k
-        if SPARK_LEFT_LED <= idx_left <= center:
-            add(px, idx_left, scale(color, head_gain * fade))
-        idx_right = right_head + k
-        if center < idx_right <= SPARK_RIGHT_LED:
-            add(px, idx_right, scale(color, head_gain * fade))
+    k = np.arange(tail)
+    fade = np.maximum(0.0, 1.0 - k / max(1, tail))
+    idx_left = left_head - k
+    m = (idx_left >= SPARK_LEFT_LED) & (idx_left <= center)
+    px.add(idx_left[m], color, head_gain * fade[m])
+    idx_right = right_head + k
+    m = (idx_right > center) & (idx_right <= SPARK_RIGHT_LED)
+    px.add(idx_right[m], color, head_gain * fade[m])
     base_bloom = bloom_base + bloom_amp * math.sin(progress * math.pi)
-    for idx in range(SPARK_LEFT_LED, SPARK_RIGHT_LED + 1):
-        dist = abs(idx - SPARK_CENTER_LED)
-        weight = max(0.1, 1.0 - dist / max(1, (SPARK_RIGHT_LED - SPARK_LEFT_LED + 1)))
-        add(px, idx, scale(color, base_bloom * weight))
+    idx = np.arange(SPARK_LEFT_LED, SPARK_RIGHT_LED + 1)
+    dist = np.abs(idx - SPARK_CENTER_LED)
+    weight = np.maximum(0.1, 1.0 - dist / max(1, (SPARK_RIGHT_LED - SPARK_LEFT_LED + 1)))
+    px.add(idx, color, base_bloom * weight)
     centers = [SPARK_LEFT_LED, SPARK_RIGHT_LED, SPARK_CENTER_LED]
     crackle(px, centers, spread=2, density=0.65, color=crackle_color)
 
@@ -171,36 +149,45 @@ def apply_blue_converge_effect(px, progress):
 
 def storm_clouds_zone1(px, density: float = 0.14):
     if not ZONE1: return
-    if random.random() < density:
-        size = random.randint(2, 5)
-        center = random.choice(ZONE1)
-        for j in range(-size, size + 1):
-            idx = center + j
-            if idx in ZONE1_SET: 
-                _add_white_guarded(px, idx, 1.4 * (1 - abs(j) / (size + 1)))
-
-def global_flash_white(hold_ms=550, power=1.0):
-    px = frame_fill(scale(WHITE, 2.5 * power))
-    send_frame(px, duration=int(hold_ms))
+    if rng.chance(density):
+        size = int(rng.integers(2, 6))
+        center = rng.choice(ZONE1)
+        j = np.arange(-size, size + 1)
+        idx = center + j
+        ok = (idx >= 0) & (idx < N)
+        idx, j = idx[ok], j[ok]
+        m = ZONE1_MASK[idx]
+        px.add(idx[m], WHITE, 1.4 * (1 - np.abs(j[m]) / (size + 1)))
+
+def white_frame(power=1.0):
+    # Flash global: blanco en todas las zonas a propósito
+    return frame_fill(scale(WHITE, 2.5 * power)).unguard()
+
+# Destino del post-efecto por LED: naranja en la zona 3, azul profundo en el resto
+POST_TARGET = np.tile(np.asarray(scale(DEEP_BLUE, 2.4), dtype=float), (N, 1))
+POST_TARGET[list(ZONE3_SET)] = scale(ORANGE_INTENSE, 2.0)
 
 # ========= MPV IPC =========
 SOCK_PATH = "/tmp/mpv-bttf.sock"
 MPV_LOG   = "/tmp/mpv-bttf.log"
 mpv_proc  = None
-ipc_sock  = None
+mpv       = AsyncMpvClient()
+clock     = PlaybackClock()
 
 def cleanup():
+    clock.stop()
     try:
-        if ipc_sock: ipc_sock.close()
+        mpv.close()
     except: pass
     try:
         if mpv_proc and mpv_proc.poll() is None:
             mpv_proc.terminate()
     except: pass
-    try:
-        send_frame(frame_fill((0, 0, 0)), duration=500)
-    except: pass
-atexit.register(cleanup)
+    if output is not None:
+        try:
+            send_frame(frame_fill((0, 0, 0)), duration=500)
+        except: pass
+        output.close()
 
 def start_mpv(video_path):
     global mpv_proc
@@ -220,219 +207,125 @@ def start_mpv(video_path):
     logf = open(MPV_LOG, "w")
     mpv_proc = subprocess.Popen(cmd, stdout=logf, stderr=logf)
 
-def connect_ipc(timeout=10.0):
-    t0 = time.time()
-    while time.time() - t0 < timeout:
-        if os.path.exists(SOCK_PATH): break
-        time.sleep(0.05)
-    global ipc_sock
-    t0 = time.time()
-    while time.time() - t0 < timeout:
-        try:
-            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            s.connect(SOCK_PATH)
-            ipc_sock = s
-            return
-        except Exception:
-            time.sleep(0.05)
-    raise RuntimeError("No se pudo conectar al socket IPC de mpv")
-
-def mpv_get_prop(prop: str, timeout=0.2):
-    req = {"command": ["get_property", prop], "request_id": 1}
-    if not ipc_sock: return None
-    try:
-        ipc_sock.sendall((json.dumps(req) + "\n").encode("utf-8"))
-        ipc_sock.settimeout(timeout)
-        data = b""
-        while True:
-            chunk = ipc_sock.recv(4096)
-            if not chunk: break
-            data += chunk
-            if b"\n" in data:
-                lines = data.split(b"\n")
-                for line in lines:
-                    if not line.strip(): continue
-                    try:
-                        msg = json.loads(line.decode("utf-8"))
-                        if msg.get("request_id") == 1 and msg.get("error") == "success":
-                            return msg.get("data")
-                    except:
-                        continue
-                break
-    except Exception:
-        return None
-    return None
+# ========= RENDER =========
+# El frame de cada instante sale solo de t y de los tiempos del show: sin flags
+# de "ya disparado" ni inicios guardados, así que tras un seek o un reinicio a
+# mitad del vídeo el show sigue bien, y se puede pintar cualquier frame suelto.
+# Los efectos de un solo frame (flash de la prefase, golpe al reloj) salen si su
+# instante cae en (since, t]; since es el tiempo del frame anterior.
+POST_HOLD_S = 4.0
+POST_FADE_S = 1.8
+WHITE_HOLD_S = 0.5   # Flash blanco global del impacto
+
+def load_timeline(path=TIMELINE_FILE, clock_offset=0.0, car_offset=0.0):
+    """Carga el show (con los offsets) y publica sus tiempos (T_CLOCK, T_IMPACT...) como globales del módulo."""
+    global SHOW
+    SHOW = load_show(path, effects=(), rf_codes=CODES,
+                     offsets={"T_CLOCK": clock_offset, "T_IMPACT": car_offset})
+    globals().update(SHOW.times)
+    return SHOW
+
+load_timeline()
+
+def grid_since(t):
+    """Inicio (exclusivo) del frame de t en la rejilla de FPS: el instante del frame anterior."""
+    return (math.ceil(t * FPS - 1e-6) - 1) / FPS
+
+def render_frame(t, since=None):
+    """Frame del show en el instante t del vídeo."""
+    if since is None: since = grid_since(t)
+    rng.cue("torre", int(t * FPS + 1e-6))   # Mismo índice que FrameCache.index: k/FPS*FPS puede quedar en k-1
+
+    # Impacto: flash blanco global durante WHITE_HOLD_S
+    if T_IMPACT <= t < T_IMPACT + WHITE_HOLD_S:
+        return white_frame()
+
+    px = idle_ambient(phase=t * 0.25)
+
+    if t < (T_CLOCK - 0.05):
+        storm_clouds_zone1(px, density=0.14)
+
+    # Rayo (Prefase)
+    pre_start = T_CLOCK - PRE_TOTAL_S
+    if pre_start <= t < T_CLOCK:
+        if since < pre_start <= t:
+            white_flash_local(px, [100, 101], power=2.0)
+        p = max(0.0, min(1.0, (t - pre_start) / PRE_TOTAL_S))
+        len1 = len(PRE_PATH_1)
+        len2 = len(PRE_PATH_2)
+        total = len1 + len2
+        pos = p * (total - 1)
+        if pos < len1:
+            head_pos = pos / max(1, len1 - 1)
+            draw_along_path(px, PRE_PATH_1, head_pos, tail=8, color='white', head_gain=2.3)
+        else:
+            pos2 = pos - len1
+            head_pos2 = pos2 / max(1, len2 - 1)
+            draw_along_path(px, PRE_PATH_2, head_pos2, tail=8, color='blue', head_gain=2.0)
+
+    # Golpe Reloj
+    if since < T_CLOCK <= t:
+        white_flash_local(px, LED_CLOCK, power=2.3, force=True)
+        crackle(px, LED_CLOCK, spread=5, density=0.9, color='white')
+
+    # Viaje al Coche: hasta el primer frame con la cabeza en el coche
+    travel_start = T_CLOCK + PRE_HOLD_CLOCK
+    dur = max(0.01, T_IMPACT - travel_start)
+    if T_CLOCK <= t and since < travel_start + dur:
+        u = min(1.0, max(0.0, (t - travel_start) / dur))
+        draw_along_path(px, TRAVEL_PATH_TO_CAR, u, tail=10, color='blue', head_gain=2.1)
+
+    # Post-efecto
+    post_start = T_IMPACT + WHITE_HOLD_S
+    if t >= post_start:
+        p = min(1.0, (t - post_start) / POST_FADE_S)
+        px = frame_fill(WHITE).mix(POST_TARGET, p).unguard()   # Fundido desde el flash blanco
+
+        if (t - post_start) > (POST_FADE_S + POST_HOLD_S):
+            k = max(0.0, 1.0 - (t - (post_start + POST_FADE_S + POST_HOLD_S)) / 0.6)
+            px.scale(k)
+
+    # Efectos decorativos finales (USAN T_BLUE_SPARK y T_ORANGE_SPARK)
+    BLUE_SPARK_DURATION = max(0.1, T_ORANGE_SPARK - T_BLUE_SPARK)
+    elapsed_blue = t - T_BLUE_SPARK
+    if 0.0 <= elapsed_blue <= BLUE_SPARK_DURATION:
+        apply_blue_converge_effect(px, elapsed_blue / BLUE_SPARK_DURATION)
+
+    elapsed = t - T_ORANGE_SPARK
+    if 0.0 <= elapsed <= 1.0:
+        apply_orange_converge_effect(px, elapsed / 1.0)
+
+    return px
 
 # ========= LOOP =========
-def run_show_with_video(video_path, clock_offset, car_offset):
-    random.seed()
+def run_show_with_video(video_path, clock_offset, car_offset, seed=None, timeline_file=TIMELINE_FILE, lookahead=0.0):
+    # Tiempos finales (con los offsets) y cola de eventos RF, validados antes de arrancar el vídeo
+    rf_timeline = load_timeline(timeline_file, clock_offset, car_offset).timeline()
+
+    print(f"[show] semilla {rng.seed_show(seed)}")
     start_mpv(video_path)
-    connect_ipc()
-
-    # Cálculo de tiempos finales
-    T_CLOCK  = T_CLOCK_BASE  + clock_offset
-    T_IMPACT = T_IMPACT_BASE + car_offset
-
-    # CORRECCIÓN: Definición de variables Spark
-    T_BLUE_SPARK   = T_BLUE_SPARK_START
-    T_ORANGE_SPARK = T_ORANGE_SPARK_BASE
-
-    # --- DEFINICIÓN DE LA COLA DE EVENTOS RF (TIMELINE) ---
-    rf_timeline = [
-        # Inicio
-        (2.0, "front"),
-        (2.0, "rear"), 
-        
-        # Fallo de motor
-        (T_FALLO_MOTOR, "front"), 
-        (T_FALLO_MOTOR, "rear"), 
-        
-        # Encendido
-        (T_ENCENDIDO, "front"),
-        (T_ENCENDIDO, "rear"),
-        
-        # Ruedas
-        (T_RUEDAS,       "wheels"),
-        (T_RUEDAS + 1.5, "wheels"), 
-        
-        # Impacto
-        (T_IMPACT, "blue_front"),
-        (T_IMPACT, "blue_rear")
-    ]
-    
-    rf_timeline.sort(key=lambda x: x[0])
-    next_rf_idx = 0 
-
-    fired_clock = False
-    fired_travel = False
-    fired_impact = False
-    fired_blue = False
-    fired_orange = False
-    pre_start_time = None
-    travel_start_time = None
-    white_hold_until  = None
-    post_set_time     = None
-    post_hold_s       = 4.0
-    POST_FADE_S       = 1.8
-    
+    last = None
+
+    # Los cues RF los dispara la tarea RF del runtime, no el tick de frame
     rf = RFManager() 
 
+    def tick(t):
+        nonlocal last
+        # Puntuales desde el frame anterior; tras un seek, solo los de este frame
+        since = last if last is not None and 0.0 <= t - last < JUMP_S else grid_since(t)
+        send_frame(render_frame(t, since))
+        last = t
+        return False
+
     try:
-        while True:
-            if mpv_proc.poll() is not None:
-                break
-
-            t = mpv_get_prop("time-pos")
-            if t is None:
-                time.sleep(1.0 / FPS)
-                continue
-
-            # --- LÓGICA RF: COLA DE EVENTOS ---
-            while next_rf_idx < len(rf_timeline) and t >= rf_timeline[next_rf_idx][0]:
-                event_time, code_name = rf_timeline[next_rf_idx]
-                rf.send(code_name)
-                next_rf_idx += 1
-
-            # --- RESTO DE EFECTOS VISUALES (LEDs) ---
-            if white_hold_until is not None and t < white_hold_until:
-                send_frame(frame_fill(scale(WHITE, 2.5)))
-                time.sleep(1.0 / FPS)
-                continue
-
-            px = idle_ambient(phase=(t or 0) * 0.25)
-
-            if t < (T_CLOCK - 0.05):
-                storm_clouds_zone1(px, density=0.14)
-
-            # Rayo (Prefase)
-            if t >= (T_CLOCK - PRE_TOTAL_S) and t < T_CLOCK:
-                if pre_start_time is None:
-                    pre_start_time = t
-                    white_flash_local(px, [100, 101], power=2.0) 
-                p = max(0.0, min(1.0, (t - pre_start_time) / PRE_TOTAL_S))
-                len1 = len(PRE_PATH_1)
-                len2 = len(PRE_PATH_2)
-                total = len1 + len2
-                pos = p * (total - 1)
-                if pos < len1:
-                    head_pos = pos / max(1, len1 - 1)
-                    draw_along_path(px, PRE_PATH_1, head_pos, tail=8, color='white', head_gain=2.3)
-                else:
-                    pos2 = pos - len1
-                    head_pos2 = pos2 / max(1, len2 - 1)
-                    draw_along_path(px, PRE_PATH_2, head_pos2, tail=8, color='blue', head_gain=2.0)
-
-            # Golpe Reloj
-            if t >= T_CLOCK and not fired_clock:
-                white_flash_local(px, LED_CLOCK, power=2.3, force=True)
-                crackle(px, LED_CLOCK, spread=5, density=0.9, color='white')
-                fired_clock = True
-                travel_start_time = t + PRE_HOLD_CLOCK 
-
-            # Viaje al Coche
-            if fired_clock and not fired_travel:
-                dur = max(0.01, T_IMPACT - travel_start_time)
-                u = 0.0 if dur == 0 else min(1.0, max(0.0, (t - travel_start_time) / dur))
-                draw_along_path(px, TRAVEL_PATH_TO_CAR, u, tail=10, color='blue', head_gain=2.1)
-                if u >= 1.0:
-                    fired_travel = True
-            
-            # Impacto Visual
-            if t >= T_IMPACT and not fired_impact:
-                blue_flash_local(px, LED_CAR, power=2.7)
-                crackle(px, LED_CAR, spread=6, density=1.0, color='blue')
-                fired_impact = True
-                global_flash_white(hold_ms=550, power=1.0)
-                white_hold_until = t + 0.50
-                post_set_time    = white_hold_until
-                continue
-
-            # Post-efecto
-            if post_set_time is not None and t >= post_set_time:
-                p = min(1.0, (t - post_set_time) / POST_FADE_S) 
-                white = WHITE
-                target_blue   = scale(DEEP_BLUE,     2.4)
-                target_orange = scale(ORANGE_INTENSE,2.0)
-
-                px = [None] * N
-                for i in range(N):
-                    target = target_orange if i in ZONE3_SET else target_blue
-                    px[i] = mix(white, target, p)
-
-                if (t - post_set_time) > (POST_FADE_S + post_hold_s):
-                    k = max(0.0, 1.0 - (t - (post_set_time + POST_FADE_S + post_hold_s)) / 0.6)
-                    for i in range(N):
-                        r, g, b = px[i]
-                        px[i] = (r * k, g * k, b * k)
-
-            # Efectos decorativos finales (USAN T_BLUE_SPARK y T_ORANGE_SPARK)
-            if not fired_blue and t >= T_BLUE_SPARK:
-                fired_blue = True
-                blue_effect_start = t
-            if fired_blue:
-                elapsed_blue = t - blue_effect_start
-                BLUE_SPARK_DURATION = max(0.1, T_ORANGE_SPARK - T_BLUE_SPARK)
-                if elapsed_blue <= BLUE_SPARK_DURATION:
-                    progress_blue = elapsed_blue / BLUE_SPARK_DURATION
-                    apply_blue_converge_effect(px, progress_blue)
-
-            if not fired_orange and t >= T_ORANGE_SPARK:
-                fired_orange = True
-                orange_effect_start = t
-            if fired_orange:
-                elapsed = t - orange_effect_start
-                if elapsed <= 1.0:
-                    progress = elapsed / 1.0
-                    apply_orange_converge_effect(px, progress)
-
-            send_frame(px)
-            time.sleep(1.0 / FPS)
+        ShowRuntime(FPS, mpv, clock, output, proc=mpv_proc, rf=rf, rf_timeline=rf_timeline,
+                    lookahead=lookahead).run(tick, SOCK_PATH)
 
         # Fundido final
-        for f in range(int(0.6 * FPS)):
+        sched = FrameScheduler(FPS)
+        for f in sched.frames(int(0.6 * FPS)):
             k = 1.0 - f / (0.6 * FPS)
             send_frame(frame_fill(scale(ELECTRIC_BLUE, 0.06 * k)))
-            time.sleep(1.0 / FPS)
         send_frame(frame_fill((0, 0, 0)), duration=500)
 
     finally:
@@ -443,10 +336,21 @@ def run_show_with_video(video_path, clock_offset, car_offset):
 def main():
     p = argparse.ArgumentParser(description="BTTF Torre del Reloj (Timeline RF Refactorizado)")
     p.add_argument("--video", default=VIDEO_FILE_DEFAULT, help="Ruta al .mp4")
-    p.add_argument("--clock-offset", type=float, default=0.0, help="Ajuste (s) rayo al reloj")
-    p.add_argument("--car-offset", type=float, default=0.0, help="Ajuste (s) rayo al coche")
+    p.add_argument("--clock-offset", type=float, default=0.0, help="Ajuste fino (s) rayo al reloj, además del lookahead")
+    p.add_argument("--car-offset", type=float, default=0.0, help="Ajuste fino (s) rayo al coche, además del lookahead")
+    p.add_argument("--output", choices=OUTPUT_KINDS, default="json", help="Protocolo de salida (por defecto json a Hyperion)")
+    p.add_argument("--controller", default=CONTROLLER_HOST, help="IP del WLED/ESP para ddp, e131 y artnet")
+    p.add_argument("--latency-ms", type=float, default=None, help="Latencia de salida a compensar (por defecto la calibrada con latency.py)")
+    p.add_argument("--seed", type=int, default=None, help="Semilla de los efectos aleatorios (por defecto una nueva en cada pase)")
+    p.add_argument("--timeline", default=TIMELINE_FILE, help="Fichero de timeline (por defecto timelines/torre_reloj.json)")
     args = p.parse_args()
-    run_show_with_video(args.video, args.clock_offset, args.car_offset)
+    global output
+    host = args.controller if args.output in DIRECT_KINDS else HOST
+    output = AsyncOutput(open_output(args.output, host, PRIORITY, ORIGIN, token=TOKEN, timeout=2))
+    atexit.register(cleanup)
+    lookahead = latency.lookahead(args.latency_ms, args.output, host)
+    print(f"[show] lookahead {lookahead * 1e3:.0f} ms")
+    run_show_with_video(args.video, args.clock_offset, args.car_offset, args.seed, args.timeline, lookahead)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,193 @@
+# udp_output.py
+# Salida directa por UDP a un controlador WLED/ESP, sin el salto por Hyperion.
+#  - DDP     (puerto 4048): cabecera de 10 bytes + RGB, hasta 480 píxeles por paquete
+#  - E1.31   (puerto 5568): sACN, un paquete por universo DMX
+#  - Art-Net (puerto 6454): ArtDmx, un paquete por universo DMX
+# El reparto en universos y el offset de píxel salen de layout.py. Cada paquete se
+# preconstruye una vez; por frame solo se copian los bytes de color y la secuencia.
+# UDP no tiene `duration`: si el show deja de enviar, el controlador vuelve a su
+# modo normal tras su propio timeout de tiempo real.
+
+import socket
+import struct
+import threading
+import time
+import uuid
+
+from layout import DDP_PIXEL_OFFSET, UNIVERSE_MAP
+from output import FrameOutput
+
+DDP_PORT    = 4048
+E131_PORT   = 5568
+ARTNET_PORT = 6454
+
+# ========= BASE =========
+class _UdpOutput(FrameOutput):
+    def __init__(self, host, port, timeout=2.0, retry_s=1.0):
+        super().__init__(timeout, retry_s)
+        self.addr = (host, port)
+        self.sock = None
+        self._packets = None
+
+    def _open(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect(self.addr)
+
+    def _close(self):
+        self.sock.close()
+        self.sock = None
+
+    def _build(self, n_bytes):
+        """Devuelve [(paquete, inicio de datos, lo, hi)]: cada paquete lleva rgb[lo:hi]."""
+        raise NotImplementedError
+
+    def _sequence(self, pkt, k):
+        """Pone el número de secuencia en el paquete k del frame."""
+        pass
+
+    def _send(self, rgb, duration):
+        if isinstance(rgb, list): rgb = bytes(rgb)
+        if self._packets is None or self._packets[0] != len(rgb):
+            self._packets = (len(rgb), self._build(len(rgb)))
+        sent = 0
+        for k, (pkt, at, lo, hi) in enumerate(self._packets[1]):
+            pkt[at:at + hi - lo] = rgb[lo:hi]
+            self._sequence(pkt, k)
+            sent += self.sock.send(pkt)
+        return sent
+
+# ========= DDP =========
+DDP_FLAGS_VER1 = 0x40
+DDP_FLAGS_PUSH = 0x01
+DDP_TYPE_RGB24 = 0x0B
+DDP_ID_DISPLAY = 0x01
+DDP_MAX_DATA   = 1440
+
+class DdpOutput(_UdpOutput):
+    name = "DDP"
+
+    def __init__(self, host, port=DDP_PORT, pixel_offset=DDP_PIXEL_OFFSET, timeout=2.0, retry_s=1.0):
+        super().__init__(host, port, timeout, retry_s)
+        self.pixel_offset = pixel_offset
+        self._seq = 0
+
+    def _build(self, n_bytes):
+        packets = []
+        for lo in range(0, n_bytes, DDP_MAX_DATA):
+            hi = min(n_bytes, lo + DDP_MAX_DATA)
+            flags = DDP_FLAGS_VER1 | (DDP_FLAGS_PUSH if hi == n_bytes else 0)
+            pkt = bytearray(10 + hi - lo)
+            struct.pack_into(">BBBBIH", pkt, 0, flags, 0, DDP_TYPE_RGB24, DDP_ID_DISPLAY,
+                             self.pixel_offset * 3 + lo, hi - lo)
+            packets.append((pkt, 10, lo, hi))
+        return packets
+
+    def _sequence(self, pkt, k):
+        # Secuencia de 4 bits (1..15); 0 significa "sin secuencia"
+        if k == 0: self._seq = self._seq % 15 + 1
+        pkt[1] = self._seq
+
+# ========= E1.31 / sACN =========
+E131_HEADER = 126   # raíz (38) + framing (77) + DMP (10) + start code
+
+class E131Output(_UdpOutput):
+    name = "E1.31"
+
+    def __init__(self, host, port=E131_PORT, universes=UNIVERSE_MAP, source="estanteria",
+                 priority=100, timeout=2.0, retry_s=1.0):
+        super().__init__(host, port, timeout, retry_s)
+        self.universes = universes
+        self.source = source.encode("utf-8")[:63]
+        self.priority = priority
+        self.cid = uuid.uuid4().bytes
+        self._seq = 0
+
+    def _build(self, n_bytes):
+        packets = []
+        for universe, first, count in self.universes:
+            lo, hi = first * 3, min(n_bytes, (first + count) * 3)
+            if lo >= hi: continue
+            slots = hi - lo
+            pkt = bytearray(E131_HEADER + slots)
+            # Capa raíz
+            struct.pack_into(">HH12sHI16s", pkt, 0, 0x0010, 0x0000, b"ASC-E1.17\x00\x00\x00",
+                             0x7000 | (len(pkt) - 16), 0x00000004, self.cid)
+            # Capa de framing: nombre, prioridad, sync, secuencia (se rellena), opciones, universo
+            struct.pack_into(">HI64sBHBBH", pkt, 38, 0x7000 | (len(pkt) - 38), 0x00000002,
+                             self.source, self.priority, 0, 0, 0, universe)
+            # Capa DMP: start code 0 + canales
+            struct.pack_into(">HBBHHHB", pkt, 115, 0x7000 | (len(pkt) - 115), 0x02, 0xA1,
+                             0x0000, 0x0001, slots + 1, 0x00)
+            packets.append((pkt, E131_HEADER, lo, hi))
+        return packets
+
+    def _sequence(self, pkt, k):
+        # Cada universo recibe un paquete por frame: basta una secuencia común
+        if k == 0: self._seq = (self._seq + 1) & 0xFF
+        pkt[111] = self._seq
+
+# ========= ART-NET =========
+ARTNET_HEADER = 18
+
+class ArtNetOutput(_UdpOutput):
+    name = "Art-Net"
+
+    def __init__(self, host, port=ARTNET_PORT, universes=UNIVERSE_MAP, timeout=2.0, retry_s=1.0):
+        super().__init__(host, port, timeout, retry_s)
+        self.universes = universes
+        self._seq = 0
+
+    def _build(self, n_bytes):
+        packets = []
+        for universe, first, count in self.universes:
+            lo, hi = first * 3, min(n_bytes, (first + count) * 3)
+            if lo >= hi: continue
+            length = (hi - lo + 1) & ~1   # ArtDmx exige longitud par
+            pkt = bytearray(ARTNET_HEADER + length)
+            # ID, OpDmx (LE), versión 14, secuencia, físico, SubUni, Net, longitud
+            struct.pack_into("<8sH", pkt, 0, b"Art-Net\x00", 0x5000)
+            struct.pack_into(">HBBBBH", pkt, 10, 14, 0, 0, universe & 0xFF, (universe >> 8) & 0x7F, length)
+            packets.append((pkt, ARTNET_HEADER, lo, hi))
+        return packets
+
+    def _sequence(self, pkt, k):
+        # Una secuencia común por frame (1..255; 0 la desactiva)
+        if k == 0: self._seq = self._seq % 255 + 1
+        pkt[12] = self._seq
+
+# ========= LISTENER DE PRUEBA =========
+class UdpRecorder:
+    """
+    Escucha UDP local que registra (instante perf_counter, tamaño, datos) de cada
+    paquete. Sirve para probar los backends sin controlador y medir la latencia
+    envío -> llegada desde el mismo proceso.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.packets = []
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="udp-recorder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop:
+            try:
+                data = self.sock.recv(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.packets.append((time.perf_counter(), len(data), data))
+
+    def intervals(self):
+        ts = [p[0] for p in self.packets]
+        return [b - a for a, b in zip(ts, ts[1:])]
+
+    def close(self):
+        self._stop = True
+        self._thread.join(timeout=1.0)
+        self.sock.close()